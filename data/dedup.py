@@ -0,0 +1,25 @@
+# dedup.py
+import sys
+from utilities.database import open_db, setup_database
+from utilities.dedup import apply_aliases, find_duplicates, write_aliases
+from utilities.derived import refresh_derived
+
+
+def main(args, db_path: str = "database.db"):
+    with open_db(db_path) as conn:
+        setup_database(conn)
+
+        print("Clustering NULL-ISIN securities...")
+        aliases, stats = find_duplicates(conn)
+        write_aliases(conn, aliases)
+        for name, value in stats.items():
+            print(f"    {name:<17} {value:>10,}")
+
+        if "--apply" in args:
+            changed = apply_aliases(conn)
+            print(f"Moved holdings of {len(changed)} ETFs onto canonical securities.")
+            refresh_derived(conn, changed)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
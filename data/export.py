@@ -0,0 +1,16 @@
+# export.py
+import sys
+from utilities.database import open_db, setup_database
+from utilities.snapshot import SNAPSHOT_DIR, export_snapshot
+
+
+def main(root: str = SNAPSHOT_DIR, db_path: str = "database.db"):
+    with open_db(db_path) as conn:
+        setup_database(conn)
+        print(f"Exporting Parquet snapshot to {root}/ ...")
+        for table, rows in export_snapshot(conn, root).items():
+            print(f"    {table:<14} {rows:>10,} rows")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_DIR)
@@ -0,0 +1,43 @@
+# holders.py
+import sys
+from utilities.database import open_db, setup_database
+from utilities.holders import (
+    holders_by_isin,
+    holders_by_name,
+    holders_by_ticker,
+    latency_benchmark,
+)
+
+
+def lookup(conn, query: str):
+    """ISIN if it looks like one, then ETF ticker, then security name prefix."""
+    if len(query) == 12 and query[:2].isalpha() and query.isalnum():
+        return holders_by_isin(conn, query)
+    page = holders_by_ticker(conn, query)
+    return page if not page.is_empty() else holders_by_name(conn, query)
+
+
+def main(args, db_path: str = "database.db"):
+    with open_db(db_path) as conn:
+        setup_database(conn)
+
+        if "--benchmark" in args:
+            for kind, stats in latency_benchmark(conn).items():
+                print(
+                    f"{kind:<12} {stats['queries']:>5} queries  "
+                    f"mean {stats['mean_ms']:.3f} ms  p95 {stats['p95_ms']:.3f} ms  "
+                    f"max {stats['max_ms']:.3f} ms"
+                )
+
+        for query in (a for a in args if not a.startswith("--")):
+            page = lookup(conn, query)
+            print(f"\nETFs holding {query!r}:")
+            for row in page.iter_rows(named=True):
+                print(
+                    f"    {row['etf_isin']}  {row['weight']:7.3f}%  "
+                    f"{(row['etf_name'] or '')[:50]:<50}  {row['holding_name'][:40]}"
+                )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,37 @@
+import asyncio
+from typing import Optional
+
+import amundi
+import invesco
+import ishares
+import spdr
+import vanguard
+import xtrackers
+from utilities.profiling import profile_mode
+
+
+# Fast path: refresh only NAV/AUM (the "prices" field group) for every issuer,
+# without downloading any holdings. With --profile cpu|mem every issuer's run
+# is profiled into its own run directory.
+async def main(profile: Optional[str] = None):
+    print("=== Amundi ===")
+    await amundi.main(nav_only=True, profile=profile)
+
+    print("\n=== iShares ===")
+    await ishares.main(nav_only=True, profile=profile)
+
+    print("\n=== SPDR ===")
+    await spdr.main(nav_only=True, profile=profile)
+
+    print("\n=== Xtrackers ===")
+    await xtrackers.main(nav_only=True, profile=profile)
+
+    print("\n=== Invesco ===")
+    await invesco.main(nav_only=True, profile=profile)
+
+    print("\n=== Vanguard ===")
+    vanguard.main(nav_only=True, profile=profile)  # synchronous (requests)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(profile=profile_mode()))
@@ -0,0 +1,35 @@
+# similar.py
+import sys
+from utilities.database import open_db, setup_database
+from utilities.similarity import (
+    recall_benchmark,
+    refresh_similarity_index,
+    similar_etfs,
+)
+
+
+def main(args, db_path: str = "database.db"):
+    with open_db(db_path) as conn:
+        setup_database(conn)
+
+        if "--rebuild" in args:
+            print(f"Indexed {refresh_similarity_index(conn)} ETFs.")
+
+        if "--benchmark" in args:
+            report = recall_benchmark(conn)
+            print(
+                f"Recall@20 vs exact overlap over {report['queries']} ETFs: "
+                f"{report['recall']:.1%}, "
+                f"{report['candidates']:.0f} LSH candidates per query "
+                f"({report['precision']:.1%} in the exact top 20)  "
+                f"(mean {report['mean_ms']:.2f} ms, max {report['max_ms']:.2f} ms per query)"
+            )
+
+        for isin in (a for a in args if not a.startswith("--")):
+            print(f"\nMost similar to {isin}:")
+            for other, score in similar_etfs(conn, isin):
+                print(f"    {other}  {score:.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,21 +1,26 @@
-# find_nested_etfs.py
+# unroll.py
 import sys
 from collections import defaultdict
-from utilities.database import open_db
+from utilities.database import open_db, setup_database
+from utilities.derived import refresh_derived
+from utilities.nesting import descendants
 
 
 def find_nested(conn):
+    """Nested ETF edges from the etf_nesting index, with the child's issuer/name."""
     sql = """
     SELECT
-        v.etf_isin      AS parent_isin,
-        v.holding_isin  AS nested_isin,
-        e.issuer        AS nested_issuer,
+        n.parent_isin,
+        n.child_isin    AS nested_isin,
+        i.name          AS nested_issuer,
         COALESCE(e.name, '') AS nested_name,
-        v.weight
-    FROM v_holdings v
+        n.weight
+    FROM etf_nesting n
     JOIN etfs e
-      ON e.isin = v.holding_isin
-    ORDER BY parent_isin, nested_isin;
+      ON e.isin = n.child_isin
+    JOIN issuers i
+      ON i.id = e.issuer_id
+    ORDER BY n.parent_isin, n.child_isin;
     """
     cur = conn.execute(sql)
     rows = [
@@ -33,30 +38,35 @@ def find_nested(conn):
 
 def main(db_path: str = "database.db"):
     with open_db(db_path) as conn:
+        setup_database(conn)
         rows = find_nested(conn)
 
-    if not rows:
-        print("No nested ETFs found.")
-        return
-
-    # Unique list of ETFs to unroll
-    nested_isins = sorted({r["nested_isin"] for r in rows})
-    print(f"ETFs to unroll ({len(nested_isins)}):")
-    print(nested_isins)  # ready to paste into your pipeline
-
-    # Optional: show where they appear
-    by_parent = defaultdict(list)
-    for r in rows:
-        by_parent[r["parent_isin"]].append(r)
-
-    print("\nDetails (parent → nested @ weight):")
-    for parent, items in by_parent.items():
-        print(f"- {parent}")
-        for r in items:
-            w = f"{r['weight']:.4f}" if r["weight"] is not None else "NA"
-            print(
-                f"    → {r['nested_isin']} ({r['nested_issuer']}) @ {w}  {r['nested_name'][:60]}"
-            )
+        if not rows:
+            print("No nested ETFs found.")
+            return
+
+        # Unique list of nested ETFs (unrolled automatically by every scraper)
+        nested_isins = sorted({r["nested_isin"] for r in rows})
+        print(f"Nested ETFs ({len(nested_isins)}):")
+        print(nested_isins)
+
+        # Show where they appear
+        by_parent = defaultdict(list)
+        for r in rows:
+            by_parent[r["parent_isin"]].append(r)
+
+        print("\nDetails (parent → nested @ weight):")
+        for parent, items in by_parent.items():
+            total = len(descendants(conn, [parent]))
+            print(f"- {parent} ({total} nested ETFs in total)")
+            for r in items:
+                w = f"{r['weight']:.4f}" if r["weight"] is not None else "NA"
+                print(
+                    f"    → {r['nested_isin']} ({r['nested_issuer']}) @ {w}  {r['nested_name'][:60]}"
+                )
+
+        print("\nRebuilding derived tables...")
+        refresh_derived(conn)
 
 
 if __name__ == "__main__":
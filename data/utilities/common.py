@@ -1,8 +1,11 @@
-from typing import Optional, Tuple
+from typing import Iterable, List, Mapping, NamedTuple, Optional, Tuple
 import re
 from datetime import datetime
-from .translate import translate
-from .country import country_to_iso3
+
+import polars as pl
+
+from .translate import translate, translate_column
+from .country import country_to_iso3, countries_to_iso3
 
 
 def standardize_date(s: Optional[str]) -> Optional[str]:
@@ -17,11 +20,53 @@ def standardize_date(s: Optional[str]) -> Optional[str]:
     return s if re.match(r"\d{4}-\d{2}-\d{2}", s) else None
 
 
-# Class containing ETF Structure, the constructor automatically
-# enforces a first normalization
-class ETF:
-    def __init__(
-        self,
+class _ETFRecord(NamedTuple):
+    isin: str
+    issuer: str
+    name: Optional[str] = None
+    ticker: Optional[str] = None
+    ter: Optional[float] = None
+    nav: Optional[float] = None
+    size: Optional[float] = None
+    currency: Optional[str] = None
+    asset_class: Optional[str] = None
+    sub_asset_class: Optional[str] = None
+    region: Optional[str] = None
+    use_of_profits: Optional[str] = None
+    replication: Optional[str] = None
+    domicile: Optional[str] = None
+    inception_date: Optional[str] = None
+    url: Optional[str] = None
+
+
+# Polars schema of ETF columns, in ETF_COLUMNS (and ETF field) order
+ETF_SCHEMA = {
+    field: pl.Float64 if field in ("ter", "nav", "size") else pl.String
+    for field in _ETFRecord._fields
+}
+
+_TRANSLATED = (
+    "asset_class",
+    "sub_asset_class",
+    "region",
+    "use_of_profits",
+    "replication",
+)
+
+
+def _number(value) -> Optional[float]:
+    return None if value in (None, "-", "—") else float(value)
+
+
+# ETF Structure: a frozen, slotted record laid out in ETF_COLUMNS order, so it
+# is its own DB tuple. The constructor automatically enforces a first
+# normalization; from_records()/from_frame() normalize a whole product list
+# at once, one lookup per distinct label
+class ETF(_ETFRecord):
+    __slots__ = ()
+
+    def __new__(
+        cls,
         isin: str,
         issuer: str,
         name: Optional[str] = None,
@@ -39,42 +84,90 @@ class ETF:
         inception_date: Optional[str] = None,
         url: Optional[str] = None,
     ):
-        self.isin = isin
-        self.issuer = issuer
-        self.name = name
-        self.ticker = ticker
-        self.ter = None if ter in (None, "-", "—") else float(ter)
-        self.nav = None if nav in (None, "-", "—") else float(nav)
-        self.size = None if size in (None, "-", "—") else float(size)
-        self.currency = currency or None
-        self.asset_class = translate(asset_class)
-        self.sub_asset_class = translate(sub_asset_class)
-        self.region = translate(region)
-        self.use_of_profits = translate(use_of_profits)
-        self.replication = translate(replication)
-        self.domicile = country_to_iso3(domicile)
-        self.inception_date = standardize_date(inception_date)
-        self.url = url
+        return super().__new__(
+            cls,
+            isin,
+            issuer,
+            name,
+            ticker,
+            _number(ter),
+            _number(nav),
+            _number(size),
+            currency or None,
+            translate(asset_class, "asset_class"),
+            translate(sub_asset_class, "sub_asset_class"),
+            translate(region, "region"),
+            translate(use_of_profits, "use_of_profits"),
+            translate(replication, "replication"),
+            country_to_iso3(domicile),
+            standardize_date(inception_date),
+            url,
+        )
 
     def to_db_tuple(self) -> Tuple:
-        return (
-            self.isin,
-            self.issuer,
-            self.name,
-            self.ticker,
-            self.ter,
-            self.nav,
-            self.size,
-            self.currency,
-            self.asset_class,
-            self.sub_asset_class,
-            self.region,
-            self.use_of_profits,
-            self.replication,
-            self.domicile,
-            self.inception_date,
-            self.url,
+        return self
+
+    @staticmethod
+    def frame(records: Iterable[Mapping], **constants) -> pl.DataFrame:
+        """
+        Raw ETF columns from `records` (mappings keyed by ETF field; other keys
+        are ignored), with `constants` (e.g. issuer="amundi") for every row.
+        """
+        records = list(records)
+        columns = {}
+        for field in ETF_SCHEMA:
+            if field in constants:
+                values = [constants[field]] * len(records)
+            else:
+                values = [r.get(field) for r in records]
+            if ETF_SCHEMA[field] == pl.Float64:
+                values = [_number(v) for v in values]
+            else:
+                # Spreadsheet cells may be numbers or timestamps
+                values = [
+                    v if v is None or isinstance(v, str) else str(v) for v in values
+                ]
+            columns[field] = values
+        return pl.DataFrame(columns, schema=ETF_SCHEMA)
+
+    @staticmethod
+    def normalize(frame: pl.DataFrame) -> pl.DataFrame:
+        """
+        Vectorized constructor normalization of a frame of raw ETF columns
+        (missing ones are null): Arrow-backed columns in ETF_SCHEMA order.
+        """
+        frame = frame.with_columns(
+            pl.lit(None, dtype=dtype).alias(field)
+            for field, dtype in ETF_SCHEMA.items()
+            if field not in frame.columns
+        ).select(
+            pl.col(field).cast(dtype, strict=False)
+            for field, dtype in ETF_SCHEMA.items()
         )
+        currency = pl.col("currency")
+        return frame.with_columns(
+            *(translate_column(frame[f], f).alias(f) for f in _TRANSLATED),
+            currency=pl.when(currency != "").then(currency),
+            domicile=countries_to_iso3(frame["domicile"]),
+            inception_date=_dates(frame["inception_date"]),
+        )
+
+    @classmethod
+    def from_frame(cls, frame: pl.DataFrame) -> List["ETF"]:
+        """ETF records (also DB tuples) for every row of `frame`, see normalize()."""
+        make = cls._make
+        return [make(row) for row in cls.normalize(frame).iter_rows()]
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping], **constants) -> List["ETF"]:
+        """Batch constructor: ETF records for `records`, see frame()."""
+        return cls.from_frame(cls.frame(records, **constants))
+
+
+def _dates(values: pl.Series) -> pl.Series:
+    # standardize_date() once per distinct value
+    mapping = {v: standardize_date(v) for v in values.drop_nulls().unique()}
+    return values.replace_strict(mapping, default=None, return_dtype=pl.String)
 
 
 # Class modelling holding contained in an ETF
@@ -104,7 +197,7 @@ class Holding:
         self.holding_isin = holding_isin or None
         self.holding_name = holding_name or None
         self.weight = None if weight in (None, "-", "—") else float(weight)
-        self.sector = translate(sector)
+        self.sector = translate(sector, "sector")
         self.country = country_to_iso3(country)
         self.currency = currency or None
 
@@ -1,5 +1,26 @@
+import json
 import sqlite3
-from typing import Optional, Tuple
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+# Column order of utilities.common.ETF.to_db_tuple()
+ETF_COLUMNS = (
+    "isin",
+    "issuer",
+    "name",
+    "ticker",
+    "ter",
+    "nav",
+    "size",
+    "currency",
+    "asset_class",
+    "sub_asset_class",
+    "region",
+    "use_of_profits",
+    "replication",
+    "domicile",
+    "inception_date",
+    "url",
+)
 
 
 # ---------------------------------------------------------------------------
@@ -18,51 +39,93 @@ def open_db(path: str = "database.db") -> sqlite3.Connection:
 # ---------------------------------------------------------------------------
 # Schema setup
 # ---------------------------------------------------------------------------
-DDL = r"""
+DIMENSIONS_DDL = r"""
+-- Dimension tables: each distinct label is stored (and CHECKed) once and
+-- referenced by a small integer key from etfs / securities (see v_etfs, v_securities)
+CREATE TABLE IF NOT EXISTS issuers (
+    id   INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS sectors (
+    id   INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS countries (
+    id   INTEGER PRIMARY KEY,
+    iso3 TEXT NOT NULL UNIQUE CHECK (length(iso3) = 3 AND iso3 = UPPER(iso3))
+);
+
+CREATE TABLE IF NOT EXISTS currencies (
+    id   INTEGER PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE CHECK (length(code) = 3 AND code = UPPER(code))
+);
+"""
+
+DDL = (
+    DIMENSIONS_DDL
+    + r"""
 PRAGMA foreign_keys = ON;
 
 -- One row per ETF (static facts)
 CREATE TABLE IF NOT EXISTS etfs (
     isin            TEXT PRIMARY KEY
                         CHECK (length(isin) = 12 AND isin = UPPER(isin)),
-    issuer          TEXT NOT NULL,
+    issuer_id       INTEGER NOT NULL REFERENCES issuers(id),
     name            TEXT,
     ticker          TEXT,
     ter             REAL,
     nav             REAL,
     size            REAL,
-    currency        TEXT CHECK (currency IS NULL OR
-                                (length(currency) = 3 AND currency = UPPER(currency))),
+    currency_id     INTEGER REFERENCES currencies(id),
     asset_class     TEXT,
     sub_asset_class TEXT,
     region          TEXT,
     use_of_profits  TEXT CHECK (use_of_profits IN ('acc','dist') OR use_of_profits IS NULL),
     replication     TEXT,
-    domicile        TEXT CHECK (domicile IS NULL OR
-                                (length(domicile) = 3 AND domicile = UPPER(domicile))),
+    domicile_id     INTEGER REFERENCES countries(id),
     inception_date  TEXT,  -- normalized 'YYYY-MM-DD' by scrapers if possible
     url             TEXT
 );
 
 -- One row per unique security/holding
 CREATE TABLE IF NOT EXISTS securities (
-    id       INTEGER PRIMARY KEY AUTOINCREMENT,
-    isin     TEXT UNIQUE,  -- may be NULL for cash or baskets
-    name     TEXT NOT NULL,
-    sector   TEXT,
-    country  TEXT CHECK (country IS NULL OR
-                         (length(country) = 3 AND country = UPPER(country))),
-    currency TEXT CHECK (currency IS NULL OR
-                         (length(currency) = 3 AND currency = UPPER(currency))),
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    isin        TEXT UNIQUE,  -- may be NULL for cash or baskets
+    name        TEXT NOT NULL,
+    sector_id   INTEGER REFERENCES sectors(id),
+    country_id  INTEGER REFERENCES countries(id),
+    currency_id INTEGER REFERENCES currencies(id),
     CHECK (isin IS NULL OR (length(isin) = 12 AND isin = UPPER(isin)))
 );
 
 -- Deduplicate NULL-ISIN securities by (lower(name), currency, country)
 CREATE UNIQUE INDEX IF NOT EXISTS ux_securities_null_isin_name_cc
-ON securities(lower(name), ifnull(currency,''), ifnull(country,''))
+ON securities(lower(name), ifnull(currency_id, 0), ifnull(country_id, 0))
 WHERE isin IS NULL;
 
--- Latest-only ETF -> Security mapping (weight only)
+-- Near-duplicate NULL-ISIN securities folded into a canonical row by the
+-- offline dedup pass (utilities.dedup); upsert_security() follows these, so
+-- new holdings land on the canonical security
+CREATE TABLE IF NOT EXISTS security_aliases (
+    security_id  INTEGER PRIMARY KEY REFERENCES securities(id) ON DELETE CASCADE,
+    canonical_id INTEGER NOT NULL REFERENCES securities(id) ON DELETE CASCADE,
+    score        REAL    NOT NULL,  -- name similarity, 1 = same normalized name
+    CHECK (security_id <> canonical_id)
+);
+
+-- Holdings whose ISIN failed validation at load time (see utilities.isin)
+CREATE TABLE IF NOT EXISTS isin_quarantine (
+    etf_isin     TEXT NOT NULL,
+    raw_isin     TEXT NOT NULL,  -- as scraped
+    holding_name TEXT,
+    reason       TEXT NOT NULL CHECK (reason IN ('format', 'check_digit')),
+    seen_at      TEXT NOT NULL DEFAULT (datetime('now')),
+    PRIMARY KEY (etf_isin, raw_isin)
+) WITHOUT ROWID;
+
+-- Latest-only ETF -> Security mapping (weight only); past days live in holdings_history
 CREATE TABLE IF NOT EXISTS etf_holdings (
     etf_isin    TEXT    NOT NULL REFERENCES etfs(isin) ON DELETE CASCADE,
     security_id INTEGER NOT NULL REFERENCES securities(id) ON DELETE CASCADE,
@@ -70,6 +133,287 @@ CREATE TABLE IF NOT EXISTS etf_holdings (
     PRIMARY KEY (etf_isin, security_id)
 );
 
+-- Last refresh time per (ETF, field group), see utilities.refresh
+CREATE TABLE IF NOT EXISTS etf_refresh (
+    isin         TEXT NOT NULL REFERENCES etfs(isin) ON DELETE CASCADE,
+    field_group  TEXT NOT NULL,
+    refreshed_at TEXT NOT NULL,  -- 'YYYY-MM-DD HH:MM:SS' (UTC, as datetime('now'))
+    PRIMARY KEY (isin, field_group)
+) WITHOUT ROWID;
+
+-- Per-ETF progress of the holdings phase of a scraper run (utilities.journal):
+-- 'loaded' ETFs were committed, so an interrupted run resumes without them.
+-- Emptied once the run completes.
+CREATE TABLE IF NOT EXISTS scrape_journal (
+    issuer     TEXT NOT NULL,
+    isin       TEXT NOT NULL,
+    status     TEXT NOT NULL CHECK (status IN ('pending', 'loaded')),
+    updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+    PRIMARY KEY (issuer, isin)
+) WITHOUT ROWID;
+
+-- One row per scraper run with its headline metrics; `report` is the full
+-- JSON run report (stage timings, counters), see utilities.metrics
+CREATE TABLE IF NOT EXISTS scrape_runs (
+    id              INTEGER PRIMARY KEY,
+    issuer          TEXT NOT NULL,
+    started_at      TEXT NOT NULL,  -- 'YYYY-MM-DD HH:MM:SS' (UTC)
+    status          TEXT NOT NULL CHECK (status IN ('ok', 'failed', 'interrupted')),
+    seconds         REAL NOT NULL,
+    holdings        INTEGER NOT NULL,
+    rows_per_second REAL,
+    bytes           INTEGER NOT NULL,
+    retries         INTEGER NOT NULL,
+    cache_hits      INTEGER NOT NULL,
+    peak_rss_mb     REAL,
+    report          TEXT NOT NULL CHECK (json_valid(report))
+);
+
+-- NAV / AUM time series, one row per ETF and day (appended by utilities.prices);
+-- WITHOUT ROWID keeps each ETF's days clustered for range and as-of scans
+CREATE TABLE IF NOT EXISTS etf_prices (
+    isin TEXT NOT NULL REFERENCES etfs(isin) ON DELETE CASCADE,
+    date TEXT NOT NULL,  -- 'YYYY-MM-DD'
+    nav  REAL,
+    size REAL,
+    PRIMARY KEY (isin, date)
+) WITHOUT ROWID;
+
+-- Daily holdings history, stored as deltas against the previous snapshot
+-- (maintained by utilities.history). Every CHECKPOINT_EVERY-th snapshot of an
+-- ETF is a checkpoint holding the full list, so an as-of reconstruction only
+-- replays the deltas since the last checkpoint.
+CREATE TABLE IF NOT EXISTS holdings_snapshots (
+    etf_isin      TEXT    NOT NULL REFERENCES etfs(isin) ON DELETE CASCADE,
+    as_of         TEXT    NOT NULL,  -- 'YYYY-MM-DD'
+    is_checkpoint INTEGER NOT NULL CHECK (is_checkpoint IN (0, 1)),
+    PRIMARY KEY (etf_isin, as_of)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS holdings_history (
+    etf_isin    TEXT    NOT NULL,
+    as_of       TEXT    NOT NULL,
+    security_id INTEGER NOT NULL REFERENCES securities(id) ON DELETE CASCADE,
+    weight      REAL,  -- NULL = removed
+    prev_weight REAL,  -- NULL = added
+    PRIMARY KEY (etf_isin, as_of, security_id),
+    FOREIGN KEY (etf_isin, as_of) REFERENCES holdings_snapshots(etf_isin, as_of) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+-- ETF -> ETF edges (an ETF holding another ETF), kept in sync by the triggers below
+CREATE TABLE IF NOT EXISTS etf_nesting (
+    parent_isin TEXT NOT NULL REFERENCES etfs(isin) ON DELETE CASCADE,
+    child_isin  TEXT NOT NULL REFERENCES etfs(isin) ON DELETE CASCADE,
+    weight      REAL NOT NULL,
+    PRIMARY KEY (parent_isin, child_isin)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_nesting_holding_insert
+AFTER INSERT ON etf_holdings
+BEGIN
+    INSERT INTO etf_nesting(parent_isin, child_isin, weight)
+    SELECT NEW.etf_isin, e.isin, NEW.weight
+    FROM securities AS s
+    JOIN etfs       AS e ON e.isin = s.isin
+    WHERE s.id = NEW.security_id
+    ON CONFLICT(parent_isin, child_isin) DO UPDATE SET weight = excluded.weight;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_nesting_holding_update
+AFTER UPDATE OF weight ON etf_holdings
+BEGIN
+    UPDATE etf_nesting SET weight = NEW.weight
+    WHERE parent_isin = NEW.etf_isin
+      AND child_isin  = (SELECT isin FROM securities WHERE id = NEW.security_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_nesting_holding_delete
+AFTER DELETE ON etf_holdings
+BEGIN
+    DELETE FROM etf_nesting
+    WHERE parent_isin = OLD.etf_isin
+      AND child_isin  = (SELECT isin FROM securities WHERE id = OLD.security_id);
+END;
+
+-- A security may become an ETF after it was first seen as a holding
+CREATE TRIGGER IF NOT EXISTS trg_nesting_etf_insert
+AFTER INSERT ON etfs
+BEGIN
+    INSERT INTO etf_nesting(parent_isin, child_isin, weight)
+    SELECT eh.etf_isin, NEW.isin, eh.weight
+    FROM securities   AS s
+    JOIN etf_holdings AS eh ON eh.security_id = s.id
+    WHERE s.isin = NEW.isin
+    ON CONFLICT(parent_isin, child_isin) DO UPDATE SET weight = excluded.weight;
+END;
+
+-- One-off backfill for databases created before etf_nesting existed
+INSERT INTO etf_nesting(parent_isin, child_isin, weight)
+SELECT eh.etf_isin, e.isin, eh.weight
+FROM etf_holdings AS eh
+JOIN securities   AS s ON s.id = eh.security_id
+JOIN etfs         AS e ON e.isin = s.isin
+WHERE NOT EXISTS (SELECT 1 FROM etf_nesting)
+ON CONFLICT(parent_isin, child_isin) DO NOTHING;
+
+-- Fully unrolled ETF -> Security exposure, only for ETFs holding other ETFs
+-- (materialized by utilities.lookthrough)
+CREATE TABLE IF NOT EXISTS etf_lookthrough (
+    etf_isin    TEXT    NOT NULL REFERENCES etfs(isin) ON DELETE CASCADE,
+    security_id INTEGER NOT NULL REFERENCES securities(id) ON DELETE CASCADE,
+    weight      REAL    NOT NULL CHECK (weight >= 0.0),
+    depth       INTEGER NOT NULL,  -- deepest nesting level the weight came through
+    PRIMARY KEY (etf_isin, security_id)
+) WITHOUT ROWID;
+
+-- Look-through weight per ETF x sector x country x currency
+-- (materialized by utilities.exposure; NULL attributes stored as '')
+CREATE TABLE IF NOT EXISTS etf_exposures (
+    etf_isin TEXT NOT NULL REFERENCES etfs(isin) ON DELETE CASCADE,
+    sector   TEXT NOT NULL,
+    country  TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    weight   REAL NOT NULL,
+    PRIMARY KEY (etf_isin, sector, country, currency)
+) WITHOUT ROWID;
+
+-- Securities whose sector, country or currency changed since the cube was last
+-- refreshed: refresh_exposures() also recomputes every ETF holding them
+CREATE TABLE IF NOT EXISTS exposure_stale_securities (
+    security_id INTEGER PRIMARY KEY REFERENCES securities(id) ON DELETE CASCADE
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_exposure_security_update
+AFTER UPDATE OF sector_id, country_id, currency_id ON securities
+WHEN OLD.sector_id IS NOT NEW.sector_id
+  OR OLD.country_id IS NOT NEW.country_id
+  OR OLD.currency_id IS NOT NEW.currency_id
+BEGIN
+    INSERT INTO exposure_stale_securities(security_id) VALUES (NEW.id)
+    ON CONFLICT(security_id) DO NOTHING;
+END;
+
+-- Top-k most overlapping ETFs per ETF (materialized by utilities.overlap)
+CREATE TABLE IF NOT EXISTS etf_overlap (
+    etf_isin       TEXT NOT NULL REFERENCES etfs(isin) ON DELETE CASCADE,
+    neighbour_isin TEXT NOT NULL REFERENCES etfs(isin) ON DELETE CASCADE,
+    overlap        REAL NOT NULL,  -- sum of min(weight_a, weight_b), in %
+    cosine         REAL NOT NULL,  -- cosine similarity of the weight vectors
+    PRIMARY KEY (etf_isin, neighbour_isin)
+) WITHOUT ROWID;
+
+-- Weighted MinHash signatures + LSH buckets (maintained by utilities.similarity)
+CREATE TABLE IF NOT EXISTS etf_minhash (
+    etf_isin  TEXT PRIMARY KEY REFERENCES etfs(isin) ON DELETE CASCADE,
+    signature BLOB NOT NULL  -- int64 security ids, one per hash function
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS etf_lsh (
+    band     INTEGER NOT NULL,
+    bucket   INTEGER NOT NULL,
+    etf_isin TEXT    NOT NULL REFERENCES etfs(isin) ON DELETE CASCADE,
+    PRIMARY KEY (band, bucket, etf_isin)
+) WITHOUT ROWID;
+
+-- Full-text instrument search over ETFs and securities (queried by utilities.search).
+-- Securities use rowid = securities.id, ETFs negative rowids (found again by ISIN);
+-- trigram tokens give case-insensitive substring matching on every column.
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    name, ticker, isin,
+    tokenize = 'trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_search_etf_insert
+AFTER INSERT ON etfs
+BEGIN
+    INSERT INTO search_index(rowid, name, ticker, isin)
+    VALUES (
+        min(0, ifnull((SELECT rowid FROM search_index ORDER BY rowid LIMIT 1), 0)) - 1,
+        NEW.name, NEW.ticker, NEW.isin
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_search_etf_update
+AFTER UPDATE OF name, ticker ON etfs
+WHEN OLD.name IS NOT NEW.name OR OLD.ticker IS NOT NEW.ticker
+BEGIN
+    UPDATE search_index SET name = NEW.name, ticker = NEW.ticker
+    WHERE search_index MATCH 'isin:"' || NEW.isin || '"' AND rowid < 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_search_etf_delete
+AFTER DELETE ON etfs
+BEGIN
+    DELETE FROM search_index
+    WHERE search_index MATCH 'isin:"' || OLD.isin || '"' AND rowid < 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_search_security_insert
+AFTER INSERT ON securities
+BEGIN
+    INSERT INTO search_index(rowid, name, ticker, isin)
+    VALUES (NEW.id, NEW.name, NULL, NEW.isin);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_search_security_update
+AFTER UPDATE OF name, isin ON securities
+WHEN OLD.name IS NOT NEW.name OR OLD.isin IS NOT NEW.isin
+BEGIN
+    UPDATE search_index SET name = NEW.name, isin = NEW.isin
+    WHERE rowid = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_search_security_delete
+AFTER DELETE ON securities
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id;
+END;
+
+-- One-off backfill for databases created before search_index existed
+INSERT INTO search_index(rowid, name, ticker, isin)
+SELECT -row_number() OVER (ORDER BY isin), name, ticker, isin FROM etfs
+WHERE NOT EXISTS (SELECT 1 FROM search_index)
+UNION ALL
+SELECT id, name, NULL, isin FROM securities
+WHERE NOT EXISTS (SELECT 1 FROM search_index);
+
+-- ETFs and securities with their labels, as stored before the dimension tables
+CREATE VIEW IF NOT EXISTS v_etfs AS
+SELECT
+    e.isin,
+    i.name     AS issuer,
+    e.name,
+    e.ticker,
+    e.ter,
+    e.nav,
+    e.size,
+    cur.code   AS currency,
+    e.asset_class,
+    e.sub_asset_class,
+    e.region,
+    e.use_of_profits,
+    e.replication,
+    dom.iso3   AS domicile,
+    e.inception_date,
+    e.url
+FROM etfs AS e
+LEFT JOIN issuers    AS i   ON i.id   = e.issuer_id
+LEFT JOIN currencies AS cur ON cur.id = e.currency_id
+LEFT JOIN countries  AS dom ON dom.id = e.domicile_id;
+
+CREATE VIEW IF NOT EXISTS v_securities AS
+SELECT
+    s.id,
+    s.isin,
+    s.name,
+    sec.name   AS sector,
+    c.iso3     AS country,
+    cur.code   AS currency
+FROM securities AS s
+LEFT JOIN sectors    AS sec ON sec.id = s.sector_id
+LEFT JOIN countries  AS c   ON c.id   = s.country_id
+LEFT JOIN currencies AS cur ON cur.id = s.currency_id;
+
 -- App-friendly read layer
 CREATE VIEW IF NOT EXISTS v_holdings AS
 SELECT
@@ -81,39 +425,212 @@ SELECT
     s.currency,
     eh.weight
 FROM etf_holdings AS eh
-JOIN securities   AS s  ON s.id = eh.security_id;
+JOIN v_securities AS s  ON s.id = eh.security_id;
+
+-- Same as v_holdings, with nested ETFs unrolled
+CREATE VIEW IF NOT EXISTS v_lookthrough AS
+SELECT
+    x.etf_isin,
+    s.isin     AS holding_isin,
+    s.name     AS holding_name,
+    s.sector,
+    s.country,
+    s.currency,
+    x.weight
+FROM (
+    SELECT etf_isin, security_id, weight FROM etf_lookthrough
+    UNION ALL
+    SELECT eh.etf_isin, eh.security_id, eh.weight
+    FROM etf_holdings AS eh
+    WHERE NOT EXISTS (SELECT 1 FROM etf_lookthrough AS lt WHERE lt.etf_isin = eh.etf_isin)
+) AS x
+JOIN v_securities AS s ON s.id = x.security_id;
 
 -- Indexing strategy
-CREATE INDEX IF NOT EXISTS  idx_securities_sector   ON securities(sector);
-CREATE INDEX IF NOT EXISTS  idx_securities_country  ON securities(country);
+CREATE INDEX IF NOT EXISTS  idx_securities_sector   ON securities(sector_id);
+CREATE INDEX IF NOT EXISTS  idx_securities_country  ON securities(country_id);
+CREATE INDEX IF NOT EXISTS  idx_etfs_issuer         ON etfs(issuer_id);
 CREATE INDEX IF NOT EXISTS  idx_holdings_etf        ON etf_holdings(etf_isin);     -- fast "holdings of ETF X"
-CREATE INDEX IF NOT EXISTS  idx_holdings_security   ON etf_holdings(security_id);  -- fast "ETFs holding Y"
+CREATE INDEX IF NOT EXISTS  idx_lsh_etf             ON etf_lsh(etf_isin);          -- buckets of ETF X
+CREATE INDEX IF NOT EXISTS  idx_nesting_child       ON etf_nesting(child_isin);    -- fast "parents of nested ETF X"
+CREATE INDEX IF NOT EXISTS  idx_etfs_ticker         ON etfs(ticker COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS  idx_securities_name_norm ON securities(lower(trim(name))); -- name prefix lookups
+CREATE INDEX IF NOT EXISTS  idx_scrape_runs_issuer  ON scrape_runs(issuer, started_at); -- run history per issuer
+
+-- "ETFs holding Y", already in weight order (keyset pagination, see utilities.holders)
+DROP INDEX IF EXISTS idx_holdings_security;
+CREATE INDEX IF NOT EXISTS  idx_holdings_security_weight
+ON etf_holdings(security_id, weight DESC, etf_isin);
+"""
+)
+
+
+# Databases created before the dimension tables kept the labels inline as TEXT:
+# move them into the dimension tables and swap the columns for integer keys.
+# (issuer_id stays nullable there, ADD COLUMN cannot add a NOT NULL reference.)
+MIGRATE_DIMENSIONS = r"""
+DROP VIEW IF EXISTS v_holdings;
+DROP VIEW IF EXISTS v_lookthrough;
+DROP INDEX IF EXISTS idx_securities_sector;
+DROP INDEX IF EXISTS idx_securities_country;
+DROP INDEX IF EXISTS ux_securities_null_isin_name_cc;
+
+INSERT OR IGNORE INTO issuers(name) SELECT DISTINCT issuer FROM etfs;
+INSERT OR IGNORE INTO sectors(name)
+SELECT DISTINCT sector FROM securities WHERE sector IS NOT NULL;
+INSERT OR IGNORE INTO countries(iso3)
+SELECT country FROM securities WHERE country IS NOT NULL
+UNION SELECT domicile FROM etfs WHERE domicile IS NOT NULL;
+INSERT OR IGNORE INTO currencies(code)
+SELECT currency FROM securities WHERE currency IS NOT NULL
+UNION SELECT currency FROM etfs WHERE currency IS NOT NULL;
+
+ALTER TABLE etfs ADD COLUMN issuer_id   INTEGER REFERENCES issuers(id);
+ALTER TABLE etfs ADD COLUMN currency_id INTEGER REFERENCES currencies(id);
+ALTER TABLE etfs ADD COLUMN domicile_id INTEGER REFERENCES countries(id);
+UPDATE etfs SET
+    issuer_id   = (SELECT id FROM issuers    WHERE name = etfs.issuer),
+    currency_id = (SELECT id FROM currencies WHERE code = etfs.currency),
+    domicile_id = (SELECT id FROM countries  WHERE iso3 = etfs.domicile);
+ALTER TABLE etfs DROP COLUMN issuer;
+ALTER TABLE etfs DROP COLUMN currency;
+ALTER TABLE etfs DROP COLUMN domicile;
+
+ALTER TABLE securities ADD COLUMN sector_id   INTEGER REFERENCES sectors(id);
+ALTER TABLE securities ADD COLUMN country_id  INTEGER REFERENCES countries(id);
+ALTER TABLE securities ADD COLUMN currency_id INTEGER REFERENCES currencies(id);
+UPDATE securities SET
+    sector_id   = (SELECT id FROM sectors    WHERE name = securities.sector),
+    country_id  = (SELECT id FROM countries  WHERE iso3 = securities.country),
+    currency_id = (SELECT id FROM currencies WHERE code = securities.currency);
+ALTER TABLE securities DROP COLUMN sector;
+ALTER TABLE securities DROP COLUMN country;
+ALTER TABLE securities DROP COLUMN currency;
 """
 
 
+def _has_inline_labels(conn: sqlite3.Connection) -> bool:
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(securities);")}
+    return "sector" in columns
+
+
 def setup_database(conn: sqlite3.Connection, *, drop_and_recreate: bool = True) -> None:
     """
-    Create the normalized schema
+    Create the normalized schema (migrating databases with inline labels)
     """
     with conn:
+        if _has_inline_labels(conn):
+            conn.executescript(DIMENSIONS_DDL + MIGRATE_DIMENSIONS)
         conn.executescript(DDL)
 
 
+# ---------------------------------------------------------------------------
+# Dimension keys
+# ---------------------------------------------------------------------------
+# Label columns stored as a key into a dimension table: column -> (table, label)
+DIMENSIONS = {
+    "issuer": ("issuers", "name"),
+    "sector": ("sectors", "name"),
+    "country": ("countries", "iso3"),
+    "domicile": ("countries", "iso3"),
+    "currency": ("currencies", "code"),
+}
+
+
+def dimension_id(
+    conn: sqlite3.Connection, column: str, label: Optional[str]
+) -> Optional[int]:
+    """Key of `label` in `column`'s dimension table, inserted if new."""
+    if label is None:
+        return None
+    table, field = DIMENSIONS[column]
+    row = conn.execute(
+        f"SELECT id FROM {table} WHERE {field} = ?;", (label,)
+    ).fetchone()
+    if row:
+        return row[0]
+    return conn.execute(f"INSERT INTO {table}({field}) VALUES (?);", (label,)).lastrowid
+
+
+def dimension_ids(
+    conn: sqlite3.Connection, column: str, labels: Iterable[Optional[str]]
+) -> Dict[str, int]:
+    """Batched dimension_id(): {label: key} for every non-null label."""
+    table, field = DIMENSIONS[column]
+    labels = sorted({label for label in labels if label is not None})
+    conn.executemany(
+        f"INSERT INTO {table}({field}) VALUES (?) ON CONFLICT({field}) DO NOTHING;",
+        ((label,) for label in labels),
+    )
+    return dict(
+        conn.execute(
+            f"SELECT {field}, id FROM {table} WHERE {field} IN (SELECT value FROM json_each(?));",
+            (json.dumps(labels),),
+        )
+    )
+
+
 # ---------------------------------------------------------------------------
 # Upsert helpers for scrapers (clean, simple, transaction-friendly)
 # ---------------------------------------------------------------------------
 def upsert_etf(conn: sqlite3.Connection, etf_tuple: Tuple) -> None:
     """
-    Insert or replace an ETF. etf_tuple must match the order produced by utilities.common.ETF.to_db_tuple().
+    Insert or update an ETF. etf_tuple must match the order produced by utilities.common.ETF.to_db_tuple().
+    - Existing rows are updated in place (never deleted, so holdings survive).
+    - Non-null incoming attributes overwrite, NULLs never wipe existing values.
+    """
+    upsert_etfs(conn, [etf_tuple])
+
+
+def upsert_etfs(conn: sqlite3.Connection, rows: Iterable[Tuple]) -> None:
+    """
+    Batched upsert_etf(): one executemany over many ETF.to_db_tuple() rows.
+    """
+    upsert_etf_columns(conn, rows, ETF_COLUMNS)
+
+
+def upsert_etf_columns(
+    conn: sqlite3.Connection, etf_tuples: Iterable[Tuple], columns: Sequence[str]
+) -> None:
     """
-    sql = """
-    INSERT OR REPLACE INTO etfs
-    (isin, issuer, name, ticker, ter, nav, size, currency, asset_class,
-     sub_asset_class, region, use_of_profits, replication, domicile,
-     inception_date, url)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+    Write only `columns` of the given ETF tuples (ETF.to_db_tuple() order).
+    New ETFs are inserted; existing rows are updated in place with
+    ON CONFLICT DO UPDATE, only when a non-null incoming value differs.
+    Issuer, currency and domicile labels are stored as dimension keys.
     """
-    conn.execute(sql, etf_tuple)
+    columns = [c for c in columns if c not in ("isin", "issuer")]
+    names = ("isin", "issuer", *columns)
+    idx = [ETF_COLUMNS.index(c) for c in names]
+    rows = [[t[i] for i in idx] for t in etf_tuples]
+    for pos, name in enumerate(names):
+        if name in DIMENSIONS:
+            ids = dimension_ids(conn, name, (row[pos] for row in rows))
+            for row in rows:
+                row[pos] = ids.get(row[pos])
+
+    stored = [f"{c}_id" if c in DIMENSIONS else c for c in names]
+    insert_cols = ", ".join(stored)
+    placeholders = ", ".join("?" for _ in idx)
+
+    if columns:
+        updated = stored[2:]
+        assignments = ",\n".join(
+            f"{c} = COALESCE(excluded.{c}, etfs.{c})" for c in updated
+        )
+        changed = " OR ".join(
+            f"(excluded.{c} IS NOT NULL AND excluded.{c} IS NOT etfs.{c})"
+            for c in updated
+        )
+        conflict = f"DO UPDATE SET {assignments} WHERE {changed}"
+    else:
+        conflict = "DO NOTHING"
+
+    sql = f"""
+    INSERT INTO etfs ({insert_cols})
+    VALUES ({placeholders})
+    ON CONFLICT(isin) {conflict};
+    """
+    conn.executemany(sql, rows)
 
 
 def _select_security_id(
@@ -121,8 +638,8 @@ def _select_security_id(
     *,
     isin: Optional[str],
     name: str,
-    currency: Optional[str],
-    country: Optional[str],
+    currency_id: Optional[int],
+    country_id: Optional[int],
 ) -> Optional[int]:
     cur = conn.cursor()
     if isin:
@@ -133,10 +650,10 @@ def _select_security_id(
             SELECT id FROM securities
             WHERE isin IS NULL
               AND lower(name) = lower(?)
-              AND ifnull(currency,'') = ifnull(?,'')
-              AND ifnull(country,'')  = ifnull(?,'')
+              AND ifnull(currency_id, 0) = ifnull(?, 0)
+              AND ifnull(country_id, 0)  = ifnull(?, 0)
             """,
-            (name, currency, country),
+            (name, currency_id, country_id),
         )
     row = cur.fetchone()
     return row[0] if row else None
@@ -156,16 +673,23 @@ def upsert_security(
     - If ISIN is present: de-duplicate by ISIN (global).
     - If ISIN is NULL: de-duplicate by (lower(name), currency, country).
     - Non-null incoming attributes overwrite NULLs, but never the other way round.
+    - NULL-ISIN rows merged by utilities.dedup resolve to their canonical id.
     """
     assert name, "security.name is required"
 
+    sector_id = dimension_id(conn, "sector", sector)
+    country_id = dimension_id(conn, "country", country)
+    currency_id = dimension_id(conn, "currency", currency)
     existing_id = _select_security_id(
-        conn, isin=isin, name=name, currency=currency, country=country
+        conn, isin=isin, name=name, currency_id=currency_id, country_id=country_id
     )
     if existing_id is None:
         cur = conn.execute(
-            "INSERT INTO securities(isin, name, sector, country, currency) VALUES (?, ?, ?, ?, ?)",
-            (isin, name, sector, country, currency),
+            """
+            INSERT INTO securities(isin, name, sector_id, country_id, currency_id)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (isin, name, sector_id, country_id, currency_id),
         )
         return cur.lastrowid
 
@@ -173,15 +697,21 @@ def upsert_security(
     conn.execute(
         """
         UPDATE securities
-           SET name     = COALESCE(?, name),
-               sector   = COALESCE(?, sector),
-               country  = COALESCE(?, country),
-               currency = COALESCE(?, currency)
+           SET name        = COALESCE(?, name),
+               sector_id   = COALESCE(?, sector_id),
+               country_id  = COALESCE(?, country_id),
+               currency_id = COALESCE(?, currency_id)
          WHERE id = ?;
         """,
-        (name, sector, country, currency, existing_id),
+        (name, sector_id, country_id, currency_id, existing_id),
     )
-    return existing_id
+    if isin:
+        return existing_id
+    row = conn.execute(
+        "SELECT canonical_id FROM security_aliases WHERE security_id = ?;",
+        (existing_id,),
+    ).fetchone()
+    return row[0] if row else existing_id
 
 
 def upsert_holding(
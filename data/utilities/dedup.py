@@ -0,0 +1,262 @@
+import re
+import sqlite3
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+import polars as pl
+
+# Distinct names at or above this similarity (0..1) within a block are merged
+MIN_SIMILARITY = 0.85
+# Blocks are keyed on the first PREFIX characters of each word of a name
+PREFIX = 3
+# Blocks larger than this are split on the whole word, and skipped by
+# the fuzzy pass if still too large (exact duplicates are merged regardless)
+MAX_BLOCK = 500
+
+# Legal-form and filler words that don't tell two holdings apart
+STOPWORDS = frozenset(
+    {"the", "and", "of", "inc", "corp", "corporation", "co", "company", "ltd"}
+    | {"limited", "plc", "sa", "ag", "nv", "spa", "llc"}
+)
+CASH_WORDS = frozenset({"cash", "currency", "ccy"})
+# Spelled-out currencies, rewritten to their code before comparing
+CURRENCY_NAMES = {
+    "us dollar": "usd",
+    "u s dollar": "usd",
+    "united states dollar": "usd",
+    "euro": "eur",
+    "pound sterling": "gbp",
+    "british pound": "gbp",
+    "sterling": "gbp",
+    "japanese yen": "jpy",
+    "yen": "jpy",
+    "swiss franc": "chf",
+    "canadian dollar": "cad",
+    "australian dollar": "aud",
+    "new zealand dollar": "nzd",
+    "hong kong dollar": "hkd",
+    "singapore dollar": "sgd",
+    "danish krone": "dkk",
+    "norwegian krone": "nok",
+    "swedish krona": "sek",
+    "chinese yuan": "cny",
+    "renminbi": "cny",
+}
+
+ALIASES_SCHEMA = {
+    "security_id": pl.Int64,
+    "canonical_id": pl.Int64,
+    "score": pl.Float64,
+}
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+_CURRENCY_NAME = re.compile(
+    r"\b(" + "|".join(sorted(CURRENCY_NAMES, key=len, reverse=True)) + r")\b"
+)
+
+
+# ---------------------------------------------------------------------------
+# Name normalization
+# ---------------------------------------------------------------------------
+def name_key(name: str, currency_codes: FrozenSet[str]) -> str:
+    """
+    Comparable form of a holding name: casefolded words without punctuation or
+    legal-form filler, spelled-out currencies as codes, words sorted and then
+    numbers sorted. Cash-like names ("USD CASH", "US DOLLAR") become "cash usd".
+    """
+    text = " ".join(_NON_WORD.split(name.casefold()))
+    text = _CURRENCY_NAME.sub(lambda m: CURRENCY_NAMES[m.group(1)], text)
+    tokens = [t for t in text.split() if t not in STOPWORDS]
+
+    codes = sorted({t for t in tokens if t in currency_codes})
+    if codes and all(t in CASH_WORDS or t in currency_codes for t in tokens):
+        return " ".join(["cash", *codes])
+    words = sorted(t for t in tokens if not t.isdigit())
+    numbers = sorted(t for t in tokens if t.isdigit())
+    return " ".join(words + numbers)
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _markers(key: str) -> List[str]:
+    # Numbers (coupons, maturities) and single letters (share classes) must
+    # match exactly: "ALPHABET CLASS A" is not "ALPHABET CLASS C"
+    return [t for t in key.split() if t.isdigit() or len(t) == 1]
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """Dice coefficient of two trigram sets."""
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 1.0
+
+
+# ---------------------------------------------------------------------------
+# Offline pass
+# ---------------------------------------------------------------------------
+def _blocks(keys: Iterable[Tuple]) -> Dict[Tuple, List[str]]:
+    """
+    Token blocking of (currency_id, country_id, key): a key joins one block
+    per word, keyed on currency, country, markers and the word's prefix, so a
+    truncated or reordered word elsewhere in the name still meets its match.
+    Oversized blocks are split on the whole word.
+    """
+    blocks: Dict[Tuple, List[str]] = defaultdict(list)
+    for currency_id, country_id, key in keys:
+        block = (currency_id, country_id, *_markers(key))
+        for word in {w for w in key.split() if len(w) >= PREFIX and not w.isdigit()}:
+            blocks[(*block, word[:PREFIX])].append((word, key))
+
+    split: Dict[Tuple, List[str]] = {}
+    for block, members in blocks.items():
+        if len(members) <= MAX_BLOCK:
+            split[block] = [key for _, key in members]
+            continue
+        for word, key in members:
+            split.setdefault((*block[:-1], word), []).append(key)
+    return split
+
+
+def find_duplicates(
+    conn: sqlite3.Connection, min_similarity: float = MIN_SIMILARITY
+) -> Tuple[pl.DataFrame, dict]:
+    """
+    Cluster NULL-ISIN securities that name the same holding. Candidates are
+    blocked by currency, country, numbers and single letters (coupons,
+    maturities, share classes must agree) and the prefix of any of their words.
+    Within a block, names with the same key merge outright and other keys
+    merge when their trigram similarity reaches `min_similarity`. Each
+    cluster's canonical row is its lowest id.
+    Returns (security_id, canonical_id, score) for every non-canonical
+    security, plus merge statistics.
+    """
+    currency_codes = frozenset(
+        code.lower() for (code,) in conn.execute("SELECT code FROM currencies;")
+    ) | frozenset(CURRENCY_NAMES.values())
+    rows = conn.execute(
+        """
+        SELECT id, name, currency_id, country_id FROM securities
+         WHERE isin IS NULL
+         ORDER BY id;
+        """
+    ).fetchall()
+
+    # Exact duplicates after normalization: one entry per distinct key
+    ids_by_key: Dict[Tuple, List[int]] = defaultdict(list)
+    for security_id, name, currency_id, country_id in rows:
+        ids_by_key[(currency_id, country_id, name_key(name, currency_codes))].append(
+            security_id
+        )
+
+    # Union-find over distinct keys
+    parent = {k: k for k in ids_by_key}
+    best: Dict[Tuple, float] = {}
+
+    def find(k):
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    blocks = _blocks(ids_by_key)
+    comparisons = fuzzy = oversized = 0
+    for (currency_id, country_id, *_), keys in blocks.items():
+        if len(keys) > MAX_BLOCK:
+            oversized += 1
+            continue
+        grams = [_trigrams(k) for k in keys]
+        sizes = [len(g) for g in grams]
+        for i in range(len(keys)):
+            for j in range(i + 1, len(keys)):
+                comparisons += 1
+                # Dice can't reach the threshold when the sizes are too far apart
+                if 2 * min(sizes[i], sizes[j]) < min_similarity * (sizes[i] + sizes[j]):
+                    continue
+                score = similarity(grams[i], grams[j])
+                if score < min_similarity:
+                    continue
+                a = (currency_id, country_id, keys[i])
+                b = (currency_id, country_id, keys[j])
+                if find(a) == find(b):
+                    continue  # already merged (pairs sharing several words meet again)
+                fuzzy += 1
+                best[a] = max(best.get(a, 0.0), score)
+                best[b] = max(best.get(b, 0.0), score)
+                parent[find(a)] = find(b)
+
+    clusters: Dict[Tuple, List[Tuple[int, Tuple]]] = defaultdict(list)
+    for key, ids in ids_by_key.items():
+        clusters[find(key)].extend((security_id, key) for security_id in ids)
+
+    aliases = []
+    merged_clusters = 0
+    for members in clusters.values():
+        if len(members) < 2:
+            continue
+        merged_clusters += 1
+        canonical, canonical_key = min(members)
+        # Same key as the canonical row scores 1, fuzzy matches their best pair
+        aliases.extend(
+            (security_id, canonical, 1.0 if key == canonical_key else best[key])
+            for security_id, key in members
+            if security_id != canonical
+        )
+
+    stats = {
+        "securities": len(rows),
+        "distinct_keys": len(ids_by_key),
+        "blocks": len(blocks),
+        "oversized_blocks": oversized,
+        "comparisons": comparisons,
+        "fuzzy_matches": fuzzy,
+        "clusters": merged_clusters,
+        "aliases": len(aliases),
+        "largest_cluster": max((len(m) for m in clusters.values()), default=0),
+    }
+    return pl.DataFrame(aliases, schema=ALIASES_SCHEMA, orient="row"), stats
+
+
+def write_aliases(conn: sqlite3.Connection, aliases: pl.DataFrame) -> None:
+    """Replace security_aliases with `aliases` (find_duplicates() output)."""
+    conn.execute("DELETE FROM security_aliases;")
+    conn.executemany(
+        "INSERT INTO security_aliases(security_id, canonical_id, score) VALUES (?, ?, ?);",
+        aliases.iter_rows(),
+    )
+
+
+def apply_aliases(conn: sqlite3.Connection) -> List[str]:
+    """
+    Move existing holdings of aliased securities onto their canonical row
+    (weights of the same ETF add up). Returns the ETFs whose holdings changed,
+    for refresh_derived().
+    """
+    changed = [
+        isin
+        for (isin,) in conn.execute(
+            """
+            SELECT DISTINCT eh.etf_isin FROM etf_holdings AS eh
+              JOIN security_aliases AS a ON a.security_id = eh.security_id;
+            """
+        )
+    ]
+    conn.execute(
+        """
+        INSERT INTO etf_holdings(etf_isin, security_id, weight)
+        SELECT eh.etf_isin, a.canonical_id, min(SUM(eh.weight), 100.0)
+          FROM etf_holdings AS eh
+          JOIN security_aliases AS a ON a.security_id = eh.security_id
+         WHERE true
+         GROUP BY eh.etf_isin, a.canonical_id
+        ON CONFLICT(etf_isin, security_id) DO UPDATE SET
+            weight = min(etf_holdings.weight + excluded.weight, 100.0);
+        """
+    )
+    conn.execute(
+        """
+        DELETE FROM etf_holdings
+         WHERE security_id IN (SELECT security_id FROM security_aliases);
+        """
+    )
+    return changed
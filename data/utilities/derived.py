@@ -0,0 +1,33 @@
+import sqlite3
+from typing import Iterable
+
+from .exposure import refresh_exposures
+from .history import record_snapshot
+from .lookthrough import refresh_lookthrough
+from .overlap import refresh_overlap
+from .similarity import refresh_similarity_index
+
+
+def refresh_derived(
+    conn: sqlite3.Connection, changed_isins: Iterable[str] | None = None
+) -> None:
+    """
+    Bring every table derived from etf_holdings up to date after a load.
+    `changed_isins` are the ETFs whose holdings were rewritten; None rebuilds all.
+    """
+    changed = None if changed_isins is None else list(changed_isins)
+
+    print("Recording holdings history...")
+    record_snapshot(conn, changed)
+
+    print("Refreshing look-through exposures...")
+    refresh_lookthrough(conn, changed)
+
+    print("Refreshing exposure cube...")
+    refresh_exposures(conn, changed)
+
+    print("Refreshing ETF overlaps...")
+    refresh_overlap(conn, changed)
+
+    print("Refreshing similarity index...")
+    refresh_similarity_index(conn, changed)
@@ -0,0 +1,235 @@
+import sqlite3
+from typing import Dict, Hashable, Iterable, NamedTuple
+
+import polars as pl
+
+from .nesting import ancestors
+
+
+class Exposure(NamedTuple):
+    """Portfolio breakdowns, weights in % of each portfolio."""
+
+    holdings: pl.DataFrame
+    sectors: pl.DataFrame
+    countries: pl.DataFrame
+    currencies: pl.DataFrame
+
+
+# Look-through weights: unrolled where available, raw holdings otherwise
+LOOKTHROUGH_CTE = """
+x AS (
+    SELECT etf_isin, security_id, weight FROM etf_lookthrough
+    UNION ALL
+    SELECT eh.etf_isin, eh.security_id, eh.weight
+    FROM etf_holdings AS eh
+    WHERE NOT EXISTS (SELECT 1 FROM etf_lookthrough AS lt WHERE lt.etf_isin = eh.etf_isin)
+)
+"""
+
+# Aggregated per (portfolio, security) in a single pass
+EXPOSURE_SQL = f"""
+WITH {LOOKTHROUGH_CTE}
+SELECT
+    w.portfolio,
+    s.id        AS security_id,
+    s.isin      AS holding_isin,
+    s.name      AS holding_name,
+    s.sector,
+    s.country,
+    s.currency,
+    SUM(w.fraction * x.weight) AS weight
+FROM temp.portfolio_weights AS w
+JOIN x            ON x.etf_isin = w.etf_isin
+JOIN v_securities AS s ON s.id = x.security_id
+WHERE x.weight > 0
+GROUP BY w.portfolio, s.id;
+"""
+
+# Weighted sum over the precomputed etf_exposures cube
+CUBE_SQL = """
+SELECT
+    w.portfolio,
+    NULLIF(e.sector, '')   AS sector,
+    NULLIF(e.country, '')  AS country,
+    NULLIF(e.currency, '') AS currency,
+    SUM(w.fraction * e.weight) AS weight
+FROM temp.portfolio_weights AS w
+JOIN etf_exposures AS e ON e.etf_isin = w.etf_isin
+GROUP BY w.portfolio, e.sector, e.country, e.currency;
+"""
+
+HOLDINGS_SCHEMA = {
+    "portfolio": pl.String,
+    "security_id": pl.Int64,
+    "holding_isin": pl.String,
+    "holding_name": pl.String,
+    "sector": pl.String,
+    "country": pl.String,
+    "currency": pl.String,
+    "weight": pl.Float64,
+}
+
+
+CUBE_SCHEMA = {
+    "portfolio": pl.String,
+    "sector": pl.String,
+    "country": pl.String,
+    "currency": pl.String,
+    "weight": pl.Float64,
+}
+
+
+# ---------------------------------------------------------------------------
+# Materialized ETF x sector x country x currency cube
+# ---------------------------------------------------------------------------
+def _cube_missing(conn: sqlite3.Connection) -> bool:
+    # Empty cube next to loaded holdings: new table on an existing database
+    return conn.execute(
+        """
+        SELECT NOT EXISTS (SELECT 1 FROM etf_exposures)
+           AND EXISTS (SELECT 1 FROM etf_holdings);
+        """
+    ).fetchone()[0]
+
+
+def _holders_of_stale_securities(conn: sqlite3.Connection) -> set:
+    # ETFs holding, directly or through nested ETFs, a security whose
+    # sector/country/currency changed (see exposure_stale_securities)
+    return {
+        isin
+        for (isin,) in conn.execute(
+            """
+            SELECT etf_isin FROM etf_holdings
+             WHERE security_id IN (SELECT security_id FROM exposure_stale_securities)
+            UNION
+            SELECT etf_isin FROM etf_lookthrough
+             WHERE security_id IN (SELECT security_id FROM exposure_stale_securities);
+            """
+        )
+    }
+
+
+def refresh_exposures(
+    conn: sqlite3.Connection, changed_isins: Iterable[str] | None = None
+) -> None:
+    """
+    Recompute etf_exposures for ETFs whose holdings changed, every ETF that
+    (transitively) holds them, since their look-through changed too, and every
+    ETF holding a security whose sector, country or currency changed.
+    None rebuilds the whole cube, as does the first refresh of an empty cube
+    on a database that already has holdings. Run after refresh_lookthrough().
+    """
+    sql = f"""
+    INSERT INTO etf_exposures(etf_isin, sector, country, currency, weight)
+    WITH {LOOKTHROUGH_CTE},
+    cube AS (
+        SELECT x.etf_isin, s.sector_id, s.country_id, s.currency_id,
+               SUM(x.weight) AS weight
+          FROM x
+          JOIN securities AS s ON s.id = x.security_id
+         WHERE {{where}}
+         GROUP BY 1, 2, 3, 4
+    )
+    SELECT c.etf_isin,
+           ifnull(sec.name, ''), ifnull(cty.iso3, ''), ifnull(cur.code, ''),
+           c.weight
+      FROM cube AS c
+      LEFT JOIN sectors    AS sec ON sec.id = c.sector_id
+      LEFT JOIN countries  AS cty ON cty.id = c.country_id
+      LEFT JOIN currencies AS cur ON cur.id = c.currency_id;
+    """
+    if changed_isins is None or _cube_missing(conn):
+        conn.execute("DELETE FROM etf_exposures;")
+        conn.execute(sql.format(where="1"))
+        conn.execute("DELETE FROM exposure_stale_securities;")
+        return
+
+    changed = set(changed_isins) | _holders_of_stale_securities(conn)
+    conn.execute("DELETE FROM exposure_stale_securities;")
+    affected = list(changed | ancestors(conn, changed))
+    if not affected:
+        return
+    placeholders = ", ".join("?" for _ in affected)
+    conn.execute(
+        f"DELETE FROM etf_exposures WHERE etf_isin IN ({placeholders})", affected
+    )
+    conn.execute(sql.format(where=f"x.etf_isin IN ({placeholders})"), affected)
+
+
+# ---------------------------------------------------------------------------
+# Portfolio exposure
+# ---------------------------------------------------------------------------
+def _breakdown(cube: pl.DataFrame, by: str) -> pl.DataFrame:
+    return (
+        cube.group_by("portfolio", by)
+        .agg(pl.sum("weight"))
+        .sort("portfolio", "weight", descending=[False, True])
+    )
+
+
+def portfolios_exposure(
+    conn: sqlite3.Connection,
+    portfolios: Dict[Hashable, Dict[str, float]],
+    *,
+    holdings: bool = True,
+) -> Exposure:
+    """
+    Batch version of portfolio_exposure(): {portfolio_id: {etf_isin: amount}}.
+    All portfolios go through one temp table; every frame has a `portfolio`
+    column (ids are stringified). Sector/country/currency come from the small
+    etf_exposures cube (built first if a database predates it);
+    holdings=False skips the holding-level pass entirely.
+    """
+    if _cube_missing(conn):
+        with conn:
+            refresh_exposures(conn)
+
+    rows = []
+    for pid, amounts in portfolios.items():
+        total = sum(amounts.values())
+        if not total:
+            continue
+        rows.extend(
+            (str(pid), isin, amount / total) for isin, amount in amounts.items()
+        )
+
+    conn.execute(
+        """
+        CREATE TEMP TABLE IF NOT EXISTS portfolio_weights (
+            portfolio TEXT NOT NULL,
+            etf_isin  TEXT NOT NULL,
+            fraction  REAL NOT NULL
+        );
+        """
+    )
+    conn.execute("DELETE FROM temp.portfolio_weights;")
+    conn.executemany("INSERT INTO temp.portfolio_weights VALUES (?, ?, ?);", rows)
+    try:
+        cube = pl.DataFrame(
+            conn.execute(CUBE_SQL).fetchall(), schema=CUBE_SCHEMA, orient="row"
+        )
+        by_holding = pl.DataFrame(schema=HOLDINGS_SCHEMA)
+        if holdings:
+            by_holding = pl.DataFrame(
+                conn.execute(EXPOSURE_SQL).fetchall(),
+                schema=HOLDINGS_SCHEMA,
+                orient="row",
+            ).sort("portfolio", "weight", descending=[False, True])
+    finally:
+        conn.execute("DELETE FROM temp.portfolio_weights;")
+
+    return Exposure(
+        holdings=by_holding,
+        sectors=_breakdown(cube, "sector"),
+        countries=_breakdown(cube, "country"),
+        currencies=_breakdown(cube, "currency"),
+    )
+
+
+def portfolio_exposure(conn: sqlite3.Connection, amounts: Dict[str, float]) -> Exposure:
+    """
+    Holding, sector, country and currency exposure of {etf_isin: amount}.
+    Amounts are normalized to portfolio weights; nested ETFs are looked through.
+    """
+    exposure = portfolios_exposure(conn, {"portfolio": amounts})
+    return Exposure(*(frame.drop("portfolio") for frame in exposure))
@@ -0,0 +1,258 @@
+import datetime
+import json
+import sqlite3
+from typing import Iterable, List
+
+import polars as pl
+
+# Every N-th recorded snapshot of an ETF stores its full holdings list
+CHECKPOINT_EVERY = 30
+
+HOLDINGS_SCHEMA = {
+    "etf_isin": pl.String,
+    "security_id": pl.Int64,
+    "weight": pl.Float64,
+}
+
+TURNOVER_SCHEMA = {
+    "etf_isin": pl.String,
+    "snapshots": pl.Int64,
+    "turnover": pl.Float64,
+}
+
+DRIFT_SCHEMA = {
+    "etf_isin": pl.String,
+    "security_id": pl.Int64,
+    "holding_isin": pl.String,
+    "holding_name": pl.String,
+    "weight_start": pl.Float64,
+    "weight_end": pl.Float64,
+    "change": pl.Float64,
+}
+
+# Snapshots of an ETF after its first one (the first is a load, not a trade)
+NOT_FIRST = """
+h.as_of > (SELECT min(f.as_of) FROM holdings_snapshots AS f WHERE f.etf_isin = h.etf_isin)
+"""
+
+
+def _isin_filter(column: str, isins: Iterable[str] | None) -> tuple[str, list]:
+    if isins is None:
+        return "1", []
+    return f"{column} IN (SELECT value FROM json_each(?))", [json.dumps(list(isins))]
+
+
+# ---------------------------------------------------------------------------
+# Reconstruction
+# ---------------------------------------------------------------------------
+def holdings_as_of(
+    conn: sqlite3.Connection, isins: Iterable[str] | None, as_of: str
+) -> pl.DataFrame:
+    """
+    Holdings (etf_isin, security_id, weight) of `isins` (None = every ETF) as
+    recorded on or before `as_of` ('YYYY-MM-DD'): the last checkpoint up to that
+    date, with the later deltas replayed on top (last write per security wins).
+    """
+    where, params = _isin_filter("etf_isin", isins)
+    sql = f"""
+    WITH cp AS (
+        SELECT etf_isin, max(as_of) AS since
+          FROM holdings_snapshots
+         WHERE {where} AND as_of <= ? AND is_checkpoint = 1
+         GROUP BY etf_isin
+    ),
+    latest AS (
+        SELECT h.etf_isin, h.security_id, h.weight,
+               row_number() OVER (
+                   PARTITION BY h.etf_isin, h.security_id ORDER BY h.as_of DESC
+               ) AS rn
+          FROM holdings_history AS h
+          JOIN cp ON cp.etf_isin = h.etf_isin
+         WHERE h.as_of >= cp.since AND h.as_of <= ?
+    )
+    SELECT etf_isin, security_id, weight FROM latest
+     WHERE rn = 1 AND weight IS NOT NULL;
+    """
+    return pl.DataFrame(
+        conn.execute(sql, params + [as_of, as_of]).fetchall(),
+        schema=HOLDINGS_SCHEMA,
+        orient="row",
+    )
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+def _current(conn: sqlite3.Connection, isins: List[str]) -> pl.DataFrame:
+    sql = """
+    SELECT etf_isin, security_id, weight FROM etf_holdings
+     WHERE etf_isin IN (SELECT value FROM json_each(?));
+    """
+    return pl.DataFrame(
+        conn.execute(sql, (json.dumps(isins),)).fetchall(),
+        schema=HOLDINGS_SCHEMA,
+        orient="row",
+    )
+
+
+def _checkpoint_due(conn: sqlite3.Connection, isins: List[str], as_of: str) -> set:
+    """ETFs with no checkpoint yet, or CHECKPOINT_EVERY - 1 deltas since the last one."""
+    sql = """
+    SELECT c.etf_isin,
+           (SELECT count(*) FROM holdings_snapshots AS d
+             WHERE d.etf_isin = c.etf_isin AND d.as_of > c.as_of AND d.as_of < ?2)
+      FROM holdings_snapshots AS c
+     WHERE c.etf_isin IN (SELECT value FROM json_each(?1))
+       AND c.is_checkpoint = 1
+       AND c.as_of = (SELECT max(as_of) FROM holdings_snapshots AS t
+                       WHERE t.etf_isin = c.etf_isin AND t.is_checkpoint = 1
+                         AND t.as_of < ?2);
+    """
+    not_due = {
+        isin
+        for isin, deltas in conn.execute(sql, (json.dumps(isins), as_of))
+        if deltas < CHECKPOINT_EVERY - 1
+    }
+    return set(isins) - not_due
+
+
+def record_snapshot(
+    conn: sqlite3.Connection,
+    isins: Iterable[str] | None = None,
+    as_of: str | None = None,
+) -> int:
+    """
+    Record today's (or `as_of`'s) etf_holdings of `isins` (None = every ETF) in
+    the history. Only ETFs whose holdings differ from their previous snapshot get
+    a new one: the added / removed / reweighted securities, or the full list
+    when a checkpoint is due. Re-recording an ETF's latest date replaces it;
+    an earlier date raises ValueError, as the later deltas are relative to
+    the history they were recorded on. Returns the number of history rows written.
+    """
+    as_of = as_of or datetime.date.today().isoformat()
+    if isins is None:
+        isins = [
+            row[0]
+            for row in conn.execute(
+                "SELECT etf_isin FROM etf_holdings UNION SELECT etf_isin FROM holdings_snapshots;"
+            )
+        ]
+    isins = list(dict.fromkeys(isins))
+    if not isins:
+        return 0
+
+    later = conn.execute(
+        """
+        SELECT etf_isin, max(as_of) FROM holdings_snapshots
+         WHERE etf_isin IN (SELECT value FROM json_each(?))
+         GROUP BY etf_isin HAVING max(as_of) > ?;
+        """,
+        (json.dumps(isins), as_of),
+    ).fetchall()
+    if later:
+        raise ValueError(
+            f"Cannot record holdings as of {as_of}: {len(later)} ETF(s) already have "
+            f"a later snapshot (e.g. {later[0][0]} on {later[0][1]})"
+        )
+
+    conn.execute(
+        """
+        DELETE FROM holdings_snapshots
+         WHERE etf_isin IN (SELECT value FROM json_each(?)) AND as_of = ?;
+        """,
+        (json.dumps(isins), as_of),
+    )
+    day_before = (
+        datetime.date.fromisoformat(as_of) - datetime.timedelta(days=1)
+    ).isoformat()
+    previous = holdings_as_of(conn, isins, day_before).rename({"weight": "prev_weight"})
+    diff = (
+        _current(conn, isins)
+        .join(previous, on=["etf_isin", "security_id"], how="full", coalesce=True)
+        .with_columns(changed=pl.col("weight").ne_missing(pl.col("prev_weight")))
+    )
+    changed = diff.filter(pl.col("changed"))["etf_isin"].unique().to_list()
+    if not changed:
+        return 0
+
+    due = _checkpoint_due(conn, changed, as_of)
+    rows = (
+        diff.filter(
+            pl.col("etf_isin").is_in(changed)
+            & (
+                pl.col("changed")
+                | (pl.col("etf_isin").is_in(list(due)) & pl.col("weight").is_not_null())
+            )
+        )
+        .with_columns(as_of=pl.lit(as_of))
+        .select("etf_isin", "as_of", "security_id", "weight", "prev_weight")
+    )
+
+    conn.executemany(
+        "INSERT INTO holdings_snapshots(etf_isin, as_of, is_checkpoint) VALUES (?, ?, ?);",
+        ((isin, as_of, int(isin in due)) for isin in changed),
+    )
+    conn.executemany(
+        """
+        INSERT INTO holdings_history(etf_isin, as_of, security_id, weight, prev_weight)
+        VALUES (?, ?, ?, ?, ?);
+        """,
+        rows.iter_rows(),
+    )
+    return rows.height
+
+
+# ---------------------------------------------------------------------------
+# Analytics straight from the deltas
+# ---------------------------------------------------------------------------
+def turnover(
+    conn: sqlite3.Connection, isins: Iterable[str] | None, start: str, end: str
+) -> pl.DataFrame:
+    """
+    One-way turnover (%) per ETF over snapshots in (start, end]:
+    half the sum of absolute weight changes. An ETF's first snapshot is skipped.
+    """
+    where, params = _isin_filter("h.etf_isin", isins)
+    sql = f"""
+    SELECT h.etf_isin,
+           count(DISTINCT h.as_of),
+           SUM(abs(ifnull(h.weight, 0) - ifnull(h.prev_weight, 0))) / 2
+      FROM holdings_history AS h
+     WHERE {where} AND h.as_of > ? AND h.as_of <= ? AND {NOT_FIRST}
+     GROUP BY h.etf_isin
+     ORDER BY 3 DESC;
+    """
+    return pl.DataFrame(
+        conn.execute(sql, params + [start, end]).fetchall(),
+        schema=TURNOVER_SCHEMA,
+        orient="row",
+    )
+
+
+def drift(conn: sqlite3.Connection, isin: str, start: str, end: str) -> pl.DataFrame:
+    """
+    Per-security weight drift of one ETF over (start, end]: weight before the
+    first change and after the last one in the window, largest moves first.
+    """
+    sql = f"""
+    WITH changes AS (
+        SELECT h.etf_isin, h.security_id, h.weight, h.prev_weight,
+               row_number() OVER (PARTITION BY h.security_id ORDER BY h.as_of)      AS first,
+               row_number() OVER (PARTITION BY h.security_id ORDER BY h.as_of DESC) AS last
+          FROM holdings_history AS h
+         WHERE h.etf_isin = ? AND h.as_of > ? AND h.as_of <= ? AND {NOT_FIRST}
+    )
+    SELECT f.etf_isin, f.security_id, s.isin, s.name,
+           ifnull(f.prev_weight, 0), ifnull(l.weight, 0),
+           ifnull(l.weight, 0) - ifnull(f.prev_weight, 0) AS change
+      FROM changes AS f
+      JOIN changes AS l ON l.security_id = f.security_id AND l.last = 1
+      JOIN securities AS s ON s.id = f.security_id
+     WHERE f.first = 1 AND change <> 0
+     ORDER BY abs(change) DESC;
+    """
+    return pl.DataFrame(
+        conn.execute(sql, (isin, start, end)).fetchall(),
+        schema=DRIFT_SCHEMA,
+        orient="row",
+    )
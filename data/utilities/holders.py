@@ -0,0 +1,223 @@
+import random
+import sqlite3
+import string
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import polars as pl
+
+PAGE_SIZE = 50
+# Securities a single name prefix may expand to (a very short prefix matches thousands)
+MAX_NAME_MATCHES = 500
+
+# (weight, etf_isin, security_id) of the last row of the previous page
+Cursor = Tuple[float, str, int]
+
+HOLDERS_SCHEMA = {
+    "etf_isin": pl.String,
+    "etf_name": pl.String,
+    "issuer": pl.String,
+    "ticker": pl.String,
+    "security_id": pl.Int64,
+    "holding_isin": pl.String,
+    "holding_name": pl.String,
+    "weight": pl.Float64,
+}
+
+# SQLite's lower() only folds ASCII, so the index key has to be built the same way
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def normalize_name(name: str) -> str:
+    """Key of idx_securities_name_norm: lower(trim(name)) as SQLite computes it."""
+    return name.strip(" ").translate(_ASCII_LOWER)
+
+
+# ---------------------------------------------------------------------------
+# Resolving a query to security ids
+# ---------------------------------------------------------------------------
+def securities_by_isin(conn: sqlite3.Connection, isin: str) -> List[int]:
+    row = conn.execute(
+        "SELECT id FROM securities WHERE isin = ?;", (isin.strip().upper(),)
+    ).fetchone()
+    return [row[0]] if row else []
+
+
+def securities_by_ticker(conn: sqlite3.Connection, ticker: str) -> List[int]:
+    """Securities only carry ISINs: a ticker is resolved through the etfs table."""
+    sql = """
+    SELECT s.id
+      FROM etfs AS e
+      JOIN securities AS s ON s.isin = e.isin
+     WHERE e.ticker = ? COLLATE NOCASE;
+    """
+    return [row[0] for row in conn.execute(sql, (ticker.strip(),))]
+
+
+def securities_by_name(
+    conn: sqlite3.Connection, prefix: str, limit: int = MAX_NAME_MATCHES
+) -> List[int]:
+    """Securities whose normalized name starts with `prefix` (index range scan)."""
+    low = prefix.lstrip(" ").translate(_ASCII_LOWER)
+    if not low:
+        return []
+    high = low[:-1] + chr(ord(low[-1]) + 1)
+    sql = """
+    SELECT id FROM securities INDEXED BY idx_securities_name_norm
+     WHERE lower(trim(name)) >= ? AND lower(trim(name)) < ?
+     LIMIT ?;
+    """
+    return [row[0] for row in conn.execute(sql, (low, high, limit))]
+
+
+# ---------------------------------------------------------------------------
+# Weight-ranked reverse lookups
+# ---------------------------------------------------------------------------
+def holders(
+    conn: sqlite3.Connection,
+    security_ids: Iterable[int],
+    *,
+    after: Optional[Cursor] = None,
+    limit: int = PAGE_SIZE,
+) -> pl.DataFrame:
+    """
+    ETFs holding any of `security_ids`, heaviest first (weight DESC, etf_isin,
+    security_id). Pass next_cursor(page) as `after` to fetch the following page;
+    each page is a seek on idx_holdings_security_weight, never an OFFSET scan.
+    """
+    ids = list(dict.fromkeys(security_ids))
+    if not ids:
+        return pl.DataFrame(schema=HOLDERS_SCHEMA)
+
+    sql = f"""
+    SELECT eh.etf_isin, e.name, i.name, e.ticker,
+           s.id, s.isin, s.name, eh.weight
+      FROM etf_holdings AS eh
+      JOIN etfs         AS e ON e.isin = eh.etf_isin
+      JOIN issuers      AS i ON i.id = e.issuer_id
+      JOIN securities   AS s ON s.id = eh.security_id
+     WHERE eh.security_id IN ({", ".join("?" for _ in ids)})
+    """
+    params: list = ids
+    if after is not None:
+        weight, etf_isin, security_id = after
+        sql += """
+       AND (eh.weight < ?
+            OR (eh.weight = ? AND (eh.etf_isin > ?
+                                   OR (eh.etf_isin = ? AND eh.security_id > ?))))
+        """
+        params += [weight, weight, etf_isin, etf_isin, security_id]
+    sql += " ORDER BY eh.weight DESC, eh.etf_isin, eh.security_id LIMIT ?;"
+    params.append(limit)
+
+    return pl.DataFrame(
+        conn.execute(sql, params).fetchall(), schema=HOLDERS_SCHEMA, orient="row"
+    )
+
+
+def next_cursor(page: pl.DataFrame) -> Optional[Cursor]:
+    """Cursor for the page after `page` (None once a page comes back empty)."""
+    if page.is_empty():
+        return None
+    last = page.row(-1, named=True)
+    return (last["weight"], last["etf_isin"], last["security_id"])
+
+
+def holders_by_isin(
+    conn: sqlite3.Connection,
+    isin: str,
+    *,
+    after: Optional[Cursor] = None,
+    limit: int = PAGE_SIZE,
+) -> pl.DataFrame:
+    return holders(conn, securities_by_isin(conn, isin), after=after, limit=limit)
+
+
+def holders_by_ticker(
+    conn: sqlite3.Connection,
+    ticker: str,
+    *,
+    after: Optional[Cursor] = None,
+    limit: int = PAGE_SIZE,
+) -> pl.DataFrame:
+    return holders(conn, securities_by_ticker(conn, ticker), after=after, limit=limit)
+
+
+def holders_by_name(
+    conn: sqlite3.Connection,
+    prefix: str,
+    *,
+    after: Optional[Cursor] = None,
+    limit: int = PAGE_SIZE,
+) -> pl.DataFrame:
+    return holders(conn, securities_by_name(conn, prefix), after=after, limit=limit)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+def _stats(latencies: List[float]) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"queries": 0, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    return {
+        "queries": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies),
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+        "max_ms": latencies[-1],
+    }
+
+
+def latency_benchmark(
+    conn: sqlite3.Connection, *, sample: int = 200, pages: int = 3, seed: int = 0
+) -> Dict[str, Dict[str, float]]:
+    """
+    First-page and deep-page latency of the reverse lookups, over a random
+    sample of held securities: {lookup: {queries, mean_ms, p95_ms, max_ms}}.
+    """
+    rng = random.Random(seed)
+    held = conn.execute(
+        """
+        SELECT s.isin, s.name FROM securities AS s
+         WHERE s.isin IS NOT NULL
+           AND EXISTS (SELECT 1 FROM etf_holdings AS eh WHERE eh.security_id = s.id);
+        """
+    ).fetchall()
+    tickers = [
+        row[0]
+        for row in conn.execute(
+            """
+            SELECT e.ticker FROM etfs AS e
+              JOIN securities AS s ON s.isin = e.isin
+             WHERE e.ticker IS NOT NULL;
+            """
+        )
+    ]
+    held = rng.sample(held, min(sample, len(held)))
+    tickers = rng.sample(tickers, min(sample, len(tickers)))
+
+    timings: Dict[str, List[float]] = {
+        "isin": [],
+        "ticker": [],
+        "name_prefix": [],
+        "isin_paged": [],
+    }
+
+    def timed(kind, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        page = fn(conn, *args, **kwargs)
+        timings[kind].append((time.perf_counter() - t0) * 1000)
+        return page
+
+    for isin, name in held:
+        page = timed("isin", holders_by_isin, isin)
+        timed("name_prefix", holders_by_name, normalize_name(name)[:4])
+        for _ in range(pages):
+            cursor = next_cursor(page)
+            if cursor is None:
+                break
+            page = timed("isin_paged", holders_by_isin, isin, after=cursor)
+    for ticker in tickers:
+        timed("ticker", holders_by_ticker, ticker)
+
+    return {kind: _stats(values) for kind, values in timings.items()}
@@ -0,0 +1,49 @@
+import sqlite3
+from typing import Iterable, Set
+
+
+# ---------------------------------------------------------------------------
+# Run journal
+# ---------------------------------------------------------------------------
+# A scraper run commits each ETF's holdings as they arrive and records it in
+# scrape_journal. If the run dies, the next one for the same issuer skips the
+# ETFs already loaded and still refreshes their derived tables; a completed
+# run empties the journal. Holdings are replaced, never added to, and derived
+# tables are recomputed per ETF, so replaying any step is harmless.
+def start_run(conn: sqlite3.Connection, issuer: str, isins: Iterable[str]) -> Set[str]:
+    """
+    Journal `isins` as pending for `issuer` and return the ETFs an interrupted
+    run already loaded (not to be fetched again).
+    """
+    loaded = loaded_isins(conn, issuer)
+    conn.executemany(
+        """
+        INSERT INTO scrape_journal(issuer, isin, status) VALUES (?, ?, 'pending')
+        ON CONFLICT(issuer, isin) DO NOTHING;
+        """,
+        ((issuer, isin) for isin in isins if isin not in loaded),
+    )
+    return loaded
+
+
+def loaded_isins(conn: sqlite3.Connection, issuer: str) -> Set[str]:
+    """ETFs of `issuer` whose holdings the current (or interrupted) run committed."""
+    sql = "SELECT isin FROM scrape_journal WHERE issuer = ? AND status = 'loaded';"
+    return {row[0] for row in conn.execute(sql, (issuer,))}
+
+
+def mark_loaded(conn: sqlite3.Connection, issuer: str, isin: str) -> None:
+    conn.execute(
+        """
+        INSERT INTO scrape_journal(issuer, isin, status) VALUES (?, ?, 'loaded')
+        ON CONFLICT(issuer, isin) DO UPDATE SET
+            status     = excluded.status,
+            updated_at = excluded.updated_at;
+        """,
+        (issuer, isin),
+    )
+
+
+def finish_run(conn: sqlite3.Connection, issuer: str) -> None:
+    """Forget `issuer`'s journal once its run is complete."""
+    conn.execute("DELETE FROM scrape_journal WHERE issuer = ?;", (issuer,))
@@ -0,0 +1,69 @@
+import sqlite3
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from .database import upsert_holding, upsert_security
+from .isin import clean_holdings
+from .profiling import section
+from .refresh import mark_refreshed
+
+
+# ---------------------------------------------------------------------------
+# Shared holdings writer
+# ---------------------------------------------------------------------------
+def load_holdings(
+    conn: sqlite3.Connection, isins: List[str], holdings: Iterable[Tuple]
+) -> int:
+    """
+    Replace the holdings of `isins` with `holdings` (Holding.to_db_tuple() rows)
+    and stamp them as refreshed. Same hygiene as every scraper: ISINs are
+    normalized and invalid ones quarantined, missing/negative weights become 0,
+    nameless rows get a fallback name. Rows resolving to the same security
+    (aliased NULL-ISIN names, repeated lines) are merged by adding up their
+    weights, as in utilities.dedup.apply_aliases().
+    Returns the number of (ETF, security) rows written.
+    """
+    if isins:
+        placeholders = ", ".join("?" for _ in isins)
+        conn.execute(
+            f"DELETE FROM etf_holdings WHERE etf_isin IN ({placeholders})", isins
+        )
+
+    weights: Dict[Tuple[str, int], float] = defaultdict(float)
+    with section("load_holdings loop"):
+        for (
+            etf_isin,
+            holding_isin,
+            holding_name,
+            weight,
+            sector,
+            country,
+            currency,
+        ) in clean_holdings(conn, holdings):
+            if weight is None or weight < 0:
+                weight = 0.0
+
+            name = (
+                holding_name
+                or (sector == "cash" and "CASH")
+                or holding_isin
+                or "UNKNOWN"
+            )
+            with section("upsert_security"):
+                sec_id = upsert_security(
+                    conn,
+                    isin=holding_isin,
+                    name=str(name),
+                    sector=sector,
+                    country=country,
+                    currency=currency,
+                )
+            weights[etf_isin, sec_id] += weight
+
+    for (etf_isin, sec_id), weight in weights.items():
+        upsert_holding(
+            conn, etf_isin=etf_isin, security_id=sec_id, weight=min(weight, 100.0)
+        )
+
+    mark_refreshed(conn, isins, "holdings")
+    return len(weights)
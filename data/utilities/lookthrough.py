@@ -0,0 +1,193 @@
+import sqlite3
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+import polars as pl
+
+from .nesting import ancestors
+
+# Safety net: deeper fund-of-funds chains are kept as opaque holdings
+MAX_DEPTH = 10
+
+
+# ---------------------------------------------------------------------------
+# Nesting graph
+# ---------------------------------------------------------------------------
+def nested_edges(conn: sqlite3.Connection) -> List[Tuple[str, str]]:
+    """
+    (parent_isin, child_isin) pairs where an ETF holds another ETF that has
+    holdings of its own in the DB (ETFs without holdings stay plain securities).
+    """
+    sql = """
+    SELECT n.parent_isin, n.child_isin
+      FROM etf_nesting AS n
+     WHERE EXISTS (SELECT 1 FROM etf_holdings AS c WHERE c.etf_isin = n.child_isin);
+    """
+    return conn.execute(sql).fetchall()
+
+
+def back_edges(edges: Iterable[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+    """
+    Cycle detection: return the edges that close a cycle in the nesting graph.
+    Removing them leaves a DAG, so unrolling always terminates.
+    """
+    children: Dict[str, List[str]] = defaultdict(list)
+    for parent, child in edges:
+        children[parent].append(child)
+
+    WHITE, GREY, BLACK = 0, 1, 2
+    color: Dict[str, int] = defaultdict(int)
+    back: Set[Tuple[str, str]] = set()
+
+    for start in sorted(children):  # deterministic choice of the edge to break
+        if color[start] != WHITE:
+            continue
+        color[start] = GREY
+        stack = [(start, iter(children[start]))]
+        while stack:
+            node, it = stack[-1]
+            child = next(it, None)
+            if child is None:
+                color[node] = BLACK
+                stack.pop()
+            elif color[child] == GREY:
+                back.add((node, child))
+            elif color[child] == WHITE:
+                color[child] = GREY
+                stack.append((child, iter(children[child])))
+    return back
+
+
+# ---------------------------------------------------------------------------
+# Look-through as iterated sparse products
+# ---------------------------------------------------------------------------
+def _holdings(conn: sqlite3.Connection, isins: List[str]) -> pl.DataFrame:
+    """
+    Sparse ETF x security weights (COO) for the given ETFs. `child_isin` is set
+    when the security is itself an ETF with holdings.
+    """
+    placeholders = ", ".join("?" for _ in isins)
+    sql = f"""
+    SELECT eh.etf_isin, eh.security_id, eh.weight,
+           CASE WHEN EXISTS (SELECT 1 FROM etf_holdings AS c WHERE c.etf_isin = s.isin)
+                THEN s.isin END AS child_isin
+      FROM etf_holdings AS eh
+      JOIN securities   AS s ON s.id = eh.security_id
+     WHERE eh.etf_isin IN ({placeholders});
+    """
+    return pl.DataFrame(
+        conn.execute(sql, isins).fetchall(),
+        schema={
+            "etf_isin": pl.String,
+            "security_id": pl.Int64,
+            "weight": pl.Float64,
+            "child_isin": pl.String,
+        },
+        orient="row",
+    )
+
+
+def compute_lookthrough(
+    conn: sqlite3.Connection, roots: Iterable[str], *, max_depth: int = MAX_DEPTH
+) -> pl.DataFrame:
+    """
+    Fully unrolled exposure of `roots` -> (etf_isin, security_id, weight, depth).
+
+    X holds (root, via, security) weights, `via` being the ETF that directly
+    holds the row. Each step keeps leaf rows and multiplies nested rows by the
+    child ETF's holdings (a sparse product), until no nested rows remain.
+    Edges closing a cycle are never expanded.
+    """
+    roots = list(dict.fromkeys(roots))
+    schema = {
+        "etf_isin": pl.String,
+        "security_id": pl.Int64,
+        "weight": pl.Float64,
+        "depth": pl.Int32,
+    }
+    if not roots:
+        return pl.DataFrame(schema=schema)
+
+    back = back_edges(nested_edges(conn))
+    back_df = pl.DataFrame(
+        list(back), schema={"via": pl.String, "child_isin": pl.String}, orient="row"
+    ).with_columns(pl.lit(True).alias("is_back"))
+
+    x = _holdings(conn, roots).with_columns(
+        pl.col("etf_isin").alias("via"), pl.lit(0, pl.Int32).alias("depth")
+    )
+    leaves: List[pl.DataFrame] = []
+
+    for depth in range(1, max_depth + 1):
+        x = x.join(back_df, on=["via", "child_isin"], how="left")
+        expand = pl.col("child_isin").is_not_null() & pl.col("is_back").is_null()
+        leaves.append(x.filter(~expand).select(list(schema)))
+        nested = x.filter(expand)
+        if nested.is_empty():
+            break
+
+        children = _holdings(conn, nested["child_isin"].unique().to_list())
+        x = (
+            nested.select("etf_isin", pl.col("child_isin").alias("via"), "weight")
+            .join(
+                children.rename({"etf_isin": "via", "weight": "child_weight"}),
+                on="via",
+            )
+            .select(
+                "etf_isin",
+                "security_id",
+                (pl.col("weight") * pl.col("child_weight") / 100.0).alias("weight"),
+                "via",
+                "child_isin",  # the child's own nested holdings drive the next step
+                pl.lit(depth, pl.Int32).alias("depth"),
+            )
+        )
+    else:
+        # Depth limit reached: keep what is left as opaque holdings
+        leaves.append(x.select(list(schema)))
+
+    return (
+        pl.concat(leaves)
+        .group_by("etf_isin", "security_id")
+        .agg(pl.sum("weight"), pl.max("depth"))
+        .sort("etf_isin", "security_id")
+    )
+
+
+# ---------------------------------------------------------------------------
+# Materialization
+# ---------------------------------------------------------------------------
+def refresh_lookthrough(
+    conn: sqlite3.Connection, changed_isins: Iterable[str] | None = None
+) -> int:
+    """
+    Refresh etf_lookthrough for ETFs whose holdings changed and every ETF that
+    (transitively) holds them. None rebuilds everything. Returns rows written.
+    """
+    edges = nested_edges(conn)
+    back = back_edges(edges)
+    unrollable = {parent for parent, child in edges if (parent, child) not in back}
+
+    if changed_isins is None:
+        conn.execute("DELETE FROM etf_lookthrough;")
+        affected = unrollable
+    else:
+        changed = set(changed_isins)
+        affected = changed | ancestors(conn, changed)
+        stale = list(affected)
+        if stale:
+            placeholders = ", ".join("?" for _ in stale)
+            conn.execute(
+                f"DELETE FROM etf_lookthrough WHERE etf_isin IN ({placeholders})",
+                stale,
+            )
+
+    result = compute_lookthrough(conn, affected & unrollable)
+    conn.executemany(
+        """
+        INSERT INTO etf_lookthrough(etf_isin, security_id, weight, depth)
+        VALUES (?, ?, ?, ?);
+        """,
+        result.iter_rows(),
+    )
+    return result.height
@@ -0,0 +1,256 @@
+import asyncio
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import polars as pl
+
+from .database import open_db, setup_database
+
+try:  # Unix only
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+# Every run gets a directory <REPORTS_DIR>/<issuer>-<UTC timestamp>[-<n>]/
+# holding its report.json (and profiles, when asked for); runs started within
+# the same second get a -2, -3, ... suffix
+REPORTS_DIR = "runs"
+
+# Pipeline stages, in order. Times are summed over every call, so concurrent
+# stages (fetch) can add up to more than the run's wall-clock time.
+STAGES = ("fetch", "decode", "parse", "normalize", "write", "derived")
+
+RUNS_SCHEMA = {
+    "id": pl.Int64,
+    "issuer": pl.String,
+    "started_at": pl.String,
+    "status": pl.String,
+    "seconds": pl.Float64,
+    "holdings": pl.Int64,
+    "rows_per_second": pl.Float64,
+    "bytes": pl.Int64,
+    "retries": pl.Int64,
+    "cache_hits": pl.Int64,
+    "peak_rss_mb": pl.Float64,
+}
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MiB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+# ---------------------------------------------------------------------------
+# Collection
+# ---------------------------------------------------------------------------
+class RunMetrics:
+    """
+    Stage timings and counters of one scraper run:
+        with metrics.stage("parse"): ...
+        metrics.add("bytes", len(body))
+    Counters used by the scrapers: etfs, holdings, bytes, requests, retries,
+    cache_hits (holdings not downloaded: still fresh, or loaded by an
+    interrupted run), failed_etfs (holdings fetch failed) and empty_etfs
+    (no holdings returned); both of the latter keep their previous holdings.
+    """
+
+    def __init__(self, issuer: str):
+        self.issuer = issuer
+        self.started = datetime.datetime.now(datetime.timezone.utc)
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.counters: Counter = Counter()
+        self.status = "running"
+        self._start = time.perf_counter()
+        self._end: Optional[float] = None
+        self._run_dir: Optional[str] = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+
+    def add(self, counter: str, n: int = 1) -> None:
+        self.counters[counter] += n
+
+    def finish(self, status: str = "ok") -> None:
+        self.status = status
+        self._end = time.perf_counter()
+
+    @property
+    def run_dir(self) -> str:
+        """This run's directory, created (and so claimed) on first use."""
+        if self._run_dir is None:
+            base = os.path.join(
+                REPORTS_DIR, f"{self.issuer}-{self.started.strftime('%Y%m%dT%H%M%S')}"
+            )
+            os.makedirs(REPORTS_DIR, exist_ok=True)
+            path, n = base, 1
+            while True:
+                try:
+                    os.mkdir(path)
+                    break
+                except FileExistsError:
+                    n += 1
+                    path = f"{base}-{n}"
+            self._run_dir = path
+        return self._run_dir
+
+    def report(self) -> dict:
+        elapsed = (self._end or time.perf_counter()) - self._start
+        holdings = self.counters["holdings"]
+        return {
+            "issuer": self.issuer,
+            "started_at": self.started.strftime("%Y-%m-%d %H:%M:%S"),
+            "status": self.status,
+            "seconds": round(elapsed, 3),
+            "stages": {
+                s: round(self.seconds[s], 3)
+                for s in (*STAGES, *sorted(set(self.seconds) - set(STAGES)))
+                if s in self.seconds
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "rows_per_second": round(holdings / elapsed, 1) if elapsed else None,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def summary(self) -> str:
+        report = self.report()
+        stages = ", ".join(f"{s} {t:.1f}s" for s, t in report["stages"].items())
+        return (
+            f"{report['seconds']:.1f}s ({stages}); "
+            f"{report['counters'].get('holdings', 0)} holdings, "
+            f"{report['rows_per_second']} rows/s, "
+            f"{report['counters'].get('bytes', 0) / 1e6:.1f} MB, "
+            f"peak RSS {report['peak_rss_mb'] or 0:.0f} MiB"
+        )
+
+
+# ---------------------------------------------------------------------------
+# Persistence
+# ---------------------------------------------------------------------------
+def write_report(metrics: RunMetrics) -> str:
+    """Write the run's report.json into its run directory; returns the path."""
+    os.makedirs(metrics.run_dir, exist_ok=True)
+    path = os.path.join(metrics.run_dir, "report.json")
+    with open(path, "w") as f:
+        json.dump(metrics.report(), f, indent=2)
+    return path
+
+
+@contextmanager
+def recorded_run(issuer: str, db_path: str = "database.db") -> Iterator[RunMetrics]:
+    """
+    Metrics of the run in the with-block. However the block ends (ok, failed,
+    interrupted), the run is appended to scrape_runs, its report.json written
+    and a one-line summary printed.
+    """
+    metrics = RunMetrics(issuer)
+    try:
+        yield metrics
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        metrics.finish("interrupted")
+        raise
+    except BaseException:
+        metrics.finish("failed")
+        raise
+    else:
+        metrics.finish()
+    finally:
+        with open_db(db_path) as conn:
+            setup_database(conn)
+            save_run(conn, metrics)
+        print(f"Run report: {write_report(metrics)}")
+        print(metrics.summary())
+
+
+def save_run(conn: sqlite3.Connection, metrics: RunMetrics) -> None:
+    """Append the run to scrape_runs (the full report is kept as JSON)."""
+    report = metrics.report()
+    counters = report["counters"]
+    conn.execute(
+        """
+        INSERT INTO scrape_runs(
+            issuer, started_at, status, seconds, holdings, rows_per_second,
+            bytes, retries, cache_hits, peak_rss_mb, report
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+        """,
+        (
+            report["issuer"],
+            report["started_at"],
+            report["status"],
+            report["seconds"],
+            counters.get("holdings", 0),
+            report["rows_per_second"],
+            counters.get("bytes", 0),
+            counters.get("retries", 0),
+            counters.get("cache_hits", 0),
+            report["peak_rss_mb"],
+            json.dumps(report),
+        ),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+def recent_runs(
+    conn: sqlite3.Connection, issuer: Optional[str] = None, limit: int = 20
+) -> pl.DataFrame:
+    """Latest runs (of one issuer or all), newest first."""
+    sql = f"""
+    SELECT {", ".join(RUNS_SCHEMA)} FROM scrape_runs
+     WHERE ifnull(?, issuer) = issuer
+     ORDER BY started_at DESC, id DESC
+     LIMIT ?;
+    """
+    return pl.DataFrame(
+        conn.execute(sql, (issuer, limit)).fetchall(), schema=RUNS_SCHEMA, orient="row"
+    )
+
+
+def stage_timings(
+    conn: sqlite3.Connection, issuer: Optional[str] = None, limit: int = 20
+) -> pl.DataFrame:
+    """
+    Seconds per stage of the latest completed runs, one row per run and a
+    column per stage: regressions between runs and the bottleneck stage of
+    each issuer show up side by side.
+    """
+    sql = """
+    SELECT r.id, r.issuer, r.started_at, s.key, s.value
+      FROM (SELECT * FROM scrape_runs
+             WHERE ifnull(?, issuer) = issuer AND status = 'ok'
+             ORDER BY started_at DESC, id DESC
+             LIMIT ?) AS r,
+           json_each(r.report, '$.stages') AS s;
+    """
+    long = pl.DataFrame(
+        conn.execute(sql, (issuer, limit)).fetchall(),
+        schema={
+            "id": pl.Int64,
+            "issuer": pl.String,
+            "started_at": pl.String,
+            "stage": pl.String,
+            "seconds": pl.Float64,
+        },
+        orient="row",
+    )
+    if long.is_empty():
+        return long
+    return long.pivot(
+        "stage", index=["id", "issuer", "started_at"], values="seconds"
+    ).sort("started_at", "id", descending=True)
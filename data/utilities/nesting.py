@@ -0,0 +1,69 @@
+import json
+import sqlite3
+from typing import Iterable, List, Set, Tuple
+
+
+# ---------------------------------------------------------------------------
+# Index-backed queries over etf_nesting (parent ETF -> child ETF edges)
+# ---------------------------------------------------------------------------
+def nested_etfs(conn: sqlite3.Connection) -> List[str]:
+    """ISINs of every ETF held by at least one other ETF."""
+    sql = "SELECT DISTINCT child_isin FROM etf_nesting ORDER BY child_isin;"
+    return [row[0] for row in conn.execute(sql)]
+
+
+def edges(conn: sqlite3.Connection) -> List[Tuple[str, str, float]]:
+    """All (parent_isin, child_isin, weight) edges."""
+    sql = "SELECT parent_isin, child_isin, weight FROM etf_nesting;"
+    return conn.execute(sql).fetchall()
+
+
+def parents(conn: sqlite3.Connection, isin: str) -> List[Tuple[str, float]]:
+    """Direct holders of ETF `isin` -> [(parent_isin, weight)], heaviest first."""
+    sql = """
+    SELECT parent_isin, weight FROM etf_nesting
+     WHERE child_isin = ?
+     ORDER BY weight DESC;
+    """
+    return conn.execute(sql, (isin,)).fetchall()
+
+
+def children(conn: sqlite3.Connection, isin: str) -> List[Tuple[str, float]]:
+    """ETFs directly held by `isin` -> [(child_isin, weight)], heaviest first."""
+    sql = """
+    SELECT child_isin, weight FROM etf_nesting
+     WHERE parent_isin = ?
+     ORDER BY weight DESC;
+    """
+    return conn.execute(sql, (isin,)).fetchall()
+
+
+def ancestors(conn: sqlite3.Connection, isins: Iterable[str]) -> Set[str]:
+    """
+    Transitive closure upwards: every ETF that (indirectly) holds any of `isins`.
+    UNION (not UNION ALL) makes the recursion stop on cycles.
+    """
+    sql = """
+    WITH RECURSIVE up(isin) AS (
+        SELECT value FROM json_each(?)
+        UNION
+        SELECT n.parent_isin FROM etf_nesting AS n JOIN up ON n.child_isin = up.isin
+    )
+    SELECT isin FROM up;
+    """
+    isins = list(isins)
+    return {row[0] for row in conn.execute(sql, (json.dumps(isins),))} - set(isins)
+
+
+def descendants(conn: sqlite3.Connection, isins: Iterable[str]) -> Set[str]:
+    """Transitive closure downwards: every ETF (indirectly) held by any of `isins`."""
+    sql = """
+    WITH RECURSIVE down(isin) AS (
+        SELECT value FROM json_each(?)
+        UNION
+        SELECT n.child_isin FROM etf_nesting AS n JOIN down ON n.parent_isin = down.isin
+    )
+    SELECT isin FROM down;
+    """
+    isins = list(isins)
+    return {row[0] for row in conn.execute(sql, (json.dumps(isins),))} - set(isins)
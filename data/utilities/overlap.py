@@ -0,0 +1,253 @@
+import sqlite3
+from typing import Iterable, List, Tuple
+
+import polars as pl
+
+# Neighbours kept per ETF and ETFs per block (bounds the size of each self-join)
+TOP_K = 25
+BLOCK_SIZE = 256
+
+
+# ---------------------------------------------------------------------------
+# ETF x security weight matrix
+# ---------------------------------------------------------------------------
+def weight_matrix(
+    conn: sqlite3.Connection, isins: Iterable[str] | None = None
+) -> pl.DataFrame:
+    """
+    Sparse ETF x security matrix (COO: etf_isin, security_id, weight in %),
+    for every ETF or only for `isins`.
+    """
+    sql = "SELECT etf_isin, security_id, weight FROM etf_holdings WHERE weight > 0"
+    params: list = []
+    if isins is not None:
+        params = list(isins)
+        sql += f" AND etf_isin IN ({', '.join('?' for _ in params)})"
+    return pl.DataFrame(
+        conn.execute(sql, params).fetchall(),
+        schema={"etf_isin": pl.String, "security_id": pl.Int64, "weight": pl.Float64},
+        orient="row",
+    )
+
+
+def neighbourhood_matrix(conn: sqlite3.Connection, isins: List[str]) -> pl.DataFrame:
+    """
+    weight_matrix() of `isins` and of every ETF sharing a security with them:
+    all the rows any overlap involving `isins` can come from.
+    """
+    placeholders = ", ".join("?" for _ in isins)
+    sql = f"""
+    SELECT etf_isin, security_id, weight FROM etf_holdings
+     WHERE weight > 0
+       AND etf_isin IN (
+        SELECT DISTINCT b.etf_isin
+          FROM etf_holdings AS a
+          JOIN etf_holdings AS b ON b.security_id = a.security_id
+         WHERE a.etf_isin IN ({placeholders}) AND a.weight > 0 AND b.weight > 0
+       );
+    """
+    return pl.DataFrame(
+        conn.execute(sql, isins).fetchall(),
+        schema={"etf_isin": pl.String, "security_id": pl.Int64, "weight": pl.Float64},
+        orient="row",
+    )
+
+
+def compute_overlap(
+    matrix: pl.DataFrame,
+    isins: Iterable[str],
+    *,
+    top_k: int | None = TOP_K,
+    block_size: int = BLOCK_SIZE,
+) -> pl.DataFrame:
+    """
+    Overlap of every ETF in `isins` against every other ETF in `matrix`:
+      - overlap: sum over shared securities of min(weight_a, weight_b), in %
+      - cosine:  dot(a, b) / (|a| |b|)
+    Rows are processed in blocks; each block is one sparse self-join on
+    security_id (A_block x A^T), executed by polars on all cores.
+    Only the `top_k` neighbours by overlap are kept per ETF (None keeps all).
+    """
+    schema = {
+        "etf_isin": pl.String,
+        "neighbour_isin": pl.String,
+        "overlap": pl.Float64,
+        "cosine": pl.Float64,
+    }
+    isins = list(dict.fromkeys(isins))
+    norms = matrix.group_by("etf_isin").agg(
+        (pl.col("weight") ** 2).sum().sqrt().alias("norm")
+    )
+    others = matrix.lazy().rename({"etf_isin": "neighbour_isin", "weight": "w_b"})
+
+    blocks: List[pl.DataFrame] = [pl.DataFrame(schema=schema)]
+    for start in range(0, len(isins), block_size):
+        block = isins[start : start + block_size]
+        pairs = (
+            matrix.lazy()
+            .filter(pl.col("etf_isin").is_in(block))
+            .join(others, on="security_id")
+            .filter(pl.col("etf_isin") != pl.col("neighbour_isin"))
+            .group_by("etf_isin", "neighbour_isin")
+            .agg(
+                pl.min_horizontal("weight", "w_b").sum().alias("overlap"),
+                (pl.col("weight") * pl.col("w_b")).sum().alias("dot"),
+            )
+            .join(norms.lazy(), on="etf_isin")
+            .join(
+                norms.lazy().rename({"etf_isin": "neighbour_isin", "norm": "norm_b"}),
+                on="neighbour_isin",
+            )
+            .select(
+                "etf_isin",
+                "neighbour_isin",
+                "overlap",
+                (pl.col("dot") / (pl.col("norm") * pl.col("norm_b"))).alias("cosine"),
+            )
+        )
+        if top_k is not None:
+            pairs = pairs.filter(
+                pl.col("overlap").rank("ordinal", descending=True).over("etf_isin")
+                <= top_k
+            )
+        blocks.append(pairs.collect())
+
+    return pl.concat(blocks).sort("etf_isin", "overlap", descending=[False, True])
+
+
+# ---------------------------------------------------------------------------
+# Materialized top-k neighbours
+# ---------------------------------------------------------------------------
+def _insert(conn: sqlite3.Connection, rows: pl.DataFrame) -> None:
+    conn.executemany(
+        """
+        INSERT INTO etf_overlap(etf_isin, neighbour_isin, overlap, cosine)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(etf_isin, neighbour_isin) DO UPDATE SET
+            overlap = excluded.overlap,
+            cosine  = excluded.cosine;
+        """,
+        rows.iter_rows(),
+    )
+
+
+def refresh_overlap(
+    conn: sqlite3.Connection,
+    changed_isins: Iterable[str] | None = None,
+    *,
+    top_k: int = TOP_K,
+) -> int:
+    """
+    Refresh etf_overlap. None rebuilds every row; otherwise only the rows of
+    ETFs whose holdings changed (and of lists that contained them) are
+    recomputed, and their symmetric new scores are merged into the other
+    ETFs' neighbour lists, which are then trimmed back to `top_k`. Only the
+    holdings of ETFs sharing a security with the recomputed ones are read,
+    and only the touched lists are trimmed.
+    Returns the number of rows computed.
+    """
+    if changed_isins is None:
+        matrix = weight_matrix(conn)
+        conn.execute("DELETE FROM etf_overlap;")
+        result = compute_overlap(
+            matrix, matrix["etf_isin"].unique().to_list(), top_k=top_k
+        )
+        _insert(conn, result)
+        return result.height
+
+    changed = list(dict.fromkeys(changed_isins))
+    if not changed:
+        return 0
+    placeholders = ", ".join("?" for _ in changed)
+
+    # Lists that contained a changed ETF may now need their (k+1)-th candidate,
+    # which was never stored: recompute those lists in full as well.
+    relisted = [
+        row[0]
+        for row in conn.execute(
+            f"""
+            SELECT DISTINCT etf_isin FROM etf_overlap
+             WHERE neighbour_isin IN ({placeholders})
+               AND etf_isin NOT IN ({placeholders});
+            """,
+            changed + changed,
+        )
+    ]
+    recompute = changed + relisted
+    conn.execute(
+        f"""
+        DELETE FROM etf_overlap
+         WHERE etf_isin IN ({", ".join("?" for _ in recompute)})
+            OR neighbour_isin IN ({placeholders});
+        """,
+        recompute + changed,
+    )
+
+    matrix = neighbourhood_matrix(conn, recompute)
+    full = compute_overlap(matrix, changed, top_k=None)
+    own_rows = pl.concat(
+        [
+            full.filter(
+                pl.col("overlap").rank("ordinal", descending=True).over("etf_isin")
+                <= top_k
+            ),
+            compute_overlap(matrix, relisted, top_k=top_k),
+        ]
+    )
+    # Everyone else only merges its (symmetric) new score against changed ETFs
+    mirrored = full.filter(~pl.col("neighbour_isin").is_in(recompute)).select(
+        pl.col("neighbour_isin").alias("etf_isin"),
+        pl.col("etf_isin").alias("neighbour_isin"),
+        "overlap",
+        "cosine",
+    )
+    _insert(conn, own_rows)
+    _insert(conn, mirrored)
+
+    # Trim the lists that received a mirrored score back to top_k
+    touched = mirrored["etf_isin"].unique().to_list()
+    if touched:
+        conn.execute(
+            f"""
+            DELETE FROM etf_overlap
+             WHERE (etf_isin, neighbour_isin) IN (
+                SELECT etf_isin, neighbour_isin FROM (
+                    SELECT etf_isin, neighbour_isin,
+                           row_number() OVER (
+                               PARTITION BY etf_isin ORDER BY overlap DESC
+                           ) AS rn
+                      FROM etf_overlap
+                     WHERE etf_isin IN ({", ".join("?" for _ in touched)})
+                ) WHERE rn > ?
+             );
+            """,
+            (*touched, top_k),
+        )
+    return own_rows.height + mirrored.height
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+def neighbours(
+    conn: sqlite3.Connection, isin: str, limit: int = TOP_K
+) -> List[Tuple[str, float, float]]:
+    """Materialized most-overlapping ETFs -> [(neighbour_isin, overlap, cosine)]."""
+    sql = """
+    SELECT neighbour_isin, overlap, cosine FROM etf_overlap
+     WHERE etf_isin = ?
+     ORDER BY overlap DESC
+     LIMIT ?;
+    """
+    return conn.execute(sql, (isin, limit)).fetchall()
+
+
+def pair_overlap(conn: sqlite3.Connection, isin_a: str, isin_b: str) -> float:
+    """Exact min-weight overlap (%) of two ETFs, straight from etf_holdings."""
+    sql = """
+    SELECT COALESCE(SUM(MIN(a.weight, b.weight)), 0.0)
+      FROM etf_holdings AS a
+      JOIN etf_holdings AS b ON b.security_id = a.security_id
+     WHERE a.etf_isin = ? AND b.etf_isin = ?;
+    """
+    return conn.execute(sql, (isin_a, isin_b)).fetchone()[0]
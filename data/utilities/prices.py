@@ -0,0 +1,136 @@
+import datetime
+import json
+import math
+import sqlite3
+from typing import Iterable, Tuple
+
+import polars as pl
+
+from .database import ETF_COLUMNS
+
+# Observations per year used to annualize volatility (one price per trading day)
+PERIODS_PER_YEAR = 252
+
+PRICES_SCHEMA = {
+    "isin": pl.String,
+    "date": pl.String,
+    "nav": pl.Float64,
+    "size": pl.Float64,
+}
+
+_ISIN, _NAV, _SIZE = (ETF_COLUMNS.index(c) for c in ("isin", "nav", "size"))
+
+
+# ---------------------------------------------------------------------------
+# Batch append
+# ---------------------------------------------------------------------------
+def append_prices(
+    conn: sqlite3.Connection, rows: Iterable[Tuple[str, str, float, float]]
+) -> None:
+    """
+    Append (isin, date, nav, size) rows. A second observation on the same day
+    replaces that day's values, but NULLs never wipe an existing one.
+    """
+    conn.executemany(
+        """
+        INSERT INTO etf_prices(isin, date, nav, size) VALUES (?, ?, ?, ?)
+        ON CONFLICT(isin, date) DO UPDATE SET
+            nav  = COALESCE(excluded.nav, etf_prices.nav),
+            size = COALESCE(excluded.size, etf_prices.size);
+        """,
+        rows,
+    )
+
+
+def append_etf_prices(
+    conn: sqlite3.Connection,
+    etf_tuples: Iterable[Tuple],
+    date: str | None = None,
+) -> None:
+    """Append today's (or `date`'s) NAV and AUM of ETF.to_db_tuple() rows that carry either."""
+    date = date or datetime.date.today().isoformat()
+    append_prices(
+        conn,
+        (
+            (t[_ISIN], date, t[_NAV], t[_SIZE])
+            for t in etf_tuples
+            if t[_NAV] is not None or t[_SIZE] is not None
+        ),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+def _frame(rows) -> pl.DataFrame:
+    return pl.DataFrame(rows, schema=PRICES_SCHEMA, orient="row").with_columns(
+        pl.col("date").str.to_date()
+    )
+
+
+def price_history(
+    conn: sqlite3.Connection,
+    isins: Iterable[str],
+    start: str | None = None,
+    end: str | None = None,
+) -> pl.DataFrame:
+    """Prices of `isins` with start <= date <= end (either bound optional), by ISIN and date."""
+    sql = """
+    SELECT isin, date, nav, size FROM etf_prices
+     WHERE isin IN (SELECT value FROM json_each(?))
+       AND date >= ifnull(?, '') AND date <= ifnull(?, '9999-12-31')
+     ORDER BY isin, date;
+    """
+    return _frame(conn.execute(sql, (json.dumps(list(isins)), start, end)).fetchall())
+
+
+def prices_as_of(
+    conn: sqlite3.Connection, isins: Iterable[str], as_of: str
+) -> pl.DataFrame:
+    """Last known price of each of `isins` on or before `as_of`."""
+    sql = """
+    SELECT p.isin, p.date, p.nav, p.size
+      FROM json_each(?) AS j
+      JOIN etf_prices AS p
+        ON p.isin = j.value
+       AND p.date = (SELECT max(date) FROM etf_prices
+                      WHERE isin = j.value AND date <= ?);
+    """
+    return _frame(conn.execute(sql, (json.dumps(list(isins)), as_of)).fetchall())
+
+
+# ---------------------------------------------------------------------------
+# Analytics (vectorized over the whole frame, per ISIN)
+# ---------------------------------------------------------------------------
+def with_returns(prices: pl.DataFrame) -> pl.DataFrame:
+    """Add period `return` (simple) and `drawdown` from the running NAV peak."""
+    nav = pl.col("nav")
+    return (
+        prices.filter(nav.is_not_null() & (nav > 0))
+        .sort("isin", "date")
+        .with_columns(
+            (nav / nav.shift(1) - 1).over("isin").alias("return"),
+            (nav / nav.cum_max() - 1).over("isin").alias("drawdown"),
+        )
+    )
+
+
+def price_stats(
+    prices: pl.DataFrame, periods_per_year: int = PERIODS_PER_YEAR
+) -> pl.DataFrame:
+    """
+    Per ISIN: first/last date, total return, annualized volatility of period
+    returns and maximum drawdown (both as fractions, e.g. -0.25 = -25%).
+    """
+    return (
+        with_returns(prices)
+        .group_by("isin")
+        .agg(
+            pl.col("date").first().alias("start"),
+            pl.col("date").last().alias("end"),
+            (pl.col("nav").last() / pl.col("nav").first() - 1).alias("total_return"),
+            (pl.col("return").std() * math.sqrt(periods_per_year)).alias("volatility"),
+            pl.col("drawdown").min().alias("max_drawdown"),
+        )
+        .sort("isin")
+    )
@@ -0,0 +1,224 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+
+PROFILE_MODES = ("cpu", "mem")
+
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples (cpu)
+TRACE_DEPTH = 25  # frames kept per allocation (mem)
+TOP_N = 30  # lines in the allocation report
+
+# Profile of the running scraper, None when not profiling: hooks check it once
+_profiler: Optional["Profiler"] = None
+_DISABLED = nullcontext()
+
+
+def profile_mode(argv: Optional[List[str]] = None) -> Optional[str]:
+    """`--profile cpu|mem` (or `--profile=mem`) of a command line, else None."""
+    argv = sys.argv if argv is None else argv
+    for i, arg in enumerate(argv):
+        if arg == "--profile":
+            mode = argv[i + 1] if i + 1 < len(argv) else ""
+        elif arg.startswith("--profile="):
+            mode = arg.split("=", 1)[1]
+        else:
+            continue
+        if mode not in PROFILE_MODES:
+            raise SystemExit(f"--profile takes one of: {', '.join(PROFILE_MODES)}")
+        return mode
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Hooks
+# ---------------------------------------------------------------------------
+def section(name: str):
+    """
+    Context manager around a hot spot (a parser, a holdings loop, ...). While
+    a profile is recorded its calls, seconds and, in mem mode, net allocated
+    bytes are added up per name; otherwise it is a shared no-op.
+    """
+    return _DISABLED if _profiler is None else _Section(_profiler, name)
+
+
+class _Section:
+    __slots__ = ("totals", "tracing", "start", "memory")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.totals = profiler.sections[name]
+        self.tracing = profiler.mode == "mem"
+
+    def __enter__(self) -> None:
+        self.memory = tracemalloc.get_traced_memory()[0] if self.tracing else 0
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.totals[0] += 1
+        self.totals[1] += time.perf_counter() - self.start
+        if self.tracing:
+            self.totals[2] += tracemalloc.get_traced_memory()[0] - self.memory
+
+
+# ---------------------------------------------------------------------------
+# Profiler
+# ---------------------------------------------------------------------------
+class Profiler:
+    """
+    cpu: cProfile of the whole run (cpu.pstats, for pstats/snakeviz) and
+         wall-clock stack samples of every thread in collapsed-stack format
+         (cpu.folded, for flamegraph.pl, speedscope or inferno).
+    mem: tracemalloc snapshot at the end of the run: top allocation sites and
+         tracebacks (mem_top.txt) and live bytes per stack (mem.folded).
+    Both write sections.txt, the totals of the section() hooks.
+    """
+
+    def __init__(self, mode: str, run_dir: str):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}")
+        self.mode = mode
+        self.run_dir = run_dir
+        # name -> [calls, seconds, net bytes]
+        self.sections: Dict[str, list] = defaultdict(lambda: [0, 0.0, 0])
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+
+    def start(self) -> None:
+        if self.mode == "cpu":
+            self._sampler = threading.Thread(
+                target=self._sample, name="profile-sampler", daemon=True
+            )
+            self._sampler.start()
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            tracemalloc.start(TRACE_DEPTH)
+
+    def stop(self) -> List[str]:
+        """Stop profiling and write the reports; returns their paths."""
+        os.makedirs(self.run_dir, exist_ok=True)
+        if self.mode == "cpu":
+            self._cprofile.disable()
+            self._stop.set()
+            self._sampler.join()
+            paths = [self._write_pstats(), self._write_folded(self._stacks, "cpu")]
+        else:
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen *>"),
+                    tracemalloc.Filter(False, "<unknown>"),
+                )
+            )
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            paths = [
+                self._write_mem_top(snapshot, peak),
+                self._write_mem_folded(snapshot),
+            ]
+        return paths + [self._write_sections()]
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.run_dir, name)
+
+    # -- cpu ----------------------------------------------------------------
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} "
+                        f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self._stacks[";".join(reversed(stack))] += 1
+
+    def _write_pstats(self) -> str:
+        path = self._path("cpu.pstats")
+        self._cprofile.dump_stats(path)
+        return path
+
+    def _write_folded(self, stacks: Counter, name: str) -> str:
+        # Collapsed stacks: "root;caller;callee <count>", one line per stack
+        path = self._path(f"{name}.folded")
+        with open(path, "w") as f:
+            for stack, count in sorted(stacks.items()):
+                f.write(f"{stack} {count}\n")
+        return path
+
+    # -- mem ----------------------------------------------------------------
+    def _write_mem_top(self, snapshot: tracemalloc.Snapshot, peak: int) -> str:
+        path = self._path("mem_top.txt")
+        by_line = snapshot.statistics("lineno")
+        with open(path, "w") as f:
+            f.write(f"Peak traced memory: {peak / 2**20:.1f} MiB\n")
+            f.write(f"Live at end: {sum(s.size for s in by_line) / 2**20:.1f} MiB\n\n")
+            f.write(f"Top {TOP_N} allocation sites:\n")
+            for stat in by_line[:TOP_N]:
+                f.write(f"{stat}\n")
+            f.write("\nTop 5 tracebacks:\n")
+            for stat in snapshot.statistics("traceback")[:5]:
+                f.write(f"\n{stat.count} blocks, {stat.size / 2**10:.1f} KiB\n")
+                f.write("\n".join(stat.traceback.format()) + "\n")
+        return path
+
+    def _write_mem_folded(self, snapshot: tracemalloc.Snapshot) -> str:
+        # Live bytes per allocation stack (tracebacks run oldest frame first)
+        stacks: Counter = Counter()
+        for stat in snapshot.statistics("traceback"):
+            stack = ";".join(
+                f"{os.path.basename(frame.filename)}:{frame.lineno}"
+                for frame in stat.traceback
+            )
+            stacks[stack] += stat.size
+        return self._write_folded(stacks, "mem")
+
+    # -- sections -----------------------------------------------------------
+    def _write_sections(self) -> str:
+        path = self._path("sections.txt")
+        rows = sorted(self.sections.items(), key=lambda kv: kv[1][1], reverse=True)
+        with open(path, "w") as f:
+            f.write(f"{'section':<28}{'calls':>10}{'seconds':>10}{'us/call':>10}")
+            f.write(f"{'net KiB':>10}\n" if self.mode == "mem" else "\n")
+            for name, (calls, seconds, size) in rows:
+                f.write(
+                    f"{name:<28}{calls:>10}{seconds:>10.3f}"
+                    f"{seconds / calls * 1e6 if calls else 0:>10.1f}"
+                )
+                f.write(f"{size / 2**10:>10.1f}\n" if self.mode == "mem" else "\n")
+        return path
+
+
+@contextmanager
+def profiled(mode: Optional[str], run_dir: str) -> Iterator[None]:
+    """
+    Profile the with-block in `mode` ('cpu' or 'mem') and write the reports
+    into `run_dir`; with mode None it does nothing and the section() hooks
+    stay no-ops.
+    """
+    global _profiler
+    if mode is None:
+        yield
+        return
+    profiler = Profiler(mode, run_dir)
+    _profiler = profiler
+    profiler.start()
+    try:
+        yield
+    finally:
+        _profiler = None
+        print(f"Profile ({mode}): {', '.join(profiler.stop())}")
@@ -0,0 +1,129 @@
+import sqlite3
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .database import upsert_etf_columns
+from .prices import append_etf_prices
+
+
+# ---------------------------------------------------------------------------
+# Field groups & refresh cadences
+# ---------------------------------------------------------------------------
+# The etfs row mixes facts that practically never change with fast-moving
+# ones. Each group is refreshed on its own cadence.
+FIELD_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "static": (
+        "name",
+        "ticker",
+        "currency",
+        "asset_class",
+        "sub_asset_class",
+        "region",
+        "use_of_profits",
+        "replication",
+        "domicile",
+        "inception_date",
+        "url",
+    ),
+    "costs": ("ter",),
+    "prices": ("nav", "size"),
+    "holdings": (),  # not an etfs column: tracks etf_holdings rewrites
+}
+
+# Maximum age before a group is considered stale (SQLite datetime modifiers)
+MAX_AGE: Dict[str, str] = {
+    "static": "-30 days",
+    "costs": "-7 days",
+    "prices": "-12 hours",
+    "holdings": "-1 days",
+}
+
+ALL_GROUPS: Tuple[str, ...] = tuple(FIELD_GROUPS)
+NAV_ONLY: Tuple[str, ...] = ("prices",)
+
+
+# ---------------------------------------------------------------------------
+# Planning
+# ---------------------------------------------------------------------------
+def fresh_isins(
+    conn: sqlite3.Connection, group: str, *, issuer: Optional[str] = None
+) -> Set[str]:
+    """
+    ISINs whose `group` was refreshed within its MAX_AGE (optionally for one issuer).
+    """
+    sql = """
+    SELECT r.isin
+      FROM etf_refresh AS r
+      JOIN etfs        AS e ON e.isin = r.isin
+     WHERE r.field_group = ?
+       AND r.refreshed_at > datetime('now', ?)
+    """
+    params: list = [group, MAX_AGE[group]]
+    if issuer:
+        sql += " AND e.issuer_id = (SELECT id FROM issuers WHERE name = ?)"
+        params.append(issuer)
+    return {row[0] for row in conn.execute(sql, params)}
+
+
+def plan_refresh(
+    conn: sqlite3.Connection,
+    isins: Iterable[str],
+    groups: Sequence[str] = ALL_GROUPS,
+    *,
+    force: bool = False,
+) -> Dict[str, Set[str]]:
+    """
+    Return {isin: stale groups} restricted to `groups`.
+    ETFs never seen before are stale for every group; `force` ignores MAX_AGE.
+    """
+    isins = list(isins)
+    if force:
+        return {isin: set(groups) for isin in isins}
+
+    fresh = {group: fresh_isins(conn, group) for group in groups}
+    return {isin: {g for g in groups if isin not in fresh[g]} for isin in isins}
+
+
+def stale(plan: Dict[str, Set[str]], group: str) -> List[str]:
+    """ISINs in the plan for which `group` must be refreshed."""
+    return [isin for isin, groups in plan.items() if group in groups]
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+def mark_refreshed(conn: sqlite3.Connection, isins: Iterable[str], group: str) -> None:
+    """Record that `group` was refreshed now for every ISIN given."""
+    conn.executemany(
+        """
+        INSERT INTO etf_refresh(isin, field_group, refreshed_at)
+        VALUES (?, ?, datetime('now'))
+        ON CONFLICT(isin, field_group) DO UPDATE SET
+            refreshed_at = excluded.refreshed_at;
+        """,
+        ((isin, group) for isin in isins),
+    )
+
+
+def refresh_etfs(
+    conn: sqlite3.Connection, etf_tuples: Iterable[Tuple], plan: Dict[str, Set[str]]
+) -> None:
+    """
+    Write only the stale column groups of each ETF tuple (ETF.to_db_tuple() order)
+    and stamp them as refreshed. ETFs missing from the plan are left untouched.
+    Refreshed NAV / AUM values are also appended to the etf_prices time series.
+    """
+    batches: Dict[frozenset, List[Tuple]] = defaultdict(list)
+    for t in etf_tuples:
+        groups = plan.get(t[0])
+        if groups:
+            batches[frozenset(groups)].append(t)
+
+    for groups, rows in batches.items():
+        columns = [c for g in ALL_GROUPS if g in groups for c in FIELD_GROUPS[g]]
+        upsert_etf_columns(conn, rows, columns)
+        if "prices" in groups:
+            append_etf_prices(conn, rows)
+        for group in groups:
+            if FIELD_GROUPS[group]:
+                mark_refreshed(conn, (t[0] for t in rows), group)
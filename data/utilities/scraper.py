@@ -0,0 +1,268 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Tuple, Union
+
+import aiohttp
+from tqdm import tqdm
+
+from .common import ETF, ETF_SCHEMA, Holding
+from .country import report_unmatched_countries
+from .database import open_db, setup_database
+from .derived import refresh_derived
+from .journal import finish_run, mark_loaded, start_run
+from .loader import load_holdings
+from .metrics import RunMetrics, recorded_run
+from .profiling import profiled, section
+from .refresh import ALL_GROUPS, NAV_ONLY, plan_refresh, refresh_etfs, stale
+from .search import optimize_search_index
+
+DB_NAME = "database.db"
+
+# Model field -> raw key, or raw keys tried in order (first non-empty wins)
+FieldMap = Mapping[str, Union[str, Tuple[str, ...]]]
+Product = Dict[str, Any]
+
+HOLDING_FIELDS = (
+    "holding_isin",
+    "holding_name",
+    "weight",
+    "sector",
+    "country",
+    "currency",
+)
+
+
+def field(row: Mapping[str, Any], keys: Union[str, Tuple[str, ...]]) -> Any:
+    """First value of `keys` present in `row` that is neither None nor ''."""
+    if isinstance(keys, str):
+        keys = (keys,)
+    return next((row[k] for k in keys if row.get(k) not in (None, "")), None)
+
+
+# ---------------------------------------------------------------------------
+# Issuer interface
+# ---------------------------------------------------------------------------
+class IssuerScraper(ABC):
+    """
+    One issuer's source of ETFs and holdings. A subclass names the issuer,
+    maps its raw fields onto the ETF / Holding models (ETF_FIELDS,
+    HOLDING_FIELDS) and implements list_products() and fetch_holdings() (a
+    missing one fails at instantiation); run() does the planning,
+    normalization and writing the same way for all.
+    Used as an async context manager, it holds an aiohttp `session`.
+    """
+
+    issuer: str
+    label: str = ""  # for messages, defaults to issuer
+
+    ETF_FIELDS: FieldMap = {f: f for f in ETF_SCHEMA if f != "issuer"}
+    HOLDING_FIELDS: FieldMap = {f: f for f in HOLDING_FIELDS}
+
+    HEADERS: Dict[str, str] = {}
+    CONCURRENT_REQUESTS = 4
+    REQUEST_DELAY = 0.0  # seconds before each holdings request
+
+    RETRIES = 2  # extra attempts after a connection error or a 429/5xx answer
+    RETRY_BACKOFF = 1.0  # seconds, doubled after every retry
+
+    session: aiohttp.ClientSession
+    metrics: RunMetrics
+
+    def __init__(self):
+        self.metrics = RunMetrics(self.issuer)
+
+    async def __aenter__(self) -> "IssuerScraper":
+        self.session = aiohttp.ClientSession(headers=self.HEADERS)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.session.close()
+
+    @abstractmethod
+    def list_products(self) -> AsyncIterator[Product]:
+        """Raw products of the issuer (async generator), via ETF_FIELDS."""
+
+    async def prefetch_holdings(self, products: List[Product]) -> None:
+        """
+        Called with the products whose holdings are stale, before any
+        fetch_holdings(): for sources serving many ETFs in one request.
+        """
+
+    @abstractmethod
+    def fetch_holdings(self, product: Product) -> AsyncIterator[Mapping]:
+        """
+        Raw holding rows of one product (an async generator), read through
+        HOLDING_FIELDS. No rows means the fund holds nothing; raise on failure.
+        """
+
+    async def fetch(self, url: str, method: str = "GET", **kwargs) -> bytes:
+        """
+        Body of a request through the session (kwargs as for aiohttp), retried
+        on transient errors. Counted as the 'fetch' stage, bytes and retries.
+        """
+        for attempt in range(self.RETRIES + 1):
+            try:
+                with self.metrics.stage("fetch"):
+                    async with self.session.request(method, url, **kwargs) as response:
+                        response.raise_for_status()
+                        body = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = getattr(e, "status", None)
+                transient = status is None or status == 429 or status >= 500
+                if not transient or attempt == self.RETRIES:
+                    raise
+                self.metrics.add("retries")
+                await asyncio.sleep(self.RETRY_BACKOFF * 2**attempt)
+            else:
+                self.metrics.add("requests")
+                self.metrics.add("bytes", len(body))
+                return body
+
+    async def fetch_json(
+        self, url: str, method: str = "GET", encoding: str = "utf-8", **kwargs
+    ) -> Any:
+        """fetch() decoded as JSON (timed as the 'decode' stage)."""
+        body = await self.fetch(url, method, **kwargs)
+        with self.metrics.stage("decode"):
+            return json.loads(body.decode(encoding))
+
+    def etf_record(self, product: Product) -> Dict[str, Any]:
+        return {f: field(product, keys) for f, keys in self.ETF_FIELDS.items()}
+
+    def holding_tuple(self, etf_isin: str, row: Mapping) -> Tuple:
+        values = {f: field(row, keys) for f, keys in self.HOLDING_FIELDS.items()}
+        return Holding(etf_isin=etf_isin, **values).to_db_tuple()
+
+
+# ---------------------------------------------------------------------------
+# Shared engine
+# ---------------------------------------------------------------------------
+async def _fetch_holdings(
+    scraper: IssuerScraper,
+    semaphore: asyncio.Semaphore,
+    isin: str,
+    product: Product,
+) -> Tuple[str, Optional[List[Tuple]]]:
+    # Holding tuples of the product, or None if the fetch failed
+    async with semaphore:
+        await asyncio.sleep(scraper.REQUEST_DELAY)
+        try:
+            rows = [row async for row in scraper.fetch_holdings(product)]
+        except Exception as e:
+            # Keep the pipeline moving; the ETF keeps its previous holdings
+            print(f"Warning: failed to fetch holdings for {isin}: {e}")
+            return isin, None
+        with scraper.metrics.stage("normalize"), section("holding_tuple loop"):
+            return isin, [scraper.holding_tuple(isin, row) for row in rows]
+
+
+async def run(
+    scraper: IssuerScraper,
+    nav_only: bool = False,
+    force: bool = False,
+    db_path: str = DB_NAME,
+    profile: Optional[str] = None,
+) -> RunMetrics:
+    """
+    1) List the issuer's products, normalize them in one batch and write the
+       stale ETF fields
+    2) Concurrently fetch stale holdings (limit = scraper.CONCURRENT_REQUESTS),
+       committing each ETF as it arrives
+    3) Refresh derived tables of the rewritten ETFs
+    An interrupted run resumes where it stopped (see utilities.journal). Every
+    run, even a failed one, leaves a JSON report in its run directory and a
+    scrape_runs row (see utilities.metrics).
+    nav_only: refresh just NAV/AUM (skips holdings); force: ignore refresh cadences;
+    profile: 'cpu' or 'mem' to profile the run into its run directory
+    (see utilities.profiling).
+    """
+    with recorded_run(scraper.issuer, db_path) as metrics:
+        scraper.metrics = metrics
+        with profiled(profile, metrics.run_dir):
+            await _run(scraper, nav_only, force, db_path)
+    return metrics
+
+
+async def _run(
+    scraper: IssuerScraper, nav_only: bool, force: bool, db_path: str
+) -> None:
+    label = scraper.label or scraper.issuer
+    metrics = scraper.metrics
+    async with scraper:
+        print(f"Fetching {label} ETF list...")
+        products: Dict[str, Tuple[Product, Dict[str, Any]]] = {}
+        async for product in scraper.list_products():
+            record = scraper.etf_record(product)
+            if record.get("isin"):
+                products[record["isin"]] = (product, record)
+        if not products:
+            print(f"No {label} ETFs found. Exiting.")
+            return
+        metrics.add("etfs", len(products))
+        with metrics.stage("normalize"):
+            etf_tuples = ETF.from_records(
+                (record for _, record in products.values()), issuer=scraper.issuer
+            )
+
+        with open_db(db_path) as conn:
+            setup_database(conn)
+
+            # Only refresh what is stale
+            print("Upserting ETFs...")
+            with metrics.stage("write"):
+                groups = NAV_ONLY if nav_only else ALL_GROUPS
+                plan = plan_refresh(conn, products, groups, force=nav_only or force)
+                refresh_etfs(conn, etf_tuples, plan)
+
+                stale_isins = stale(plan, "holdings")
+                loaded = start_run(conn, scraper.issuer, stale_isins)
+                conn.commit()
+            if loaded:
+                print(f"Resuming: {len(loaded)} ETFs were loaded by an interrupted run")
+            isins_to_fetch = [i for i in stale_isins if i not in loaded]
+            if not nav_only:
+                metrics.add("cache_hits", len(products) - len(isins_to_fetch))
+
+            print(
+                f"Fetching holdings for {len(isins_to_fetch)} ETFs "
+                f"with {scraper.CONCURRENT_REQUESTS} concurrent workers..."
+            )
+            await scraper.prefetch_holdings([products[i][0] for i in isins_to_fetch])
+            semaphore = asyncio.Semaphore(scraper.CONCURRENT_REQUESTS)
+            tasks = [
+                _fetch_holdings(scraper, semaphore, isin, products[isin][0])
+                for isin in isins_to_fetch
+            ]
+            for fut in tqdm(
+                asyncio.as_completed(tasks), total=len(tasks), desc="Holdings"
+            ):
+                isin, holdings = await fut
+                # Only ETFs whose holdings actually arrived are rewritten. An
+                # empty list is far more often a broken response than a
+                # liquidation, so it keeps the previous holdings too
+                if holdings is None:
+                    metrics.add("failed_etfs")
+                    continue
+                if not holdings:
+                    print(
+                        f"Warning: no holdings returned for {isin}, keeping the old ones"
+                    )
+                    metrics.add("empty_etfs")
+                    continue
+                with metrics.stage("write"), conn:
+                    written = load_holdings(conn, [isin], holdings)
+                    mark_loaded(conn, scraper.issuer, isin)
+                metrics.add("holdings", written)
+                loaded.add(isin)
+
+            print("\nRefreshing derived tables...")
+            with metrics.stage("derived"):
+                refresh_derived(conn, sorted(loaded))
+                finish_run(conn, scraper.issuer)
+
+                print("Optimizing search index...")
+                optimize_search_index(conn)
+
+    report_unmatched_countries()
+    print(f"✅ {label} scraping complete. Database is up to date.")
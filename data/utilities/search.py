@@ -0,0 +1,115 @@
+import math
+import sqlite3
+from typing import Dict
+
+import polars as pl
+
+# bm25 column weights (name, ticker, isin): exact ticker/ISIN hits beat name hits
+BM25_WEIGHTS = (1.0, 4.0, 4.0)
+# Score bonus per decade of AUM (ETF size, or ETF money invested in a security)
+AUM_BONUS = 0.5
+# FTS candidates re-ranked by AUM, per result requested
+CANDIDATES_PER_RESULT = 4
+# Score bonus when the whole query is exactly the ticker or ISIN
+EXACT_BONUS = 10.0
+
+SEARCH_SCHEMA = {
+    "kind": pl.String,  # 'etf' | 'security'
+    "isin": pl.String,
+    "name": pl.String,
+    "ticker": pl.String,
+    "security_id": pl.Int64,
+    "aum": pl.Float64,
+    "score": pl.Float64,
+}
+
+CANDIDATES_SQL = f"""
+WITH hits AS (
+    SELECT rowid AS id, isin, bm25(search_index, {", ".join(map(str, BM25_WEIGHTS))}) AS relevance
+      FROM search_index
+     WHERE search_index MATCH ?
+     ORDER BY relevance
+     LIMIT ?
+)
+SELECT 'etf', e.isin, e.name, e.ticker, NULL, e.size, h.relevance
+  FROM hits AS h
+  JOIN etfs AS e ON e.isin = h.isin
+ WHERE h.id < 0
+UNION ALL
+SELECT 'security', s.isin, s.name, NULL, s.id,
+       (SELECT SUM(eh.weight / 100.0 * e.size)
+          FROM etf_holdings AS eh
+          JOIN etfs AS e ON e.isin = eh.etf_isin
+         WHERE eh.security_id = s.id),
+       h.relevance
+  FROM hits AS h
+  JOIN securities AS s ON s.id = h.id
+ WHERE h.id > 0;
+"""
+
+
+def _match_query(text: str) -> str | None:
+    """
+    Every whitespace-separated term as a quoted FTS5 phrase (implicit AND).
+    Trigrams cannot match terms under 3 characters, so those are dropped.
+    """
+    terms = [t for t in text.split() if len(t) >= 3]
+    if not terms:
+        return None
+    return " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def search(conn: sqlite3.Connection, text: str, limit: int = 20) -> pl.DataFrame:
+    """
+    ETFs and securities matching `text` anywhere in their name, ticker or ISIN,
+    best first: bm25 relevance plus a log-scaled AUM bonus (and a fixed bonus
+    when the query is exactly a ticker or ISIN).
+    Terms under 3 characters only match as an exact ETF ticker.
+    """
+    # Exact ticker hits are always candidates, however many rows share the trigrams
+    rows = conn.execute(
+        """
+        SELECT 'etf', isin, name, ticker, NULL, size, 0.0 FROM etfs
+         WHERE ticker = ? COLLATE NOCASE
+         LIMIT ?;
+        """,
+        (text.strip(), limit),
+    ).fetchall()
+    query = _match_query(text)
+    if query is not None:
+        rows += conn.execute(
+            CANDIDATES_SQL, (query, limit * CANDIDATES_PER_RESULT)
+        ).fetchall()
+
+    exact = text.strip().upper()
+    best: Dict[tuple, tuple] = {}
+    for kind, isin, name, ticker, security_id, aum, relevance in rows:
+        # bm25() is negative, more negative = more relevant
+        score = -relevance + AUM_BONUS * math.log10(1.0 + max(aum or 0.0, 0.0))
+        if exact in (isin, (ticker or "").upper()):
+            score += EXACT_BONUS
+        key = (kind, isin, security_id)
+        if key not in best or best[key][-1] < score:
+            best[key] = (kind, isin, name, ticker, security_id, aum, score)
+    ranked = sorted(best.values(), key=lambda r: r[-1], reverse=True)
+
+    return pl.DataFrame(ranked[:limit], schema=SEARCH_SCHEMA, orient="row")
+
+
+def optimize_search_index(conn: sqlite3.Connection) -> None:
+    """Merge the FTS segments written during a load into one b-tree."""
+    conn.execute("INSERT INTO search_index(search_index) VALUES ('optimize');")
+
+
+def rebuild_search_index(conn: sqlite3.Connection) -> None:
+    """Repopulate search_index from scratch (the triggers keep it in sync otherwise)."""
+    conn.execute("DELETE FROM search_index;")
+    conn.execute(
+        """
+        INSERT INTO search_index(rowid, name, ticker, isin)
+        SELECT -row_number() OVER (ORDER BY isin), name, ticker, isin FROM etfs
+        UNION ALL
+        SELECT id, name, NULL, isin FROM securities;
+        """
+    )
+    optimize_search_index(conn)
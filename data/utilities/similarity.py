@@ -0,0 +1,228 @@
+import hashlib
+import random
+import sqlite3
+import time
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+import polars as pl
+
+from .overlap import compute_overlap, weight_matrix
+
+# Signature length = BANDS * ROWS; a pair with similarity s becomes an LSH
+# candidate with probability 1 - (1 - s**ROWS) ** BANDS, an S-curve centred on
+# (1 / BANDS) ** (1 / ROWS) ~ 0.29: funds sharing about a third of their weight.
+# 42 x 3 lets through ~4% of pairs at s = 0.1, ~29% at 0.2 and ~94% at 0.4.
+BANDS = 42
+ROWS = 3
+NUM_HASHES = BANDS * ROWS
+BLOCK_SIZE = 256
+
+# Fixed multiply-shift hash family over security ids (stable across versions)
+_PRIME = (1 << 31) - 1
+_rng = random.Random(20240901)
+HASH_PARAMS: List[Tuple[int, int]] = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)
+]
+
+
+# ---------------------------------------------------------------------------
+# Weighted MinHash signatures
+# ---------------------------------------------------------------------------
+def compute_signatures(matrix: pl.DataFrame, isins: Iterable[str]) -> Dict[str, array]:
+    """
+    Weighted MinHash (P-MinHash) signatures: for hash i, the signature is the
+    security minimizing -ln(u_i(security)) / weight. Two ETFs agree on a hash
+    with probability equal to their probability-Jaccard similarity.
+    """
+    isins = list(dict.fromkeys(isins))
+    signatures: Dict[str, array] = {}
+    for start in range(0, len(isins), BLOCK_SIZE):
+        block = matrix.filter(
+            pl.col("etf_isin").is_in(isins[start : start + BLOCK_SIZE])
+        )
+        keys = [
+            (
+                -(((pl.col("security_id") * a + b) % _PRIME + 1) / (_PRIME + 1)).log()
+                / pl.col("weight")
+            ).alias(f"k{i}")
+            for i, (a, b) in enumerate(HASH_PARAMS)
+        ]
+        mins = (
+            block.with_columns(keys)
+            .group_by("etf_isin")
+            .agg(
+                pl.col("security_id").get(pl.col(f"k{i}").arg_min()).alias(f"h{i}")
+                for i in range(NUM_HASHES)
+            )
+        )
+        for row in mins.iter_rows():
+            signatures[row[0]] = array("q", row[1:])
+    return signatures
+
+
+def _buckets(signature: array) -> List[Tuple[int, int]]:
+    """(band, bucket) keys: a stable 64-bit digest of each band's ROWS ids."""
+    out = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS : (band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(chunk, digest_size=8).digest()
+        out.append((band, int.from_bytes(digest, "little", signed=True)))
+    return out
+
+
+def _similarity(a: array, b: array) -> float:
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+# ---------------------------------------------------------------------------
+# Index maintenance
+# ---------------------------------------------------------------------------
+def _layout_changed(conn: sqlite3.Connection) -> bool:
+    """Whether the stored signatures/buckets predate the current BANDS x ROWS."""
+    length, bands = conn.execute(
+        """
+        SELECT (SELECT length(signature) FROM etf_minhash LIMIT 1),
+               (SELECT max(band) + 1 FROM etf_lsh);
+        """
+    ).fetchone()
+    return (length is not None and length != NUM_HASHES * 8) or (
+        bands is not None and bands != BANDS
+    )
+
+
+def refresh_similarity_index(
+    conn: sqlite3.Connection, changed_isins: Iterable[str] | None = None
+) -> int:
+    """
+    (Re)compute signatures and LSH buckets for ETFs whose holdings changed;
+    None rebuilds the whole index, as does an index built with another
+    BANDS x ROWS layout. Returns the number of ETFs indexed.
+    """
+    if changed_isins is None or _layout_changed(conn):
+        conn.execute("DELETE FROM etf_lsh;")
+        conn.execute("DELETE FROM etf_minhash;")
+        matrix = weight_matrix(conn)
+        isins = matrix["etf_isin"].unique().to_list()
+    else:
+        isins = list(dict.fromkeys(changed_isins))
+        if not isins:
+            return 0
+        matrix = weight_matrix(conn, isins)
+        placeholders = ", ".join("?" for _ in isins)
+        conn.execute(f"DELETE FROM etf_lsh WHERE etf_isin IN ({placeholders})", isins)
+        conn.execute(
+            f"DELETE FROM etf_minhash WHERE etf_isin IN ({placeholders})", isins
+        )
+
+    signatures = compute_signatures(matrix, isins)
+    conn.executemany(
+        "INSERT INTO etf_minhash(etf_isin, signature) VALUES (?, ?);",
+        ((isin, sig.tobytes()) for isin, sig in signatures.items()),
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO etf_lsh(band, bucket, etf_isin) VALUES (?, ?, ?);",
+        (
+            (band, bucket, isin)
+            for isin, sig in signatures.items()
+            for band, bucket in _buckets(sig)
+        ),
+    )
+    return len(signatures)
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+def _signature(blob: bytes) -> array:
+    signature = array("q")
+    signature.frombytes(blob)
+    return signature
+
+
+def lsh_candidates(conn: sqlite3.Connection, isin: str) -> Dict[str, array]:
+    """ETFs sharing at least one LSH bucket with `isin` -> their signatures."""
+    rows = conn.execute(
+        """
+        SELECT DISTINCT l.etf_isin, m.signature
+          FROM etf_lsh     AS q
+          JOIN etf_lsh     AS l ON l.band = q.band AND l.bucket = q.bucket
+          JOIN etf_minhash AS m ON m.etf_isin = l.etf_isin
+         WHERE q.etf_isin = ? AND l.etf_isin <> q.etf_isin;
+        """,
+        (isin,),
+    )
+    return {other: _signature(blob) for other, blob in rows}
+
+
+def similar_etfs(
+    conn: sqlite3.Connection, isin: str, limit: int = 20
+) -> List[Tuple[str, float]]:
+    """
+    Approximate most similar ETFs -> [(isin, estimated similarity)], best first.
+    Candidates come from shared LSH buckets and are ranked by signature agreement.
+    """
+    row = conn.execute(
+        "SELECT signature FROM etf_minhash WHERE etf_isin = ?;", (isin,)
+    ).fetchone()
+    if row is None:
+        return []
+    signature = _signature(row[0])
+    scored = [
+        (other, _similarity(signature, sig))
+        for other, sig in lsh_candidates(conn, isin).items()
+    ]
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored[:limit]
+
+
+def recall_benchmark(
+    conn: sqlite3.Connection, *, sample: int = 100, k: int = 20, seed: int = 0
+) -> Dict[str, float]:
+    """
+    Recall@k of similar_etfs() against the exact top-k by min-weight overlap,
+    query latency, and how selective the LSH filter is: candidates per query
+    and their precision (share of candidates in the exact top-k), over a
+    random sample of indexed ETFs.
+    """
+    isins = [row[0] for row in conn.execute("SELECT etf_isin FROM etf_minhash;")]
+    queries = random.Random(seed).sample(isins, min(sample, len(isins)))
+    if not queries:
+        return {
+            "queries": 0,
+            "recall": 0.0,
+            "candidates": 0.0,
+            "precision": 0.0,
+            "mean_ms": 0.0,
+            "max_ms": 0.0,
+        }
+
+    exact = compute_overlap(weight_matrix(conn), queries, top_k=k)
+    truth: Dict[str, set] = {}
+    for isin, neighbour in exact.select("etf_isin", "neighbour_isin").iter_rows():
+        truth.setdefault(isin, set()).add(neighbour)
+
+    hits: Counter = Counter()
+    latencies = []
+    for isin in queries:
+        t0 = time.perf_counter()
+        found = {other for other, _ in similar_etfs(conn, isin, k)}
+        latencies.append((time.perf_counter() - t0) * 1000)
+        expected = truth.get(isin, set())
+        hits["hit"] += len(found & expected)
+        hits["total"] += len(expected)
+        candidates = lsh_candidates(conn, isin)
+        hits["candidates"] += len(candidates)
+        hits["true_candidates"] += len(candidates.keys() & expected)
+
+    return {
+        "queries": len(queries),
+        "recall": hits["hit"] / hits["total"] if hits["total"] else 1.0,
+        "candidates": hits["candidates"] / len(queries),
+        "precision": (
+            hits["true_candidates"] / hits["candidates"] if hits["candidates"] else 1.0
+        ),
+        "mean_ms": sum(latencies) / len(latencies),
+        "max_ms": max(latencies),
+    }
@@ -0,0 +1,202 @@
+import datetime
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+from urllib.parse import quote
+
+import polars as pl
+
+SNAPSHOT_DIR = "snapshots"
+ROW_GROUP_SIZE = 100_000
+# Hive's name for a NULL partition value; scan_parquet reads it back as null
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+class Table(NamedTuple):
+    sql: str
+    # Low-cardinality strings are Categorical, i.e. dictionary-encoded on disk
+    schema: Dict[str, pl.DataType]
+    sort: List[str]
+    by_issuer: bool = True
+
+
+# Each table is written as <root>/<name>/snapshot_date=YYYY-MM-DD/issuer=<issuer>/data.parquet
+# (securities belong to no issuer and are only partitioned by date). Query
+# columns are named as in `schema`, which also fixes their order and types.
+TABLES: Dict[str, Table] = {
+    "etfs": Table(
+        sql="""
+        SELECT isin, issuer, name, ticker, ter, nav, size, currency, asset_class,
+               sub_asset_class, region, use_of_profits, replication, domicile,
+               inception_date, url
+          FROM v_etfs
+        """,
+        schema={
+            "isin": pl.String,
+            "issuer": pl.String,
+            "name": pl.String,
+            "ticker": pl.String,
+            "ter": pl.Float64,
+            "nav": pl.Float64,
+            "size": pl.Float64,
+            "currency": pl.Categorical,
+            "asset_class": pl.Categorical,
+            "sub_asset_class": pl.Categorical,
+            "region": pl.Categorical,
+            "use_of_profits": pl.Categorical,
+            "replication": pl.Categorical,
+            "domicile": pl.Categorical,
+            "inception_date": pl.String,
+            "url": pl.String,
+        },
+        sort=["isin"],
+    ),
+    "securities": Table(
+        sql="SELECT id, isin, name, sector, country, currency FROM v_securities",
+        schema={
+            "id": pl.Int64,
+            "isin": pl.String,
+            "name": pl.String,
+            "sector": pl.Categorical,
+            "country": pl.Categorical,
+            "currency": pl.Categorical,
+        },
+        sort=["id"],
+        by_issuer=False,
+    ),
+    "etf_holdings": Table(
+        sql="""
+        SELECT e.issuer, eh.etf_isin, eh.security_id, eh.weight
+          FROM etf_holdings AS eh
+          JOIN v_etfs AS e ON e.isin = eh.etf_isin
+        """,
+        schema={
+            "issuer": pl.String,
+            "etf_isin": pl.String,
+            "security_id": pl.Int64,
+            "weight": pl.Float64,
+        },
+        sort=["etf_isin", "security_id"],
+    ),
+    # Denormalized v_holdings, enough for most analytics without any join
+    "holdings": Table(
+        sql="""
+        SELECT e.issuer, eh.etf_isin, e.name AS etf_name, eh.security_id,
+               s.isin AS holding_isin, s.name AS holding_name,
+               s.sector, s.country, s.currency, eh.weight
+          FROM etf_holdings AS eh
+          JOIN v_etfs       AS e ON e.isin = eh.etf_isin
+          JOIN v_securities AS s ON s.id = eh.security_id
+        """,
+        schema={
+            "issuer": pl.String,
+            "etf_isin": pl.String,
+            "etf_name": pl.String,
+            "security_id": pl.Int64,
+            "holding_isin": pl.String,
+            "holding_name": pl.String,
+            "sector": pl.Categorical,
+            "country": pl.Categorical,
+            "currency": pl.Categorical,
+            "weight": pl.Float64,
+        },
+        sort=["etf_isin", "security_id"],
+    ),
+}
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+def _write(frame: pl.DataFrame, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    frame.write_parquet(
+        path, compression="zstd", statistics=True, row_group_size=ROW_GROUP_SIZE
+    )
+
+
+def _issuer_partition(issuer: str | None) -> str:
+    return f"issuer={NULL_PARTITION if issuer is None else quote(issuer, safe='')}"
+
+
+def export_snapshot(
+    conn: sqlite3.Connection,
+    root: str | Path = SNAPSHOT_DIR,
+    snapshot_date: datetime.date | None = None,
+) -> Dict[str, int]:
+    """
+    Write every table in TABLES as Parquet under `root`, partitioned by snapshot
+    date and issuer. Rows are sorted and file names fixed, so exporting the same
+    database twice yields the same files; an existing snapshot for the same date
+    is replaced. Rows are read in ROW_GROUP_SIZE batches straight into columns
+    (Arrow-native with an ADBC connection), not as one list of tuples. Returns
+    {table: rows written}.
+    """
+    snapshot_date = snapshot_date or datetime.date.today()
+    written: Dict[str, int] = {}
+
+    for name, table in TABLES.items():
+        frame = (
+            pl.read_database(
+                table.sql,
+                conn,
+                batch_size=ROW_GROUP_SIZE,
+                schema_overrides=table.schema,
+            )
+            .select(list(table.schema))
+            .sort(table.sort)
+        )
+        target = Path(root) / name / f"snapshot_date={snapshot_date.isoformat()}"
+        if target.exists():
+            shutil.rmtree(target)
+
+        if not table.by_issuer:
+            _write(frame, target / "data.parquet")
+        else:
+            for (issuer,), part in frame.partition_by(
+                "issuer", as_dict=True, maintain_order=True
+            ).items():
+                _write(
+                    part.drop("issuer"),
+                    target / _issuer_partition(issuer) / "data.parquet",
+                )
+        written[name] = frame.height
+
+    return written
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+def snapshot_dates(root: str | Path = SNAPSHOT_DIR, table: str = "etfs") -> List[str]:
+    """Exported snapshot dates of `table`, oldest first."""
+    base = Path(root) / table
+    if not base.exists():
+        return []
+    return sorted(
+        p.name.split("=", 1)[1] for p in base.glob("snapshot_date=*") if p.is_dir()
+    )
+
+
+def scan_snapshot(
+    table: str,
+    root: str | Path = SNAPSHOT_DIR,
+    snapshot_date: str | datetime.date | None = None,
+) -> pl.LazyFrame:
+    """
+    Lazily scan one exported table (latest snapshot by default). `issuer` and
+    `snapshot_date` come from the directory layout, so filters on them prune
+    whole files and other filters are pushed down to row-group statistics.
+    """
+    if snapshot_date is None:
+        dates = snapshot_dates(root, table)
+        if not dates:
+            raise FileNotFoundError(f"No {table!r} snapshot under {root}")
+        snapshot_date = dates[-1]
+    if isinstance(snapshot_date, str):
+        snapshot_date = datetime.date.fromisoformat(snapshot_date)
+
+    return pl.scan_parquet(
+        Path(root) / table / "**" / "*.parquet", hive_partitioning=True
+    ).filter(pl.col("snapshot_date") == snapshot_date)
@@ -1,12 +1,24 @@
-ETF_PROPERTY_TRANSLATE = {
+import sys
+from functools import lru_cache
+from typing import Dict, Optional
+
+import polars as pl
+
+REGION_TRANSLATE = {
     "Globale": "global",
     "Nord America": "north america",
     "Europa": "europe",
     "Medio Oriente e Africa": "middle east and africa",
     "Asia Pacifico": "asia pacific",
+}
+
+ASSET_CLASS_TRANSLATE = {
     "Azionario": "equity",
     "Reddito Fisso": "fixed income",
     "Immobiliare": "real estate",
+}
+
+SECTOR_TRANSLATE = {
     "IT": "information technology",
     "Finanziari": "financials",
     "Materiali": "materials",
@@ -21,15 +33,21 @@ ETF_PROPERTY_TRANSLATE = {
     "Tesoro": "treasury",
     "Energia": "energy",
     "Immobili": "real estate",
+    "Immobiliare": "real estate",
     "Attività bancarie": "banking",
-    # Why not just looking at distribution_method in amundi?
-    # because it's often stated Capitalisation and/or distribution which is not
-    # informative
+}
+
+# Why not just looking at distribution_method in amundi?
+# because it's often stated Capitalisation and/or distribution which is not
+# informative
+USE_OF_PROFITS_TRANSLATE = {
     "Distribution": "dist",
     "Capitalizzazione": "acc",
     "Distribuzione": "dist",
     "UCITS ETF EUR Dist": "dist",
     "Accumulation": "acc",
+    "Accumulating": "acc",
+    "Distributing": "dist",
     "EUR Acc": "acc",
     "EUR Dist": "dist",
     "UCITS ETF Acc": "acc",
@@ -61,16 +79,60 @@ ETF_PROPERTY_TRANSLATE = {
     "UCITS ETF - DAILY HEDGED EUR (C)": "acc",
     "UCITS ETF - EUR (D)": "dist",
     "UCITS ETF - EUR (C)": "acc",
+}
+
+REPLICATION_TRANSLATE = {
     "Direct(Physical)": "physical",
     "Indirect(Swap Based)": "swap",
     "Campionatura stratificata": "stratified sampling",
 }
 
 
-def translate(value):
-    if value and value in ETF_PROPERTY_TRANSLATE:
-        return ETF_PROPERTY_TRANSLATE[value]
+def _interned(table: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    return {k: v if v is None else sys.intern(v) for k, v in table.items()}
+
+
+# One table per field, so a value is only looked up among its own field's labels
+FIELD_TRANSLATE: Dict[str, Dict[str, Optional[str]]] = {
+    "asset_class": _interned(ASSET_CLASS_TRANSLATE),
+    "sub_asset_class": _interned({**ASSET_CLASS_TRANSLATE, **SECTOR_TRANSLATE}),
+    "region": _interned(REGION_TRANSLATE),
+    "sector": _interned(SECTOR_TRANSLATE),
+    "use_of_profits": _interned(USE_OF_PROFITS_TRANSLATE),
+    "replication": _interned(REPLICATION_TRANSLATE),
+}
+
+# Every label, for callers that don't say which field a value belongs to
+ETF_PROPERTY_TRANSLATE = _interned(
+    {k: v for table in FIELD_TRANSLATE.values() for k, v in table.items()}
+)
+
+
+@lru_cache(maxsize=8192)
+def _translate(value: str, field: Optional[str]) -> Optional[str]:
+    table = FIELD_TRANSLATE[field] if field else ETF_PROPERTY_TRANSLATE
+    if value in table:
+        return table[value]
+    return sys.intern(value.lower().strip())
+
+
+def translate(value, field: Optional[str] = None):
+    """
+    Normalized label for `value`, looked up in `field`'s table (every table if
+    None), else lowercased. Results are interned and memoized, so repeated
+    values (e.g. one sector per holding) share a single string.
+    """
     if value:
-        return value.lower().strip()
+        return _translate(value, field)
     else:
         return None
+
+
+def translate_column(values: pl.Series, field: Optional[str] = None) -> pl.Series:
+    """
+    Vectorized translate() for a (String or Categorical) column: each distinct
+    value is translated once, then broadcast with a single replace.
+    """
+    values = values.cast(pl.String)
+    mapping = {v: translate(v, field) for v in values.drop_nulls().unique()}
+    return values.replace_strict(mapping, default=None, return_dtype=pl.String)
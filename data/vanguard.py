@@ -1,12 +1,26 @@
 import json
-from utilities.common import Holding, ETF
-from utilities.database import (
-    open_db,
-    upsert_holding,
-    upsert_security,
-    upsert_etf,
-    setup_database,
+import sys
+from typing import Dict, List, Optional, Tuple
+from utilities.common import Holding, ETF, standardize_date
+from utilities.database import open_db, setup_database
+from utilities.derived import refresh_derived
+from utilities.journal import finish_run, mark_loaded, start_run
+from utilities.loader import load_holdings
+from utilities.metrics import recorded_run
+from utilities.prices import append_prices
+from utilities.profiling import profile_mode, profiled, section
+from utilities.refresh import (
+    ALL_GROUPS,
+    NAV_ONLY,
+    plan_refresh,
+    refresh_etfs,
+    stale,
 )
+from utilities.translate import translate
+from utilities.search import optimize_search_index
+from utilities.country import report_unmatched_countries
+
+DB_NAME = "database.db"
 
 url = "https://www.it.vanguard/gpx/graphql"
 port_ids = [
@@ -761,18 +775,130 @@ def get_etf_list():
 
     response = requests.request("POST", url, json=payload, headers=headers)
 
-    funds = json.loads(response.text)["data"]["funds"]
-    pid_isin = {}
-    for fund in funds:
-        print(fund["portId"])
-        try:
-            pid_isin[fund["portId"]] = [
-                x for x in fund["profile"]["identifiers"] if x["altId"] == "ISIN"
-            ][0]["altIdValue"]
-        except:
-            pid_isin[fund["portId"]] = None
+    return parse_funds(json.loads(response.text)["data"])
+
+
+# ---------------------------------------------------------------------------
+# FundsQuery payload parsing
+# ---------------------------------------------------------------------------
+def _dig(obj, *path):
+    """Follow `path` through nested dicts; GraphQL lists on the way yield their first item."""
+    for key in path:
+        if isinstance(obj, list):
+            obj = obj[0] if obj else None
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(key)
+    return obj
+
+
+def _as_list(obj) -> list:
+    if obj is None:
+        return []
+    return obj if isinstance(obj, list) else [obj]
+
+
+def _identifier(identifiers, *alt_ids) -> Optional[str]:
+    by_id = {x.get("altId"): x.get("altIdValue") for x in _as_list(identifiers)}
+    return next((by_id[a] for a in alt_ids if by_id.get(a)), None)
+
+
+def _date(value) -> Optional[str]:
+    """'2025-09-30T00:00:00-04:00' -> '2025-09-30'."""
+    return standardize_date(str(value)[:10]) if value else None
+
+
+def _ter(profile) -> Optional[float]:
+    fees = _dig(profile, "feesAndExpenses", "feesAndExpensesType")
+    values = {
+        x.get("code"): x.get("value")
+        for x in _as_list(_dig(fees, "expenseType")) + _as_list(_dig(fees, "feeType"))
+    }
+    return next(
+        (values[c] for c in ("TOTEXPRTPC", "ADJEXPRTPC", "MFEXP") if values.get(c)),
+        None,
+    )
+
+
+def parse_funds(
+    data: Dict,
+) -> Tuple[Dict[str, Optional[str]], List[ETF], List[Tuple]]:
+    """
+    One pass over the FundsQuery response -> ({portId: isin}, ETFs with their
+    facts, etf_prices rows). The latest NAV and the monthly AUM history both
+    become (isin, date, nav, size) rows; the latest AUM is also the ETF size.
+    """
+    history = {
+        h.get("portId"): h for h in _as_list(data.get("polarisAnalyticsHistory"))
+    }
+    pid_isin: Dict[str, Optional[str]] = {}
+    etfs: List[ETF] = []
+    prices: List[Tuple] = []
+
+    for fund in _as_list(data.get("funds")):
+        pid = fund.get("portId")
+        profile = fund.get("profile") or {}
+        isin = _identifier(profile.get("identifiers"), "ISIN")
+        pid_isin[pid] = isin
+        if not isin or len(isin) != 12:
+            continue
+
+        nav = None
+        for item in _as_list(_dig(fund, "pricingDetails", "navPrices", "items")):
+            date = _date(item.get("asOfDate"))
+            if date and item.get("price") is not None:
+                prices.append((isin, date, float(item["price"]), None))
+                nav = nav or item["price"]
+
+        aum = []
+        for item in _as_list(
+            _dig(history.get(pid), "monthly", "valuation", "fund", "items")
+        ):
+            for point in _as_list(item.get("AUM")):
+                date = _date(point.get("effectiveDate"))
+                if date and point.get("fundAssetAmount") is not None:
+                    aum.append((date, float(point["fundAssetAmount"])))
+        prices.extend((isin, date, None, amount) for date, amount in aum)
+
+        currency = profile.get("fundCurrency")
+        use_of_profits = translate(
+            profile.get("distributionStrategy"), "use_of_profits"
+        )
+        listing_ticker = next(
+            (
+                _identifier(
+                    listing.get("identifiers"), "Ticker", "Borsa Italiana Ticker"
+                )
+                for listing in _as_list(profile.get("listings"))
+                if listing.get("identifiers")
+            ),
+            None,
+        )
+        etfs.append(
+            ETF(
+                isin=isin,
+                issuer="vanguard",
+                name=profile.get("fundFullName"),
+                ticker=_identifier(profile.get("identifiers"), "Ticker")
+                or listing_ticker,
+                ter=_ter(profile),
+                nav=nav,
+                size=max(aum)[1] if aum else None,
+                currency=currency if currency and len(currency) == 3 else None,
+                asset_class=profile.get("assetClassificationLevel1"),
+                sub_asset_class=_dig(
+                    profile, "assetClassSubcategories", "INT", "level3"
+                ),
+                region=profile.get("marketRegionFocus"),
+                use_of_profits=use_of_profits
+                if use_of_profits in ("acc", "dist")
+                else None,
+                domicile=profile.get("marketOfDomicile"),
+                inception_date=_date(profile.get("fundInceptionDate")),
+            )
+        )
 
-    return pid_isin
+    return pid_isin, etfs, prices
 
 
 def get_holdings_data(pid, isin, last_item_key=None):
@@ -827,18 +953,19 @@ def get_holdings_data(pid, isin, last_item_key=None):
     ]
 
     cleaned = []
-    for holding in holdings:
-        cleaned.append(
-            Holding(
-                etf_isin=isin,
-                holding_isin=holding["isin"],
-                weight=holding["marketValuePercentage"],
-                holding_name=holding["issuerName"],
-                sector=holding["icbIndustryDescription"],
-                country=holding["bloombergIsoCountry"],
-                currency=None,
+    with section("vanguard holdings loop"):
+        for holding in holdings:
+            cleaned.append(
+                Holding(
+                    etf_isin=isin,
+                    holding_isin=holding["isin"],
+                    weight=holding["marketValuePercentage"],
+                    holding_name=holding["issuerName"],
+                    sector=holding["icbIndustryDescription"],
+                    country=holding["bloombergIsoCountry"],
+                    currency=None,
+                )
             )
-        )
 
     if last_key is not None:
         cleaned.extend(get_holdings_data(pid, isin, last_item_key=last_key))
@@ -846,56 +973,85 @@ def get_holdings_data(pid, isin, last_item_key=None):
     return cleaned
 
 
-if __name__ == "__main__":
-    pid_to_isin = get_etf_list()
-
-    # keep only valid ISINs
-    isins_to_update = [i for i in pid_to_isin.values() if i and len(i) == 12]
-
-    with open_db("database.db") as conn:
-        setup_database(conn)
-        # 1) ensure ETFs exist (minimal facts)
-        for isin in isins_to_update:
-            upsert_etf(conn, ETF(isin=isin, issuer="vanguard").to_db_tuple())
-
-        # 2) clear old holdings for these ETFs (avoid stale rows)
-        if isins_to_update:
-            placeholders = ", ".join("?" for _ in isins_to_update)
-            conn.execute(
-                f"DELETE FROM etf_holdings WHERE etf_isin IN ({placeholders})",
-                isins_to_update,
-            )
+def main(nav_only: bool = False, force: bool = False, profile: Optional[str] = None):
+    """
+    1) Fetch the FundsQuery (facts, latest NAV, AUM history) and write the
+       stale ETF fields
+    2) Fetch stale holdings per ETF and commit each through the shared loader
+    3) Refresh derived tables of the rewritten ETFs
+    nav_only: refresh just NAV/AUM (skips holdings); force: ignore refresh cadences;
+    profile: 'cpu' or 'mem' to profile the run (see utilities.profiling).
+    """
+    with (
+        recorded_run("vanguard", DB_NAME) as metrics,
+        profiled(profile, metrics.run_dir),
+    ):
+        with metrics.stage("fetch"):
+            pid_to_isin, etfs, prices = get_etf_list()
 
-        # 3) fetch + upsert securities & holdings
-        for pid, etf_isin in pid_to_isin.items():
-            if not etf_isin or len(etf_isin) != 12:
-                continue
+        # keep only valid ISINs
+        isin_to_pid = {
+            isin: pid for pid, isin in pid_to_isin.items() if isin and len(isin) == 12
+        }
+        metrics.add("etfs", len(isin_to_pid))
 
-            try:
-                rows = get_holdings_data(pid, etf_isin)  # -> List[Holding]
-            except Exception as e:
-                print(f"Skipping {pid} ({etf_isin}) due to error: {e}")
-                continue
+        with open_db(DB_NAME) as conn:
+            setup_database(conn)
+            # 1) only the stale field groups; the AUM history comes with the prices
+            with metrics.stage("write"):
+                groups = NAV_ONLY if nav_only else ALL_GROUPS
+                plan = plan_refresh(conn, isin_to_pid, groups, force=nav_only or force)
+                refresh_etfs(conn, (etf.to_db_tuple() for etf in etfs), plan)
+                append_prices(conn, (p for p in prices if "prices" in plan[p[0]]))
 
-            for h in rows:
-                # basic hygiene like other scrapers
-                if h.holding_isin and len(h.holding_isin) != 12:
+                # 2) ETFs loaded by an interrupted run are not fetched again
+                stale_isins = stale(plan, "holdings")
+                loaded = start_run(conn, "vanguard", stale_isins)
+                conn.commit()
+            if loaded:
+                print(f"Resuming: {len(loaded)} ETFs were loaded by an interrupted run")
+            isins_to_fetch = [i for i in stale_isins if i not in loaded]
+            if not nav_only:
+                metrics.add("cache_hits", len(isin_to_pid) - len(isins_to_fetch))
+
+            for etf_isin in isins_to_fetch:
+                pid = isin_to_pid[etf_isin]
+                try:
+                    with metrics.stage("fetch"):
+                        rows = get_holdings_data(pid, etf_isin)  # -> List[Holding]
+                except Exception as e:
+                    # the ETF keeps its previous holdings
+                    print(f"Skipping {pid} ({etf_isin}) due to error: {e}")
+                    metrics.add("failed_etfs")
+                    continue
+                if not rows:
+                    print(
+                        f"Warning: no holdings returned for {etf_isin}, keeping the old ones"
+                    )
+                    metrics.add("empty_etfs")
                     continue
-                weight = h.weight if (h.weight is not None and h.weight >= 0) else 0.0
-                name = h.holding_name or (
-                    "CASH" if h.sector == "cash" else h.holding_isin or "UNKNOWN"
-                )
 
-                sec_id = upsert_security(
-                    conn,
-                    isin=h.holding_isin,
-                    name=str(name),
-                    sector=h.sector,
-                    country=h.country,
-                    currency=h.currency,
-                )
-                upsert_holding(
-                    conn, etf_isin=etf_isin, security_id=sec_id, weight=weight
-                )
+                with metrics.stage("write"), conn:
+                    written = load_holdings(
+                        conn, [etf_isin], (h.to_db_tuple() for h in rows)
+                    )
+                    mark_loaded(conn, "vanguard", etf_isin)
+                metrics.add("holdings", written)
+                loaded.add(etf_isin)
 
-    print("✅ Vanguard holdings saved to database.")
+            # 3) refresh look-through, overlaps, ... for the rewritten ETFs, compact search index
+            with metrics.stage("derived"):
+                refresh_derived(conn, sorted(loaded))
+                finish_run(conn, "vanguard")
+                optimize_search_index(conn)
+
+        report_unmatched_countries()
+        print("✅ Vanguard scraping complete. Database is up to date.")
+
+
+if __name__ == "__main__":
+    main(
+        nav_only="--nav-only" in sys.argv,
+        force="--force" in sys.argv,
+        profile=profile_mode(),
+    )
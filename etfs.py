@@ -63,41 +63,14 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(conn, pl, portfolio_pct):
-    dfs = []
-    for k, v in portfolio_pct.items():
-        df = (
-            pl.read_database(
-                query=f"""
-                    SELECT *
-                    FROM v_holdings
-                    WHERE etf_isin="{k}";
-                   """,
-                connection=conn,
-            )
-            .with_columns(
-                pl.col("weight") * v,
-            )
-            .filter(pl.col("weight") > 0)
-        )
-        dfs.append(df)
-
-
-    complete_portfolio = (
-        pl.concat(dfs)
-        .drop("etf_isin")
-        .group_by("holding_isin")
-        .agg(
-            pl.first("holding_name").alias("holding_name"),
-            pl.sum("weight").alias("weight"),
-            pl.first("sector").alias("sector"),
-            pl.first("country").alias("country"),
-            pl.first("currency").alias("currency"),
-        )  
-        .sort(by="weight", descending=True)
-    )
+def _(conn, portfolio):
+    from data.utilities.exposure import portfolio_exposure
+
+    # Holding, sector, country and currency breakdowns in one SQL pass
+    exposure = portfolio_exposure(conn, portfolio)
+    complete_portfolio = exposure.holdings.drop("security_id")
     complete_portfolio
-    return (complete_portfolio,)
+    return complete_portfolio, exposure
 
 
 @app.cell(hide_code=True)
@@ -107,14 +80,8 @@ def _(mo):
 
 
 @app.cell
-def _(complete_portfolio, pl):
-    geo_allocation = (
-        complete_portfolio.select(["country", "weight"])
-        .group_by("country")
-        .agg([pl.col("weight").sum()])
-        .filter(pl.col("weight") >= 0)
-        .sort(pl.col("weight"), descending=True)
-    )
+def _(exposure, pl):
+    geo_allocation = exposure.countries.filter(pl.col("weight") >= 0)
     geo_allocation
     return (geo_allocation,)
 
@@ -144,14 +111,9 @@ def _(mo):
 
 
 @app.cell(hide_code=True)
-def _(complete_portfolio, pl):
-    sector_allocation = (
-        complete_portfolio.select(["sector", "weight"])
-        .group_by("sector")
-        .agg([pl.col("weight").sum()])
-        .filter(pl.col("weight") >= 0)
-        .sort(pl.col("weight"), descending=True)
-        .filter(pl.col("sector").is_not_null())
+def _(exposure, pl):
+    sector_allocation = exposure.sectors.filter(
+        pl.col("weight") >= 0, pl.col("sector").is_not_null()
     )
 
     sector_allocation
@@ -0,0 +1,12 @@
+import pytest
+
+from utilities.database import open_db, setup_database
+
+
+@pytest.fixture
+def conn():
+    """Empty in-memory database with the full schema (foreign keys on)."""
+    conn = open_db(":memory:")
+    setup_database(conn)
+    yield conn
+    conn.close()
@@ -0,0 +1,76 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Set, Tuple
+from urllib.parse import urlsplit
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+class FixtureServer:
+    """
+    Local HTTP server answering from JSON files, for scraper tests:
+        GET  /a/b  -> <root>/a/b.json
+        POST /a/b  -> <root>/a/b.POST.json
+    Query strings are ignored, missing files answer 404 and paths in `failing`
+    answer 503. Every request is recorded as (method, path) in `requests`.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.failing: Set[str] = set()
+        self.requests: List[Tuple[str, str]] = []
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _answer(self, method: str) -> None:
+                path = urlsplit(self.path).path
+                server.requests.append((method, path))
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+
+                suffix = ".POST.json" if method == "POST" else ".json"
+                file = server.root / (path.strip("/") + suffix)
+                if path in server.failing:
+                    self._send(503, {"error": "unavailable"})
+                elif file.is_file():
+                    self._send(200, json.loads(file.read_text()))
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def _send(self, status: int, body) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._answer("GET")
+
+            def do_POST(self):
+                self._answer("POST")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,30 @@
+from typing import Dict, Iterable
+
+from utilities.common import ETF, Holding
+from utilities.database import upsert_etfs
+from utilities.isin import _with_check_digit
+from utilities.loader import load_holdings
+
+
+def make_isin(n: int, country: str = "US") -> str:
+    """Valid (check digit included) synthetic ISIN number `n`."""
+    return _with_check_digit(f"{country}{n:09d}")
+
+
+def add_etfs(conn, isins: Iterable[str], issuer: str = "test") -> None:
+    upsert_etfs(conn, [ETF(isin, issuer).to_db_tuple() for isin in isins])
+
+
+def load(conn, etf_isin: str, weights: Dict[str, float], **attributes) -> int:
+    """Replace the holdings of `etf_isin` with {holding_isin: weight}."""
+    sector = attributes.get("sector")
+    country = attributes.get("country")
+    currency = attributes.get("currency")
+    return load_holdings(
+        conn,
+        [etf_isin],
+        [
+            Holding(etf_isin, isin, isin, w, sector, country, currency).to_db_tuple()
+            for isin, w in weights.items()
+        ],
+    )
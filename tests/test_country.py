@@ -0,0 +1,44 @@
+import polars as pl
+import pytest
+from utilities.country import (
+    countries_to_iso3,
+    country_to_iso3,
+    unmatched_countries,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clean_report():
+    unmatched_countries(reset=True)
+    yield
+    unmatched_countries(reset=True)
+
+
+@pytest.mark.parametrize(
+    "raw",
+    ["US", "USA", "840", "United States", "Stati Uniti", "u.s.", "  ÉTATS-UNIS "],
+)
+def test_codes_and_aliases_resolve_to_iso3(raw):
+    assert country_to_iso3(raw) == "USA"
+
+
+def test_placeholders_are_empty_but_typos_are_reported():
+    assert country_to_iso3("N/A") is None
+    assert country_to_iso3("") is None
+    assert country_to_iso3("Germny") is None
+    assert country_to_iso3("Germny") is None
+    assert unmatched_countries() == [("Germny", 2)]
+
+
+def test_column_resolution_matches_scalar_and_counts_misses():
+    values = pl.Series(["IT", "Giappone", "Atlantis", None, "jpn", "Atlantis"])
+    assert countries_to_iso3(values).to_list() == [
+        "ITA",
+        "JPN",
+        None,
+        None,
+        "JPN",
+        None,
+    ]
+    assert unmatched_countries(reset=True) == [("Atlantis", 2)]
+    assert unmatched_countries() == []
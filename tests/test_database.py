@@ -0,0 +1,59 @@
+from utilities.common import ETF, Holding
+from utilities.database import upsert_etf
+from utilities.loader import load_holdings
+
+ETF_ISIN = "IE00B4L5Y983"
+
+
+def _etf_row(conn):
+    return conn.execute(
+        "SELECT name, ticker, ter, currency_id, domicile_id FROM etfs WHERE isin = ?;",
+        (ETF_ISIN,),
+    ).fetchone()
+
+
+def _holdings(conn):
+    return conn.execute(
+        """
+        SELECT s.isin, h.weight FROM etf_holdings AS h
+          JOIN securities AS s ON s.id = h.security_id
+         WHERE h.etf_isin = ?
+         ORDER BY s.isin;
+        """,
+        (ETF_ISIN,),
+    ).fetchall()
+
+
+def test_reupsert_keeps_holdings_and_columns(conn):
+    etf = ETF(
+        isin=ETF_ISIN,
+        issuer="iShares",
+        name="iShares Core MSCI World",
+        ticker="SWDA",
+        ter=0.2,
+        currency="USD",
+        domicile="Ireland",
+    )
+    upsert_etf(conn, etf.to_db_tuple())
+    load_holdings(
+        conn,
+        [ETF_ISIN],
+        [
+            Holding(
+                ETF_ISIN, "US0378331005", "Apple", 5.0, None, "US", "USD"
+            ).to_db_tuple(),
+            Holding(
+                ETF_ISIN, "US5949181045", "Microsoft", 4.0, None, "US", "USD"
+            ).to_db_tuple(),
+        ],
+    )
+    conn.commit()
+    before = _etf_row(conn)
+
+    # A bare record (only isin and issuer) must neither delete nor blank the ETF
+    upsert_etf(conn, ETF(isin=ETF_ISIN, issuer="iShares").to_db_tuple())
+    conn.commit()
+
+    assert _holdings(conn) == [("US0378331005", 5.0), ("US5949181045", 4.0)]
+    assert _etf_row(conn) == before
+    assert None not in before
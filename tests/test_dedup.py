@@ -0,0 +1,58 @@
+from utilities.common import ETF, Holding
+from utilities.database import upsert_etfs, upsert_holding
+from utilities.dedup import find_duplicates, write_aliases
+from utilities.loader import load_holdings
+
+ETF_ISIN = "IE00B4L5Y983"
+
+
+def _cash(name, weight):
+    return Holding(ETF_ISIN, None, name, weight, "cash", None, "USD").to_db_tuple()
+
+
+def _weights(conn):
+    return conn.execute(
+        "SELECT security_id, weight FROM etf_holdings WHERE etf_isin = ?;",
+        (ETF_ISIN,),
+    ).fetchall()
+
+
+def test_aliased_rows_of_one_load_add_up(conn):
+    upsert_etfs(conn, [ETF(ETF_ISIN, "iShares").to_db_tuple()])
+    load_holdings(conn, [ETF_ISIN], [_cash("USD CASH", 1.0), _cash("CASH USD", 1.0)])
+    aliases, _ = find_duplicates(conn)
+    write_aliases(conn, aliases)
+    assert aliases.height == 1
+
+    # Both names now resolve to the canonical security: 1.5 + 2.0, not 2.0
+    written = load_holdings(
+        conn, [ETF_ISIN], [_cash("USD CASH", 1.5), _cash("CASH USD", 2.0)]
+    )
+
+    canonical = aliases["canonical_id"][0]
+    assert written == 1
+    assert _weights(conn) == [(canonical, 3.5)]
+
+
+def test_repeated_lines_merge_before_the_write(conn):
+    upsert_etfs(conn, [ETF(ETF_ISIN, "iShares").to_db_tuple()])
+    rows = [
+        Holding(ETF_ISIN, "US0378331005", "Apple", w, None, None, None).to_db_tuple()
+        for w in (2.0, 1.0)
+    ]
+    written = load_holdings(conn, [ETF_ISIN], rows)
+    assert written == 1
+    ((security_id, weight),) = _weights(conn)
+    assert weight == 3.0
+
+    # the row writer itself stays idempotent
+    for _ in range(2):
+        upsert_holding(conn, etf_isin=ETF_ISIN, security_id=security_id, weight=3.0)
+    assert _weights(conn) == [(security_id, 3.0)]
+
+
+def test_reload_replaces_instead_of_accumulating(conn):
+    upsert_etfs(conn, [ETF(ETF_ISIN, "iShares").to_db_tuple()])
+    for _ in range(2):
+        load_holdings(conn, [ETF_ISIN], [_cash("USD CASH", 1.5)])
+    assert [w for _, w in _weights(conn)] == [1.5]
@@ -0,0 +1,134 @@
+from helpers import make_isin
+from utilities.common import ETF, Holding
+from utilities.database import (
+    dimension_id,
+    dimension_ids,
+    open_db,
+    setup_database,
+    upsert_etf,
+)
+from utilities.loader import load_holdings
+
+ETF_ISIN, APPLE = make_isin(1, "IE"), make_isin(2)
+
+# The tables and views that kept labels inline, as created before the
+# dimension tables existed
+OLD_SCHEMA = """
+CREATE TABLE etfs (
+    isin           TEXT PRIMARY KEY,
+    issuer         TEXT NOT NULL,
+    name           TEXT,
+    ticker         TEXT,
+    ter            REAL,
+    nav            REAL,
+    size           REAL,
+    currency       TEXT,
+    asset_class    TEXT,
+    sub_asset_class TEXT,
+    region         TEXT,
+    use_of_profits TEXT,
+    replication    TEXT,
+    domicile       TEXT,
+    inception_date TEXT,
+    url            TEXT
+);
+CREATE TABLE securities (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    isin     TEXT UNIQUE,
+    name     TEXT NOT NULL,
+    sector   TEXT,
+    country  TEXT,
+    currency TEXT
+);
+CREATE UNIQUE INDEX ux_securities_null_isin_name_cc
+ON securities(lower(name), ifnull(currency,''), ifnull(country,''))
+WHERE isin IS NULL;
+CREATE INDEX idx_securities_sector  ON securities(sector);
+CREATE INDEX idx_securities_country ON securities(country);
+CREATE TABLE etf_holdings (
+    etf_isin    TEXT    NOT NULL REFERENCES etfs(isin) ON DELETE CASCADE,
+    security_id INTEGER NOT NULL REFERENCES securities(id) ON DELETE CASCADE,
+    weight      REAL    NOT NULL,
+    PRIMARY KEY (etf_isin, security_id)
+);
+CREATE VIEW v_holdings AS
+SELECT eh.etf_isin, s.isin AS holding_isin, s.name AS holding_name,
+       s.sector, s.country, s.currency, eh.weight
+FROM etf_holdings AS eh JOIN securities AS s ON s.id = eh.security_id;
+"""
+
+
+def test_labels_are_stored_once(conn):
+    first = dimension_id(conn, "country", "USA")
+    assert dimension_id(conn, "domicile", "USA") == first
+    keys = dimension_ids(conn, "country", ["USA", None, "IRL", "USA"])
+    assert keys == {"USA": first, "IRL": keys["IRL"]}
+    assert conn.execute("SELECT COUNT(*) FROM countries;").fetchone() == (2,)
+    assert dimension_id(conn, "sector", None) is None
+
+
+def test_views_expose_the_labels(conn):
+    upsert_etf(
+        conn, ETF(ETF_ISIN, "iShares", currency="USD", domicile="IRL").to_db_tuple()
+    )
+    load_holdings(
+        conn,
+        [ETF_ISIN],
+        [Holding(ETF_ISIN, APPLE, "Apple", 5.0, "IT", "US", "USD").to_db_tuple()],
+    )
+    assert conn.execute(
+        "SELECT issuer, currency, domicile FROM v_etfs;"
+    ).fetchall() == [("iShares", "USD", "IRL")]
+    assert conn.execute(
+        "SELECT isin, sector, country, currency FROM v_securities;"
+    ).fetchall() == [(APPLE, "information technology", "USA", "USD")]
+    assert conn.execute("SELECT COUNT(*) FROM currencies;").fetchone() == (1,)
+
+
+def test_old_database_is_migrated_in_place(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = open_db(path)
+    conn.executescript(OLD_SCHEMA)
+    conn.execute(
+        "INSERT INTO etfs(isin, issuer, name, currency, domicile) "
+        "VALUES (?, 'Vanguard', 'Old ETF', 'EUR', 'IRL');",
+        (ETF_ISIN,),
+    )
+    conn.executemany(
+        "INSERT INTO securities(isin, name, sector, country, currency) "
+        "VALUES (?, ?, ?, ?, ?);",
+        [
+            (APPLE, "Apple", "information technology", "USA", "USD"),
+            (None, "Cash", None, None, "EUR"),
+        ],
+    )
+    conn.execute("INSERT INTO etf_holdings VALUES (?, 1, 7.5);", (ETF_ISIN,))
+    conn.commit()
+
+    setup_database(conn)
+    setup_database(conn)  # already migrated: a no-op
+
+    securities = {row[1] for row in conn.execute("PRAGMA table_info(securities);")}
+    assert {"sector", "country", "currency"}.isdisjoint(securities)
+    assert conn.execute(
+        "SELECT issuer, name, currency, domicile FROM v_etfs;"
+    ).fetchall() == [("Vanguard", "Old ETF", "EUR", "IRL")]
+    assert conn.execute(
+        "SELECT isin, name, sector, country, currency FROM v_securities ORDER BY id;"
+    ).fetchall() == [
+        (APPLE, "Apple", "information technology", "USA", "USD"),
+        (None, "Cash", None, None, "EUR"),
+    ]
+    assert conn.execute(
+        "SELECT holding_isin, sector, weight FROM v_holdings;"
+    ).fetchall() == [(APPLE, "information technology", 7.5)]
+    assert conn.execute("PRAGMA foreign_key_check;").fetchall() == []
+
+    # Writers keep working on the migrated tables
+    load_holdings(
+        conn,
+        [ETF_ISIN],
+        [Holding(ETF_ISIN, APPLE, "Apple", 8.0, "IT", "US", "USD").to_db_tuple()],
+    )
+    assert conn.execute("SELECT weight FROM v_holdings;").fetchall() == [(8.0,)]
+    conn.close()
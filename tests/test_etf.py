@@ -0,0 +1,57 @@
+import pytest
+from utilities.common import ETF
+
+FIELDS = ETF._fields
+
+RECORDS = [
+    {
+        "isin": "IE00B4L5Y983",
+        "name": "Core MSCI World",
+        "ticker": "SWDA",
+        "ter": "0.2",
+        "nav": 101.5,
+        "size": "-",
+        "currency": "USD",
+        "asset_class": "Azionario",
+        "sub_asset_class": "IT",
+        "region": "Globale",
+        "use_of_profits": "Capitalizzazione",
+        "replication": "Fisica",
+        "domicile": "Irlanda",
+        "inception_date": "25/09/2009",
+        "url": "https://example.com/swda",
+        "kid_url": "ignored",
+    },
+    {
+        "isin": "LU1681043599",
+        "currency": "",
+        "domicile": "LU",
+        "inception_date": "2018-04-01",
+        "region": "Somewhere New",
+    },
+    {"isin": "FR0010315770", "ter": None, "domicile": "Atlantis"},
+]
+
+
+def test_batch_constructor_matches_per_object_constructor():
+    one_by_one = [
+        ETF(issuer="amundi", **{k: v for k, v in r.items() if k in FIELDS})
+        for r in RECORDS
+    ]
+    batch = ETF.from_records(RECORDS, issuer="amundi")
+    assert batch == one_by_one
+    assert [etf.to_db_tuple() for etf in batch] == [tuple(e) for e in one_by_one]
+    assert all(type(etf) is ETF for etf in batch)
+
+    swda = batch[0]
+    assert (swda.ter, swda.size, swda.domicile) == (0.2, None, "IRL")
+    assert swda.inception_date == "2009-09-25"
+    assert batch[1].currency is None and batch[1].region == "somewhere new"
+
+
+def test_etf_is_a_frozen_slotted_record():
+    etf = ETF("IE00B4L5Y983", "ishares", ter="0.2")
+    assert etf.to_db_tuple() is etf and len(etf) == len(FIELDS)
+    with pytest.raises(AttributeError):
+        etf.ter = 0.1
+    assert not hasattr(etf, "__dict__")
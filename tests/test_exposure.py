@@ -0,0 +1,80 @@
+import pytest
+from helpers import add_etfs, load, make_isin
+from utilities.common import ETF, Holding
+from utilities.database import upsert_etfs
+from utilities.derived import refresh_derived
+from utilities.exposure import (
+    portfolio_exposure,
+    portfolios_exposure,
+    refresh_exposures,
+)
+from utilities.loader import load_holdings
+
+WORLD = "IE00B4L5Y983"
+USA = "IE00B5BMR087"
+APPLE = "US0378331005"
+
+
+def _load(conn, etf_isin, sector):
+    load_holdings(
+        conn,
+        [etf_isin],
+        [Holding(etf_isin, APPLE, "Apple", 10.0, sector, "US", "USD").to_db_tuple()],
+    )
+
+
+def _sectors(conn, etf_isin):
+    return conn.execute(
+        "SELECT sector, weight FROM etf_exposures WHERE etf_isin = ?;", (etf_isin,)
+    ).fetchall()
+
+
+def test_empty_cube_is_built_on_first_read(conn):
+    upsert_etfs(conn, [ETF(WORLD, "iShares").to_db_tuple()])
+    _load(conn, WORLD, "Information Technology")
+    assert _sectors(conn, WORLD) == []  # holdings predate the cube
+
+    exposure = portfolio_exposure(conn, {WORLD: 100.0})
+
+    assert exposure.sectors.rows() == [("information technology", 10.0)]
+    assert _sectors(conn, WORLD) == [("information technology", 10.0)]
+
+
+def test_shared_security_change_refreshes_other_holders(conn):
+    upsert_etfs(conn, [ETF(i, "iShares").to_db_tuple() for i in (WORLD, USA)])
+    _load(conn, WORLD, "Information Technology")
+    _load(conn, USA, "Information Technology")
+    refresh_exposures(conn)
+
+    # Reloading USA reclassifies Apple, which WORLD holds too
+    _load(conn, USA, "Communication Services")
+    refresh_exposures(conn, [USA])
+
+    assert _sectors(conn, WORLD) == [("communication services", 10.0)]
+    assert _sectors(conn, USA) == [("communication services", 10.0)]
+
+
+def test_portfolio_weights_amounts_and_looks_through_nested_etfs(conn):
+    world, usa, fof = make_isin(1, "IE"), make_isin(2, "IE"), make_isin(3, "IE")
+    msft, nestle = make_isin(2), make_isin(3, "CH")
+    add_etfs(conn, [world, usa, fof])
+    load(conn, usa, {APPLE: 60.0, msft: 40.0}, country="US", currency="USD")
+    load(conn, world, {APPLE: 50.0, nestle: 50.0}, country="US", currency="USD")
+    load(conn, fof, {usa: 100.0})
+    refresh_derived(conn)
+
+    exposure = portfolio_exposure(conn, {world: 9000, fof: 1000})
+
+    holdings = dict(exposure.holdings.select("holding_isin", "weight").iter_rows())
+    assert holdings == pytest.approx({APPLE: 51.0, nestle: 45.0, msft: 4.0})
+    assert exposure.currencies.rows() == [("USD", pytest.approx(100.0))]
+
+    # the batch form gives every portfolio the same answer in one pass
+    batch = portfolios_exposure(
+        conn, {1: {world: 9000, fof: 1000}, 2: {usa: 1}}, holdings=False
+    )
+    assert batch.holdings.is_empty()
+    assert batch.currencies.rows() == [
+        ("1", "USD", pytest.approx(100.0)),
+        ("2", "USD", pytest.approx(100.0)),
+    ]
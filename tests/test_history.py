@@ -0,0 +1,70 @@
+import datetime
+import random
+
+import pytest
+from helpers import add_etfs, load, make_isin
+from utilities import history
+from utilities.history import holdings_as_of, record_snapshot, turnover
+
+ETF = make_isin(1, "IE")
+SECURITIES = [make_isin(i) for i in range(12)]
+START = datetime.date(2025, 1, 1)
+
+
+def _state(conn, as_of):
+    frame = holdings_as_of(conn, [ETF], as_of)
+    return dict(zip(frame["security_id"], frame["weight"]))
+
+
+def _current(conn):
+    return dict(
+        conn.execute(
+            "SELECT security_id, weight FROM etf_holdings WHERE etf_isin = ?;", (ETF,)
+        )
+    )
+
+
+def test_checkpoints_and_deltas_reconstruct_every_day(conn, monkeypatch):
+    monkeypatch.setattr(history, "CHECKPOINT_EVERY", 3)
+    rng = random.Random(11)
+    add_etfs(conn, [ETF])
+    expected = {}
+    for day in range(10):
+        as_of = (START + datetime.timedelta(days=day)).isoformat()
+        if day % 4 != 3:  # every fourth day nothing changes and nothing is written
+            picked = rng.sample(SECURITIES, rng.randint(2, 8))
+            load(conn, ETF, {isin: rng.choice([1.0, 2.5, 5.0]) for isin in picked})
+        record_snapshot(conn, [ETF], as_of)
+        expected[as_of] = _current(conn)
+
+    assert (
+        conn.execute("SELECT sum(is_checkpoint) FROM holdings_snapshots;").fetchone()[0]
+        > 1
+    )
+    for as_of, holdings in expected.items():
+        assert _state(conn, as_of) == holdings, as_of
+    assert _state(conn, "2024-12-31") == {}
+
+
+def test_only_the_latest_date_can_be_recorded_again(conn):
+    add_etfs(conn, [ETF])
+    load(conn, ETF, {SECURITIES[0]: 50.0, SECURITIES[1]: 50.0})
+    record_snapshot(conn, [ETF], "2025-01-01")
+    load(conn, ETF, {SECURITIES[0]: 70.0, SECURITIES[1]: 30.0})
+    record_snapshot(conn, [ETF], "2025-01-02")
+    load(conn, ETF, {SECURITIES[0]: 60.0, SECURITIES[1]: 40.0})
+    record_snapshot(conn, [ETF], "2025-01-02")  # same day, fixed holdings
+    assert turnover(conn, [ETF], "2025-01-01", "2025-01-02")["turnover"].to_list() == [
+        10.0
+    ]
+
+    # a backfill would leave 2025-01-02's deltas relative to the old history
+    history_rows = conn.execute(
+        "SELECT * FROM holdings_history ORDER BY 1, 2, 3;"
+    ).fetchall()
+    with pytest.raises(ValueError, match="later snapshot"):
+        record_snapshot(conn, [ETF], "2025-01-01")
+    assert (
+        conn.execute("SELECT * FROM holdings_history ORDER BY 1, 2, 3;").fetchall()
+        == history_rows
+    )
@@ -0,0 +1,55 @@
+from helpers import add_etfs, load, make_isin
+from holders import lookup
+from utilities.common import ETF
+from utilities.database import upsert_etfs
+from utilities.holders import holders_by_isin, holders_by_name, next_cursor
+
+APPLE, APPLIED = make_isin(1), make_isin(2)
+ETFS = [make_isin(i, "IE") for i in range(1, 6)]
+WEIGHTS = [5.0, 7.0, 5.0, 1.0, 7.0]  # ties are ordered by ETF ISIN
+
+
+def _setup(conn):
+    add_etfs(conn, ETFS)
+    for etf, weight in zip(ETFS, WEIGHTS):
+        load(conn, etf, {APPLE: weight, APPLIED: 0.5})
+    conn.execute("UPDATE securities SET name = 'Apple Inc' WHERE isin = ?;", (APPLE,))
+    conn.execute(
+        "UPDATE securities SET name = 'Applied Materials' WHERE isin = ?;", (APPLIED,)
+    )
+
+
+def test_pages_follow_the_weight_ranking_without_gaps_or_repeats(conn):
+    _setup(conn)
+    pages, cursor = [], None
+    while True:
+        page = holders_by_isin(conn, APPLE, after=cursor, limit=2)
+        cursor = next_cursor(page)
+        if cursor is None:
+            break
+        pages.append(page.select("etf_isin", "weight").rows())
+
+    assert [len(p) for p in pages] == [2, 2, 1]
+    assert [row for page in pages for row in page] == [
+        (ETFS[1], 7.0),
+        (ETFS[4], 7.0),
+        (ETFS[0], 5.0),
+        (ETFS[2], 5.0),
+        (ETFS[3], 1.0),
+    ]
+
+
+def test_name_prefix_ticker_and_isin_lookups(conn):
+    _setup(conn)
+    by_name = holders_by_name(conn, "  APPL", limit=100)
+    assert by_name.height == 10  # both securities, every ETF
+    assert set(holders_by_name(conn, "applied")["holding_isin"]) == {APPLIED}
+    assert holders_by_name(conn, "zzz").is_empty()
+
+    # an ETF held by another ETF is found by its ticker
+    parent, held = make_isin(8, "IE"), make_isin(9, "IE")
+    add_etfs(conn, [parent])
+    upsert_etfs(conn, [ETF(held, "test", ticker="HELD").to_db_tuple()])
+    load(conn, parent, {held: 3.0})
+    assert lookup(conn, "held")["etf_isin"].to_list() == [parent]
+    assert lookup(conn, APPLE).height == 5
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import invesco
+from fixture_server import FIXTURES, FixtureServer
+from utilities.common import ETF
+from utilities.database import open_db, setup_database, upsert_etfs
+from utilities.scraper import run
+
+NASDAQ = "IE00BFZPF322"
+WORLD = "IE00B60SX394"
+
+
+@pytest.fixture
+def server(monkeypatch):
+    with FixtureServer(FIXTURES / "invesco") as server:
+        monkeypatch.setattr(invesco, "API_BASE", server.url)
+        yield server
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # run reports land in tmp_path/runs
+    path = str(tmp_path / "database.db")
+    with open_db(path) as conn:
+        setup_database(conn)
+    return path
+
+
+def _scraper(db_path):
+    scraper = invesco.Invesco(db_path)
+    scraper.RETRIES = 0
+    scraper.REQUEST_DELAY = 0.0
+    return scraper
+
+
+async def _discover(scraper):
+    async with scraper:
+        return await scraper.discover_isins()
+
+
+# ---------- Holdings parsing ----------
+def test_parse_holdings_keeps_percentages_below_one():
+    # A diversified fund in percent: every holding below 1%, 100% in total
+    payload = [{"isin": f"H{i}", "weight": 0.5} for i in range(200)]
+    assert {h["weight"] for h in invesco.parse_holdings(payload)} == {0.5}
+
+
+def test_parse_holdings_scales_fractions_numeric_and_string():
+    payload = {"holdings": [{"weight": 0.6}, {"weight": "0.35"}, {"weight": "-"}]}
+    weights = [h["weight"] for h in invesco.parse_holdings(payload)]
+    assert weights == [60.0, 35.0, None]
+
+
+def test_parse_holdings_keeps_totals_close_to_neither_with_a_warning(capsys):
+    # e.g. a top-10 extract: 45 could be 45% or 0.45 of the fund
+    payload = [{"isin": "H1", "weight": 0.25}, {"isin": "H2", "weight": 0.2}]
+    weights = [h["weight"] for h in invesco.parse_holdings(payload, "IE00BFZPF322")]
+    assert weights == [0.25, 0.2]
+    assert "IE00BFZPF322 add up to 0.45" in capsys.readouterr().out
+
+
+def test_parse_holdings_maps_payload_fields():
+    payload = [
+        {
+            "isin": "US67066G1040",
+            "name": "NVIDIA Corp",
+            "weight": 7.5,
+            "sector": "Information Technology",
+            "country": "US",
+            "currency": "USD",
+            "unused": "ignored",
+        }
+    ]
+    assert invesco.parse_holdings(payload) == [
+        {
+            "holding_isin": "US67066G1040",
+            "holding_name": "NVIDIA Corp",
+            "weight": 7.5,
+            "sector": "Information Technology",
+            "country": "US",
+            "currency": "USD",
+        }
+    ]
+
+
+# ---------- Discovery ----------
+def test_discovery_reads_the_listing(server, db_path):
+    assert asyncio.run(_discover(_scraper(db_path))) == [WORLD, NASDAQ]
+
+
+def test_discovery_falls_back_to_known_and_stored_isins(server, db_path):
+    stored = "IE00B4L5Y983"
+    with open_db(db_path) as conn:
+        upsert_etfs(conn, [ETF(stored, "invesco").to_db_tuple()])
+    server.failing.add("/shareclasses")
+
+    isins = asyncio.run(_discover(_scraper(db_path)))
+
+    assert isins == sorted(set(invesco.KNOWN_ISINS) | {stored})
+
+
+# ---------- Full run ----------
+def test_run_writes_facts_and_holdings(server, db_path):
+    asyncio.run(run(_scraper(db_path), force=True, db_path=db_path))
+
+    with open_db(db_path) as conn:
+        etfs = conn.execute(
+            "SELECT isin, ticker, ter FROM v_etfs WHERE issuer = 'invesco' ORDER BY isin;"
+        ).fetchall()
+        holdings = conn.execute(
+            """
+            SELECT h.etf_isin, s.isin, h.weight FROM etf_holdings AS h
+              JOIN securities AS s ON s.id = h.security_id
+             ORDER BY h.etf_isin, s.isin;
+            """
+        ).fetchall()
+
+    assert etfs == [(WORLD, "MXWO", 0.19), (NASDAQ, "EQQQ", 0.3)]
+    assert holdings == [
+        (WORLD, "US02079K3059", 24.8),
+        (WORLD, "US0378331005", 40.0),
+        (WORLD, "US5949181045", 35.0),
+        (NASDAQ, "US0378331005", 60.0),
+        (NASDAQ, "US67066G1040", 40.0),
+    ]
+    assert ("POST", "/shareclasses") in server.requests
@@ -0,0 +1,66 @@
+import polars as pl
+from helpers import add_etfs, make_isin
+from utilities.common import Holding
+from utilities.isin import validate_isins
+from utilities.loader import load_holdings
+
+ETF_ISIN = make_isin(1, "IE")
+
+
+def test_validation_normalizes_then_checks_format_and_digit():
+    raw = [
+        "US0378331005",  # Apple
+        "IE00B4L5Y983",  # iShares Core MSCI World
+        " us03783 31005 ",
+        "US0378331006",
+        "US03783310",
+        "",
+        None,
+    ]
+    result = validate_isins(pl.Series(raw))
+    assert result["raw"].to_list() == raw
+    assert result["isin"].to_list() == [
+        "US0378331005",
+        "IE00B4L5Y983",
+        "US0378331005",
+        "US0378331006",
+        "US03783310",
+        None,
+        None,
+    ]
+    assert result["error"].to_list() == [
+        None,
+        None,
+        None,
+        "check_digit",
+        "format",
+        None,
+        None,
+    ]
+
+
+def test_bad_isins_are_quarantined_instead_of_loaded(conn):
+    add_etfs(conn, [ETF_ISIN])
+    rows = [
+        Holding(ETF_ISIN, "us0378331005", "Apple", 5.0, None, None, "USD"),
+        Holding(ETF_ISIN, "US0378331006", "Apple typo", 1.0, None, None, "USD"),
+        Holding(ETF_ISIN, "N/A", "Futures basket", 2.0, None, None, "USD"),
+        Holding(ETF_ISIN, None, "Cash", 0.5, None, None, "USD"),
+    ]
+    assert load_holdings(conn, [ETF_ISIN], [h.to_db_tuple() for h in rows]) == 2
+
+    assert conn.execute(
+        "SELECT holding_isin, holding_name, weight FROM v_holdings "
+        "ORDER BY weight DESC;"
+    ).fetchall() == [("US0378331005", "Apple", 5.0), (None, "Cash", 0.5)]
+    assert conn.execute(
+        "SELECT etf_isin, raw_isin, holding_name, reason FROM isin_quarantine "
+        "ORDER BY raw_isin;"
+    ).fetchall() == [
+        (ETF_ISIN, "N/A", "Futures basket", "format"),
+        (ETF_ISIN, "US0378331006", "Apple typo", "check_digit"),
+    ]
+
+    # Seen again on the next scrape: still one quarantine row per raw value
+    load_holdings(conn, [ETF_ISIN], [rows[1].to_db_tuple()])
+    assert conn.execute("SELECT COUNT(*) FROM isin_quarantine;").fetchone() == (2,)
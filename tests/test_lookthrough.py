@@ -0,0 +1,59 @@
+import pytest
+from helpers import add_etfs, load, make_isin
+from utilities.lookthrough import back_edges, compute_lookthrough, refresh_lookthrough
+
+FOF, WORLD, A, B = (make_isin(i, "IE") for i in range(1, 5))
+APPLE, MSFT = make_isin(1), make_isin(2)
+
+
+def _exposure(conn, isin):
+    rows = conn.execute(
+        """
+        SELECT s.isin, lt.weight, lt.depth FROM etf_lookthrough AS lt
+          JOIN securities AS s ON s.id = lt.security_id
+         WHERE lt.etf_isin = ? ORDER BY s.isin;
+        """,
+        (isin,),
+    ).fetchall()
+    return {isin: (pytest.approx(weight), depth) for isin, weight, depth in rows}
+
+
+def test_fund_of_funds_is_unrolled_and_follows_child_changes(conn):
+    add_etfs(conn, [FOF, WORLD])
+    load(conn, WORLD, {APPLE: 60.0, MSFT: 40.0})
+    load(conn, FOF, {WORLD: 50.0, APPLE: 50.0})
+
+    assert refresh_lookthrough(conn) == 2
+    assert _exposure(conn, FOF) == {APPLE: (80.0, 1), MSFT: (20.0, 1)}
+    assert _exposure(conn, WORLD) == {}  # plain ETFs read etf_holdings directly
+
+    # rewriting the child refreshes its holders
+    load(conn, WORLD, {MSFT: 100.0})
+    refresh_lookthrough(conn, [WORLD])
+    assert _exposure(conn, FOF) == {APPLE: (50.0, 0), MSFT: (50.0, 1)}
+
+
+def test_cycles_are_broken_once_and_kept_as_opaque_holdings(conn):
+    add_etfs(conn, [A, B])
+    load(conn, A, {B: 50.0, APPLE: 50.0})
+    load(conn, B, {A: 50.0, MSFT: 50.0})
+
+    assert back_edges([(A, B), (B, A)]) == {(B, A)}
+    refresh_lookthrough(conn)
+    # A unrolls B, whose holding of A closes the cycle and stays as is
+    assert _exposure(conn, A) == {A: (25.0, 1), APPLE: (50.0, 0), MSFT: (25.0, 1)}
+    assert _exposure(conn, B) == {}
+
+
+def test_depth_limit_keeps_the_rest_opaque(conn):
+    chain = [make_isin(10 + i, "IE") for i in range(4)]
+    add_etfs(conn, chain)
+    for parent, child in zip(chain, chain[1:]):
+        load(conn, parent, {child: 100.0})
+    load(conn, chain[-1], {APPLE: 100.0})
+
+    full = compute_lookthrough(conn, [chain[0]])
+    capped = compute_lookthrough(conn, [chain[0]], max_depth=2)
+    assert full["weight"].to_list() == [100.0] and full["depth"].to_list() == [3]
+    (opaque,) = conn.execute("SELECT id FROM securities WHERE isin = ?;", (chain[3],))
+    assert capped.select("security_id", "depth").rows() == [(opaque[0], 2)]
@@ -0,0 +1,50 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+from utilities.database import open_db
+from utilities.metrics import RunMetrics, recent_runs, recorded_run, stage_timings
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # run reports land in tmp_path/runs
+    return str(tmp_path / "database.db")
+
+
+def test_runs_started_in_the_same_second_get_their_own_directory(db_path):
+    first, second = RunMetrics("fake"), RunMetrics("fake")
+    second.started = first.started
+
+    assert first.run_dir != second.run_dir
+    assert second.run_dir == f"{first.run_dir}-2"
+    # claimed on first use, then stable
+    assert sorted(os.listdir("runs")) == sorted(
+        os.path.basename(m.run_dir) for m in (first, second)
+    )
+
+
+def test_back_to_back_runs_keep_separate_reports_and_rows(db_path):
+    with recorded_run("fake", db_path) as ok:
+        with ok.stage("fetch"):
+            ok.add("holdings", 120)
+        ok.add("empty_etfs")
+    with pytest.raises(ConnectionError):
+        with recorded_run("fake", db_path) as failed:
+            raise ConnectionError("issuer down")
+
+    reports = [
+        json.loads(Path(m.run_dir, "report.json").read_text()) for m in (ok, failed)
+    ]
+    assert ok.run_dir != failed.run_dir
+    assert [r["status"] for r in reports] == ["ok", "failed"]
+    assert reports[0]["counters"] == {"empty_etfs": 1, "holdings": 120}
+    assert list(reports[0]["stages"]) == ["fetch"]
+
+    with open_db(db_path) as conn:
+        runs = recent_runs(conn, "fake")
+        timings = stage_timings(conn, "fake")
+    assert sorted(runs["status"]) == ["failed", "ok"]
+    assert runs.filter(status="ok")["holdings"].to_list() == [120]
+    assert timings.height == 1 and "fetch" in timings.columns  # completed runs only
@@ -0,0 +1,41 @@
+from helpers import add_etfs, load, make_isin
+from unroll import find_nested
+from utilities.nesting import ancestors, children, descendants, nested_etfs, parents
+
+TOP, MID, LEAF = (make_isin(i, "IE") for i in range(1, 4))
+APPLE = make_isin(1)
+
+
+def test_edges_follow_holdings_and_late_etfs(conn):
+    add_etfs(conn, [TOP])
+    load(conn, TOP, {MID: 30.0, APPLE: 70.0})
+    assert nested_etfs(conn) == []  # MID is a plain security so far
+
+    add_etfs(conn, [MID], issuer="amundi")  # ... until it shows up as an ETF
+    assert children(conn, TOP) == [(MID, 30.0)]
+    assert parents(conn, MID) == [(TOP, 30.0)]
+    assert find_nested(conn) == [
+        {
+            "parent_isin": TOP,
+            "nested_isin": MID,
+            "nested_issuer": "amundi",
+            "nested_name": "",
+            "weight": 30.0,
+        }
+    ]
+
+    load(conn, TOP, {MID: 45.0, APPLE: 55.0})
+    assert children(conn, TOP) == [(MID, 45.0)]
+    load(conn, TOP, {APPLE: 100.0})
+    assert nested_etfs(conn) == []
+
+
+def test_closures_stop_on_cycles(conn):
+    add_etfs(conn, [TOP, MID, LEAF])
+    load(conn, TOP, {MID: 10.0})
+    load(conn, MID, {LEAF: 10.0})
+    load(conn, LEAF, {MID: 10.0})  # MID <-> LEAF cycle
+
+    assert descendants(conn, [TOP]) == {MID, LEAF}
+    assert ancestors(conn, [LEAF]) == {TOP, MID}
+    assert ancestors(conn, [TOP]) == set()
@@ -0,0 +1,50 @@
+import random
+
+from helpers import add_etfs, load, make_isin
+from utilities.overlap import neighbours, pair_overlap, refresh_overlap
+
+ETFS = [make_isin(i, "IE") for i in range(8)]
+SECURITIES = [make_isin(i) for i in range(30)]
+
+
+def _random_holdings(rng):
+    picked = rng.sample(SECURITIES, rng.randint(3, 10))
+    return {isin: round(rng.uniform(0.5, 20.0), 2) for isin in picked}
+
+
+def _table(conn):
+    return conn.execute(
+        """
+        SELECT etf_isin, neighbour_isin, round(overlap, 9) FROM etf_overlap
+         ORDER BY 1, 2;
+        """
+    ).fetchall()
+
+
+def test_incremental_refresh_matches_full_rebuild(conn):
+    rng = random.Random(7)
+    add_etfs(conn, ETFS)
+    for etf in ETFS:
+        load(conn, etf, _random_holdings(rng))
+    refresh_overlap(conn, top_k=3)
+
+    changed = ETFS[:2]
+    for etf in changed:
+        load(conn, etf, _random_holdings(rng))
+    refresh_overlap(conn, changed, top_k=3)
+    incremental = _table(conn)
+
+    refresh_overlap(conn, top_k=3)
+    assert incremental == _table(conn)
+
+
+def test_neighbours_are_exact_overlaps(conn):
+    add_etfs(conn, ETFS[:3])
+    load(conn, ETFS[0], {SECURITIES[0]: 60.0, SECURITIES[1]: 40.0})
+    load(conn, ETFS[1], {SECURITIES[0]: 30.0, SECURITIES[2]: 70.0})
+    load(conn, ETFS[2], {SECURITIES[3]: 100.0})  # shares nothing
+    refresh_overlap(conn)
+
+    assert [(n, o) for n, o, _ in neighbours(conn, ETFS[0])] == [(ETFS[1], 30.0)]
+    assert pair_overlap(conn, ETFS[0], ETFS[1]) == 30.0
+    assert neighbours(conn, ETFS[2]) == []
@@ -0,0 +1,62 @@
+import datetime
+
+import pytest
+from helpers import add_etfs, make_isin
+from utilities.common import ETF
+from utilities.prices import (
+    append_etf_prices,
+    append_prices,
+    price_history,
+    price_stats,
+    prices_as_of,
+)
+
+A, B = make_isin(1, "IE"), make_isin(2, "IE")
+
+
+def _day(n):
+    return datetime.date(2025, 1, 1) + datetime.timedelta(days=n)
+
+
+def test_same_day_observations_merge_without_null_wipes(conn):
+    add_etfs(conn, [A, B])
+    append_prices(conn, [(A, "2025-01-02", 100.0, None)])
+    append_prices(conn, [(A, "2025-01-02", None, 5e8)])  # AUM later that day
+    append_prices(conn, [(A, "2025-01-02", 101.0, None)])  # NAV corrected
+    append_etf_prices(
+        conn,
+        [ETF(A, "test", nav=102.0).to_db_tuple(), ETF(B, "test").to_db_tuple()],
+        date="2025-01-03",
+    )
+
+    assert price_history(conn, [A, B]).rows() == [
+        (A, _day(1), 101.0, 5e8),
+        (A, _day(2), 102.0, None),  # B carried neither NAV nor AUM
+    ]
+
+
+def test_range_and_as_of_queries_and_stats(conn):
+    add_etfs(conn, [A, B])
+    navs = {A: [100.0, 110.0, 99.0, 121.0], B: [50.0, 50.0, 50.0, 50.0]}
+    append_prices(
+        conn,
+        [
+            (isin, _day(n).isoformat(), nav, None)
+            for isin, series in navs.items()
+            for n, nav in enumerate(series)
+        ],
+    )
+
+    window = price_history(conn, [A], start="2025-01-02", end="2025-01-03")
+    assert window["nav"].to_list() == [110.0, 99.0]
+    latest = prices_as_of(conn, [A, B], "2025-01-03")
+    assert sorted(latest.select("isin", "nav").rows()) == [(A, 99.0), (B, 50.0)]
+    assert prices_as_of(conn, [A], "2024-12-31").is_empty()
+
+    stats = {
+        row["isin"]: row
+        for row in price_stats(price_history(conn, [A, B])).iter_rows(named=True)
+    }
+    assert stats[A]["total_return"] == pytest.approx(0.21)
+    assert stats[A]["max_drawdown"] == pytest.approx(99.0 / 110.0 - 1)
+    assert stats[B]["volatility"] == 0.0 and stats[B]["max_drawdown"] == 0.0
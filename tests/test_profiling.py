@@ -0,0 +1,43 @@
+import os
+from pathlib import Path
+
+import pytest
+from utilities import profiling
+from utilities.metrics import recorded_run
+from utilities.profiling import profile_mode, profiled, section
+
+FILES = {
+    "cpu": {"cpu.pstats", "cpu.folded", "sections.txt", "report.json"},
+    "mem": {"mem_top.txt", "mem.folded", "sections.txt", "report.json"},
+}
+
+
+def _work():
+    with section("parse"):
+        return sorted(str(i) for i in range(20_000))
+
+
+def test_profile_mode_reads_the_command_line():
+    assert profile_mode(["x.py", "--profile", "mem"]) == "mem"
+    assert profile_mode(["x.py", "--profile=cpu"]) == "cpu"
+    assert profile_mode(["x.py"]) is None
+    with pytest.raises(SystemExit):
+        profile_mode(["x.py", "--profile", "gpu"])
+
+
+def test_back_to_back_profiled_runs_write_separate_profiles(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    run_dirs = {}
+    for mode in ("cpu", "mem"):
+        with recorded_run("fake", str(tmp_path / "database.db")) as metrics:
+            with profiled(mode, metrics.run_dir):
+                _work()
+        run_dirs[mode] = metrics.run_dir
+
+    assert run_dirs["cpu"] != run_dirs["mem"]
+    for mode, run_dir in run_dirs.items():
+        assert set(os.listdir(run_dir)) == FILES[mode]
+        sections = Path(run_dir, "sections.txt").read_text().splitlines()
+        assert sections[1].split()[:2] == ["parse", "1"]
+    assert profiling._profiler is None  # hooks are no-ops again
+    assert section("parse") is profiling._DISABLED
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import utilities.scraper as scraper_module
+from utilities.database import open_db, setup_database
+from utilities.scraper import IssuerScraper, run
+
+ETF_ISIN = "IE00B4L5Y983"
+APPLE = {"holding_isin": "US0378331005", "holding_name": "Apple", "weight": 5.0}
+
+
+class FakeScraper(IssuerScraper):
+    issuer = "fake"
+    rows = (APPLE,)  # None: the holdings request fails
+
+    async def list_products(self):
+        yield {"isin": ETF_ISIN, "name": "Fake World"}
+
+    async def fetch_holdings(self, product):
+        if self.rows is None:
+            raise ConnectionError("holdings unavailable")
+        for row in self.rows:
+            yield row
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # run reports land in tmp_path/runs
+    path = str(tmp_path / "database.db")
+    with open_db(path) as conn:
+        setup_database(conn)
+    return path
+
+
+def _run(db_path, rows):
+    scraper = FakeScraper()
+    scraper.rows = rows
+    return asyncio.run(run(scraper, force=True, db_path=db_path))
+
+
+def _holdings(db_path):
+    with open_db(db_path) as conn:
+        return conn.execute(
+            "SELECT etf_isin, weight FROM etf_holdings ORDER BY etf_isin;"
+        ).fetchall()
+
+
+def test_missing_override_fails_at_instantiation():
+    class NoHoldings(IssuerScraper):
+        issuer = "broken"
+
+        async def list_products(self):
+            yield {}
+
+    with pytest.raises(TypeError, match="fetch_holdings"):
+        NoHoldings()
+
+
+def test_failed_fetch_keeps_previous_holdings(db_path):
+    _run(db_path, (APPLE,))
+    metrics = _run(db_path, None)
+
+    assert _holdings(db_path) == [(ETF_ISIN, 5.0)]
+    assert metrics.counters["failed_etfs"] == 1
+
+
+def test_empty_holdings_keep_previous_ones_and_are_counted(db_path, capsys):
+    _run(db_path, (APPLE,))
+    metrics = _run(db_path, ())
+
+    assert _holdings(db_path) == [(ETF_ISIN, 5.0)]
+    assert metrics.counters["empty_etfs"] == 1
+    assert metrics.counters["failed_etfs"] == 0
+    assert f"no holdings returned for {ETF_ISIN}" in capsys.readouterr().out
+
+
+class ThreeEtfScraper(IssuerScraper):
+    issuer = "fake"
+    CONCURRENT_REQUESTS = 1
+    isins = ("IE00B4L5Y983", "IE00B5BMR087", "LU1681043599")
+
+    def __init__(self):
+        super().__init__()
+        self.fetched = []
+
+    async def list_products(self):
+        for isin in self.isins:
+            yield {"isin": isin}
+
+    async def fetch_holdings(self, product):
+        self.fetched.append(product["isin"])
+        yield APPLE
+
+
+def test_interrupted_run_resumes_from_the_journal(db_path, monkeypatch):
+    real_load = scraper_module.load_holdings
+    writes = []
+
+    def crash_on_second_write(conn, isins, holdings):
+        if writes:
+            raise RuntimeError("killed mid-run")
+        writes.extend(isins)
+        return real_load(conn, isins, holdings)
+
+    monkeypatch.setattr(scraper_module, "load_holdings", crash_on_second_write)
+    with pytest.raises(RuntimeError, match="killed mid-run"):
+        asyncio.run(run(ThreeEtfScraper(), db_path=db_path))
+    with open_db(db_path) as conn:
+        journal = dict(conn.execute("SELECT isin, status FROM scrape_journal;"))
+    assert journal[writes[0]] == "loaded"
+    assert list(journal.values()).count("pending") == 2
+
+    monkeypatch.setattr(scraper_module, "load_holdings", real_load)
+    scraper = ThreeEtfScraper()
+    metrics = asyncio.run(run(scraper, db_path=db_path))
+
+    assert sorted(scraper.fetched) == sorted(set(ThreeEtfScraper.isins) - {writes[0]})
+    assert metrics.counters["cache_hits"] == 1
+    assert [isin for isin, _ in _holdings(db_path)] == sorted(ThreeEtfScraper.isins)
+    with open_db(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM scrape_journal;").fetchone() == (0,)
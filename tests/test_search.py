@@ -0,0 +1,52 @@
+from helpers import load, make_isin
+from utilities.common import ETF
+from utilities.database import upsert_etfs
+from utilities.search import optimize_search_index, rebuild_search_index, search
+
+BIG, SMALL, NASDAQ = (make_isin(i, "IE") for i in range(1, 4))
+APPLE = make_isin(1)
+
+
+def _setup(conn):
+    upsert_etfs(
+        conn,
+        [
+            ETF(
+                BIG, "ishares", name="Core MSCI World", ticker="SWDA", size=9e10
+            ).to_db_tuple(),
+            ETF(
+                SMALL, "xtrackers", name="MSCI World Swap", ticker="XDWD", size=1e8
+            ).to_db_tuple(),
+            ETF(
+                NASDAQ, "invesco", name="EQQQ Nasdaq-100", ticker="EQ", size=5e9
+            ).to_db_tuple(),
+        ],
+    )
+    load(conn, BIG, {APPLE: 5.0})
+    conn.execute("UPDATE securities SET name = 'Apple Inc' WHERE isin = ?;", (APPLE,))
+
+
+def _isins(conn, text):
+    return search(conn, text)["isin"].to_list()
+
+
+def test_ranking_by_relevance_size_and_exact_codes(conn):
+    _setup(conn)
+    assert _isins(conn, "msci world") == [BIG, SMALL]  # bigger fund first
+    assert _isins(conn, "xdwd")[0] == SMALL  # exact ticker beats size
+    assert _isins(conn, SMALL)[0] == SMALL  # ... and so does an exact ISIN
+    assert _isins(conn, "EQ") == [NASDAQ]  # too short for trigrams: ticker only
+    assert search(conn, "pple").select("kind", "isin").rows() == [("security", APPLE)]
+    assert search(conn, "ab").is_empty()
+
+
+def test_triggers_keep_the_index_in_sync(conn):
+    _setup(conn)
+    upsert_etfs(conn, [ETF(SMALL, "xtrackers", name="S&P 500 Swap").to_db_tuple()])
+    assert _isins(conn, "msci world") == [BIG]
+    assert _isins(conn, "500 swap") == [SMALL]
+
+    before = search(conn, "world").rows()
+    rebuild_search_index(conn)
+    optimize_search_index(conn)
+    assert search(conn, "world").rows() == before
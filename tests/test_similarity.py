@@ -0,0 +1,41 @@
+import random
+
+from helpers import add_etfs, load, make_isin
+from utilities.similarity import (
+    lsh_candidates,
+    recall_benchmark,
+    refresh_similarity_index,
+    similar_etfs,
+)
+
+TRACKERS = [make_isin(i, "IE") for i in range(3)]  # one index, three funds
+OTHER = make_isin(9, "IE")
+
+
+def _index(conn):
+    rng = random.Random(3)
+    index = {make_isin(i): rng.uniform(0.5, 5.0) for i in range(60)}
+    add_etfs(conn, TRACKERS + [OTHER])
+    for etf in TRACKERS:
+        load(conn, etf, {isin: w * rng.uniform(0.9, 1.1) for isin, w in index.items()})
+    load(conn, OTHER, {make_isin(i): 1.0 for i in range(50, 110)})  # shares 10 names
+    return refresh_similarity_index(conn)
+
+
+def test_lsh_finds_trackers_of_the_same_index_only(conn):
+    assert _index(conn) == 4
+    found = dict(similar_etfs(conn, TRACKERS[0]))
+    assert set(found) == set(TRACKERS[1:])
+    assert min(found.values()) > 0.7
+    # a fund sharing a sliver of the weight is filtered out by the buckets
+    assert OTHER not in lsh_candidates(conn, TRACKERS[0])
+    report = recall_benchmark(conn, k=2)
+    assert report["queries"] == 4 and report["precision"] == 1.0
+
+
+def test_index_of_another_layout_is_rebuilt(conn):
+    _index(conn)
+    conn.execute("UPDATE etf_minhash SET signature = zeroblob(64 * 2 * 8);")
+    # only one ETF changed, but every stale signature is recomputed
+    assert refresh_similarity_index(conn, [OTHER]) == 4
+    assert set(dict(similar_etfs(conn, TRACKERS[0]))) == set(TRACKERS[1:])
@@ -0,0 +1,43 @@
+import datetime
+
+import polars as pl
+from helpers import add_etfs, load, make_isin
+from utilities.snapshot import export_snapshot, scan_snapshot, snapshot_dates
+
+DAY = datetime.date(2025, 3, 31)
+ETF_A, ETF_B = make_isin(1, "IE"), make_isin(2, "IE")
+APPLE, MSFT = make_isin(1), make_isin(2)
+
+
+def test_snapshot_round_trip_with_an_etf_of_no_issuer(conn, tmp_path):
+    add_etfs(conn, [ETF_A], issuer="iShares / BlackRock")
+    add_etfs(conn, [ETF_B])
+    load(conn, ETF_A, {APPLE: 60.0, MSFT: 40.0}, sector="information technology")
+    load(conn, ETF_B, {APPLE: 100.0})
+    # v_etfs LEFT JOINs issuers: a dangling issuer id comes out as NULL
+    conn.commit()
+    conn.execute("PRAGMA foreign_keys = OFF;")
+    conn.execute("UPDATE etfs SET issuer_id = -1 WHERE isin = ?;", (ETF_B,))
+
+    written = export_snapshot(conn, tmp_path, DAY)
+    assert written == {"etfs": 2, "securities": 2, "etf_holdings": 3, "holdings": 3}
+    assert snapshot_dates(tmp_path) == ["2025-03-31"]
+    assert {p.parent.name for p in (tmp_path / "holdings").rglob("*.parquet")} == {
+        "issuer=iShares%20%2F%20BlackRock",
+        "issuer=__HIVE_DEFAULT_PARTITION__",
+    }
+
+    holdings = (
+        scan_snapshot("holdings", tmp_path)
+        .select("issuer", "etf_isin", "holding_isin", "sector", "weight")
+        .sort("etf_isin", "holding_isin")
+        .collect()
+    )
+    assert holdings.rows() == [
+        ("iShares / BlackRock", ETF_A, APPLE, "information technology", 60.0),
+        ("iShares / BlackRock", ETF_A, MSFT, "information technology", 40.0),
+        (None, ETF_B, APPLE, "information technology", 100.0),
+    ]
+    # issuer filters prune whole partitions, the NULL one included
+    orphans = scan_snapshot("etf_holdings", tmp_path).filter(pl.col("issuer").is_null())
+    assert orphans.select("etf_isin").collect().to_series().to_list() == [ETF_B]
@@ -0,0 +1,27 @@
+import polars as pl
+from utilities.translate import translate, translate_column
+
+
+def test_labels_are_looked_up_in_their_own_field():
+    assert translate("IT", "sector") == "information technology"
+    assert translate("IT") == "information technology"
+    # A sector label is not a region: it falls back to the lowercased value
+    assert translate("IT", "region") == "it"
+    assert translate("Capitalizzazione", "use_of_profits") == "acc"
+    assert translate(" Frontier Markets ", "region") == "frontier markets"
+    assert translate("", "sector") is None and translate(None) is None
+
+
+def test_repeated_values_share_one_string():
+    # Built at runtime so the inputs are distinct objects
+    first = translate("".join(["Some ", "New Sector"]), "sector")
+    second = translate("".join(["Some New ", "Sector"]), "sector")
+    assert first == "some new sector" and first is second
+
+
+def test_column_matches_scalar_translation():
+    values = pl.Series(["Finanziari", None, "IT", "Finanziari", "Unlisted"])
+    expected = [translate(v, "sector") for v in values]
+    assert translate_column(values, "sector").to_list() == expected
+    categorical = translate_column(values.cast(pl.Categorical), "sector")
+    assert categorical.to_list() == expected
@@ -0,0 +1,124 @@
+import pytest
+
+pytest.importorskip("requests")
+
+import vanguard
+from utilities.common import Holding
+from utilities.database import open_db
+
+PID, ISIN = "9505", "IE00B3RBWM25"
+APPLE = "US0378331005"
+
+# Trimmed FundsQuery response: one fund with its latest NAV and AUM history
+FUNDS = {
+    "funds": [
+        {
+            "portId": PID,
+            "profile": {
+                "fundFullName": "Vanguard FTSE All-World UCITS ETF",
+                "fundCurrency": "USD",
+                "marketOfDomicile": "Ireland",
+                "fundInceptionDate": "2012-05-22T00:00:00-04:00",
+                "identifiers": [
+                    {"altId": "ISIN", "altIdValue": ISIN},
+                    {"altId": "Ticker", "altIdValue": "VWRL"},
+                ],
+                "feesAndExpenses": {
+                    "feesAndExpensesType": {
+                        "expenseType": [{"code": "TOTEXPRTPC", "value": 0.22}]
+                    }
+                },
+            },
+            "pricingDetails": {
+                "navPrices": {
+                    "items": [{"asOfDate": "2025-09-30T00:00:00-04:00", "price": 140.5}]
+                }
+            },
+        },
+        {"portId": "9999", "profile": {"identifiers": []}},  # no ISIN: skipped
+    ],
+    "polarisAnalyticsHistory": [
+        {
+            "portId": PID,
+            "monthly": {
+                "valuation": {
+                    "fund": {
+                        "items": [
+                            {
+                                "AUM": [
+                                    {
+                                        "effectiveDate": "2025-08-31T00:00:00-04:00",
+                                        "fundAssetAmount": 3.1e10,
+                                    },
+                                    {
+                                        "effectiveDate": "2025-09-30T00:00:00-04:00",
+                                        "fundAssetAmount": 3.3e10,
+                                    },
+                                ]
+                            }
+                        ]
+                    }
+                }
+            },
+        }
+    ],
+}
+
+
+@pytest.fixture
+def vanguard_db(tmp_path, monkeypatch):
+    """vanguard.main() against FUNDS and a one-holding fund, in tmp_path."""
+    fetched = []
+
+    def get_holdings_data(pid, isin):
+        fetched.append(pid)
+        return [Holding(isin, APPLE, "Apple Inc", 4.5, None, "US", None)]
+
+    monkeypatch.chdir(tmp_path)  # run reports land in tmp_path/runs
+    monkeypatch.setattr(vanguard, "DB_NAME", str(tmp_path / "database.db"))
+    monkeypatch.setattr(vanguard, "get_etf_list", lambda: vanguard.parse_funds(FUNDS))
+    monkeypatch.setattr(vanguard, "get_holdings_data", get_holdings_data)
+    return vanguard.DB_NAME, fetched
+
+
+def test_parse_funds_reads_facts_and_price_history():
+    pid_isin, etfs, prices = vanguard.parse_funds(FUNDS)
+    assert pid_isin == {PID: ISIN, "9999": None}
+    (etf,) = etfs
+    assert (etf.isin, etf.ticker, etf.ter, etf.nav, etf.size) == (
+        ISIN,
+        "VWRL",
+        0.22,
+        140.5,
+        3.3e10,
+    )
+    assert etf.inception_date == "2012-05-22"
+    assert sorted(prices, key=str) == [
+        (ISIN, "2025-08-31", None, 3.1e10),
+        (ISIN, "2025-09-30", 140.5, None),
+        (ISIN, "2025-09-30", None, 3.3e10),
+    ]
+
+
+def test_nav_only_skips_holdings_and_cadences_apply(vanguard_db):
+    db_path, fetched = vanguard_db
+    vanguard.main(nav_only=True)
+    with open_db(db_path) as conn:
+        assert conn.execute("SELECT nav, size FROM etfs;").fetchall() == [
+            (140.5, 3.3e10)
+        ]
+        assert conn.execute("SELECT count(*) FROM etf_holdings;").fetchone() == (0,)
+        history = conn.execute(
+            "SELECT date, nav, size FROM etf_prices WHERE date < '2025-10-01' ORDER BY 1;"
+        ).fetchall()
+        assert history == [("2025-08-31", None, 3.1e10), ("2025-09-30", 140.5, 3.3e10)]
+    assert fetched == []
+
+    vanguard.main()
+    vanguard.main()  # holdings are fresh: not fetched again
+    with open_db(db_path) as conn:
+        assert conn.execute("SELECT count(*) FROM etf_holdings;").fetchone() == (1,)
+    assert fetched == [PID]
+
+    vanguard.main(force=True)
+    assert fetched == [PID, PID]